@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Замер холодного запуска редактора: от запуска интерпретатора до показанного окна
+# (и, если задан файл, до открытого файла). Каждый запуск — отдельный процесс.
+# Окно рисуется без экрана (QT_QPA_PLATFORM=offscreen).
+# Запуск из папки проекта: python benchmarks/startup.py [файл] [--runs 10]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Папка проекта.
+
+
+def child(file_name):
+    # Запуск редактора в этом процессе. Печатаются времена этапов в секундах от начала процесса.
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from PyQt5.QtWidgets import QApplication
+    application = QApplication(sys.argv[:1])
+    import hex
+    imported = time.perf_counter()
+
+    editor = hex.HEXEditor(application)
+    editor.show()
+    application.processEvents()
+    shown = time.perf_counter()
+
+    times = {"import": imported - started, "shown": shown - started}
+    if file_name:
+        editor.load_file(file_name)
+        while editor.task is not None:
+            application.processEvents()
+        application.processEvents()
+        times["opened"] = time.perf_counter() - started
+
+    print(json.dumps(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start of the editor.")
+    parser.add_argument("file", nargs="?", help="file to open on start")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.child:
+        child(arguments.file)
+        return
+
+    environment = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    command = [sys.executable, os.path.abspath(__file__), "--child"] + \
+        ([os.path.abspath(arguments.file)] if arguments.file else [])
+    runs = []
+
+    for _ in range(arguments.runs):
+        started = time.perf_counter()
+        output = subprocess.run(command, env=environment, capture_output=True, text=True, check=True).stdout
+        times = json.loads(output.strip().splitlines()[-1])
+        times["total"] = time.perf_counter() - started  # Вместе с запуском интерпретатора и выходом.
+        runs.append(times)
+
+    for name in runs[0]:
+        values = [times[name] for times in runs]
+        print(f"{name:8} median {statistics.median(values) * 1000:8.1f} ms   "
+              f"min {min(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Замеры открытия, первой отрисовки, правки, смены ширины строки, поиска и сохранения на синтетических файлах
+# от килобайтов до гигабайтов. Каждый размер и каждый запуск — отдельный процесс, поэтому пиковая память
+# (peak RSS) относится к одному файлу. Окно рисуется без экрана (QT_QPA_PLATFORM=offscreen).
+# Результаты печатаются в формате JSON, чтобы их можно было сравнивать между версиями.
+# Запуск из папки проекта: python benchmarks/suite.py [--sizes 1K,1M,64M,1G,4G] [--runs 3] [--output results.json]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Папка проекта.
+UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+DEFAULT_SIZES = "1K,1M,64M,1G,4G"
+BLOCK = 1 << 20  # Файлы пишутся одинаковыми блоками по мегабайту.
+NEEDLE = b"HEXBENCH"  # Строка для поиска, стоит в начале каждых NEEDLE_STEP байтов.
+NEEDLE_STEP = 1 << 16
+
+
+def parse_size(text: str):
+    """
+    :param text:
+    :return int:
+    """
+
+    # Размер вида "1K", "64M", "4G" или число байтов.
+
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1:] if text[-1:] in UNITS else ""
+    return int(text[:len(text) - len(unit)]) * UNITS[unit]
+
+
+def generate(directory: str, size: int, seed: int):
+    """
+    :param directory:
+    :param size:
+    :param seed:
+    :return str:
+    """
+
+    # Синтетический файл: случайные байты из генератора с заданным seed и NEEDLE через каждые NEEDLE_STEP байтов.
+    # Файл с тем же размером и seed уже готов, если лежит в папке, и используется заново.
+
+    file_name = os.path.join(directory, f"bench-{size}-{seed}.bin")
+    if os.path.exists(file_name) and os.path.getsize(file_name) == size:
+        return file_name
+
+    block = bytearray(random.Random(seed).getrandbits(8 * BLOCK).to_bytes(BLOCK, "little"))
+    for offset in range(0, BLOCK, NEEDLE_STEP):
+        block[offset:offset + len(NEEDLE)] = NEEDLE
+
+    with open(file_name + ".part", "wb") as file:
+        for offset in range(0, size, BLOCK):
+            file.write(block[:min(BLOCK, size - offset)])
+    os.replace(file_name + ".part", file_name)
+    return file_name
+
+
+def peak_rss():
+    # Пиковая память процесса в байтах (None, если модуля resource нет, например, на Windows).
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # В Linux ru_maxrss в килобайтах.
+
+
+def child(file_name: str, save_name: str):
+    # Замеры в этом процессе. Печатается словарь с временами в секундах и скоростями в байтах в секунду.
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from PyQt5.QtWidgets import QApplication
+    application = QApplication(sys.argv[:1])
+    import hex
+    from hexedit import PARALLEL_RANGE, compile_pattern
+    from hexview import page_cache
+
+    editor = hex.HEXEditor(application)
+    editor.show()
+    application.processEvents()
+    size = os.path.getsize(file_name)
+    results = {"size": size}
+
+    def wait(busy):
+        while busy():
+            application.processEvents()
+
+    def measure_search(name):
+        # Поиск всех вхождений NEEDLE. Пока документ совпадает с файлом, find_all() ищет на нескольких
+        # процессах (если ядер больше одного и файл не меньше 2 * PARALLEL_RANGE), иначе — в одном потоке.
+        results[name + "_parallel"] = (editor.hexView.document.unchanged() and (os.cpu_count() or 1) > 1
+                                       and size >= 2 * PARALLEL_RANGE)
+        started = time.perf_counter()
+        editor.start_search(compile_pattern(NEEDLE.decode("ascii"), "ascii"))
+        wait(lambda: editor.search_thread is not None)
+        elapsed = time.perf_counter() - started
+        results[name] = elapsed
+        results[name + "_hits"] = len(editor.search_hits)
+        results[name + "_throughput"] = size / elapsed
+
+    # Открытие: от вызова load_file() до документа в таблице, затем первая отрисовка окна.
+    started = time.perf_counter()
+    editor.load_file(file_name)
+    wait(lambda: editor.task is not None)
+    results["open"] = time.perf_counter() - started
+    editor.grab()
+    results["first_paint"] = time.perf_counter() - started
+
+    # Карта энтропии считается в фоне и мешала бы остальным замерам.
+    started = time.perf_counter()
+    wait(lambda: editor.overview_task is not None)
+    results["overview"] = time.perf_counter() - started
+
+    # Поиск в файле без правок.
+    measure_search("search")
+
+    # Правка одного байта в середине файла вместе с перерисовкой таблицы.
+    view = editor.hexView
+    view.move_to(size // 2)
+    view.grab()
+    started = time.perf_counter()
+    view.write(size // 2, b"\xAA")
+    view.grab()
+    results["edit"] = time.perf_counter() - started
+
+    # Смена кол-ва байтов в строке (update_data()) вместе с перерисовкой.
+    started = time.perf_counter()
+    editor.spinBox.setValue(16 if editor.spinBox.value() != 16 else 8)
+    view.grab()
+    results["row_width"] = time.perf_counter() - started
+    editor.edit_timer.stop()  # Пересчёт карты после правки не должен попасть в замер поиска.
+    wait(lambda: editor.overview_task is not None)
+
+    # Поиск в изменённом документе (всегда в одном потоке).
+    measure_search("search_edited")
+
+    # Сохранение в другой файл. Диалог выбора файла сразу возвращает save_name.
+    hex.QFileDialog.getSaveFileName = staticmethod(lambda *arguments: (save_name, ""))
+    started = time.perf_counter()
+    editor.save_file()
+    wait(lambda: editor.task is not None)
+    elapsed = time.perf_counter() - started
+    results["save"] = elapsed
+    results["save_throughput"] = size / elapsed
+
+    results["page_cache"] = page_cache.stats()
+    results["peak_rss"] = peak_rss()
+    editor.close()
+    print(json.dumps(results))
+
+
+def environment_info():
+    # Версии и машина, на которых сделаны замеры.
+    info = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+    try:
+        from PyQt5.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+        info["qt"] = QT_VERSION_STR
+        info["pyqt"] = PYQT_VERSION_STR
+    except ImportError:
+        pass
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                        check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["commit"] = None
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark opening, editing, rendering, searching and saving.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated file sizes (default {DEFAULT_SIZES})")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", default=os.path.join(tempfile.gettempdir(), "hexeditor-bench"),
+                        help="folder for generated files (they are reused between runs)")
+    parser.add_argument("--output", help="JSON file for the results (default: standard output)")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.child:
+        child(*arguments.child)
+        return
+
+    os.makedirs(arguments.dir, exist_ok=True)
+    environment = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    report = {"environment": environment_info(), "seed": arguments.seed, "runs": arguments.runs, "results": []}
+
+    for label in arguments.sizes.split(","):
+        size = parse_size(label)
+        file_name = generate(arguments.dir, size, arguments.seed)
+        save_name = os.path.join(arguments.dir, "saved.bin")
+        runs = []
+
+        for _ in range(arguments.runs):
+            command = [sys.executable, os.path.abspath(__file__), "--child", file_name, save_name]
+            output = subprocess.run(command, env=environment, capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+            os.remove(save_name)
+
+        medians = {name: statistics.median(run[name] for run in runs)
+                   for name in runs[0] if name != "size" and isinstance(runs[0][name], (int, float))
+                   and not isinstance(runs[0][name], bool)}
+        report["results"].append({"size": size, "median": medians, "runs": runs})
+
+        # Краткая сводка для человека (в stderr, чтобы не мешать JSON).
+        print(f"{label:>5}: "
+              f"open {medians['open'] * 1000:.1f} ms, first paint {medians['first_paint'] * 1000:.1f} ms, "
+              f"edit {medians['edit'] * 1000:.1f} ms, row width {medians['row_width'] * 1000:.1f} ms, "
+              f"search {medians['search_throughput'] / (1 << 20):.1f} MB/s "
+              f"(edited {medians['search_edited_throughput'] / (1 << 20):.1f} MB/s), "
+              f"save {medians['save_throughput'] / (1 << 20):.1f} MB/s, "
+              f"peak RSS {(medians.get('peak_rss') or 0) / (1 << 20):.0f} MB", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
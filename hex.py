@@ -1,759 +1,1379 @@
-import sys
-
-from PyQt5 import uic
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QColor
-from PyQt5.QtWidgets import QApplication, QWidget,\
-    QFileDialog, QTableWidgetItem
-
-import sqlite3
-
-
-class LanguageError(Exception):
-    pass
-
-
-def set_language(lang):
-    """
-    :param lang:
-    :return dict:
-    """
-
-    # Функция устанавливает язык.
-
-    language_pack = {}
-
-    # Проверка текстового файла на правильность.
-    correct_names = {"cancel", "cleaner", "opener", "chooseFile", "opened", "saver", "saveFile",
-                     "saved", "addBytes", "removeBytes", "labelRow", "lineEdit", "labelType",
-                     "types", "databaseTitle", "labelEnd", "no", "yes", "yes2", "add", "remove",
-                     "labelAdded", "labelChanged", "labelAddError", "labelRemove", "labelRemoved",
-                     "labelRemoveError", "languages", "languageTitle"}
-
-    # Заполнение словаря.
-    with open(f"languages/{lang}.txt", "r", encoding="utf-8") as language_file:
-        for line in language_file.readlines():
-            line = line.split("=")
-            if len(line) != 2 or line[0] not in correct_names:
-                raise LanguageError(f"File {lang}.txt has wrong format. Correct format "
-                                    "-> param=(translated word with {} "
-                                    "if it's necessary). Example is in en.txt")
-            language_pack[line[0]] = line[1].replace("\n", "")
-            correct_names.remove(line[0])
-
-    return language_pack
-
-
-language = "ru"  # Изначальный язык
-language_dict = set_language(language)  # Слова
-
-
-def hex_to_dec(n: str):
-    """
-    :param n:
-    :return int:
-    """
-
-    # Функция возвращает шестнадцатиричное число в десятичном представлении.
-
-    ns = {
-        "0": 0,
-        "1": 1,
-        "2": 2,
-        "3": 3,
-        "4": 4,
-        "5": 5,
-        "6": 6,
-        "7": 7,
-        "8": 8,
-        "9": 9,
-        "a": 10,
-        "b": 11,
-        "c": 12,
-        "d": 13,
-        "e": 14,
-        "f": 15
-    }
-
-    new_n = []
-    for i in n:
-        new_n.append(i.lower())
-    new_n.reverse()
-
-    s = 0
-    for i in range(len(new_n)):
-        s += ns[new_n[i]] * 16 ** i
-
-    return s
-
-
-def color_item(item: QTableWidgetItem, end: int, byte: int):
-    """
-    :param item:
-    :param end:
-    :param byte:
-    :return QTableWidgetItem:
-    """
-
-    # Клетки окрашиваются в цвета, помогающие определить элементы файла (заголовок и описание).
-    # Диапозон байтов зависит от типа файла.
-
-    color = QColor()
-
-    if 0 <= byte <= end:
-        # Окраска заголовка.
-        color.setRgb(255, 235, 235)
-    else:
-        # Окраска описания.
-        color.setRgb(255, 255, 255)
-
-    item.setBackground(color)  # Окраска ячейки в нужный цвет.
-
-    return item
-
-
-class HEXEditor(QWidget):
-    global language, language_dict
-
-    def __init__(self, application: QApplication):
-        super().__init__()
-        uic.loadUi('hex.ui', self)  # Загрузка интерфейса.
-        self.application = application  # Получение аппликации.
-        self.initUI()
-
-        self.types_form = FileTypesForm(self)  # Форма для связи с БД.
-        self.languages_form = LanguagesForm(self, self.types_form)  # Форма смены языка.
-        self.types_form.connect_languages_form(self.languages_form)
-
-        self.can_update = True  # Защита от не нужных обновлений таблицы.
-
-    def initUI(self):
-        # Установка параметров форме.
-
-        self.setGeometry(300, 100, 1000, 500)
-        self.setWindowTitle('HEXEditor')
-
-        self.language_set()
-
-        self.opener.clicked.connect(self.open_file)  # Кнопка "Загрузить из файла".
-        self.saver.clicked.connect(self.save_file)  # Кнопка "Сохранить файл".
-        self.cleaner.clicked.connect(self.clear_data)  # Кнопка "Новый файл".
-        self.addBytes.clicked.connect(self.add_byte)  # Кнопка "Добавить строку байтов".
-        self.removeBytes.clicked.connect(self.remove_byte)  # Кнопка "Удалить строку байтов".
-        self.spinBox.valueChanged.connect(self.update_data)  # Поле для смены кол-ва байт в строке.
-        self.tableWidget.cellChanged.connect(self.update_data)  # Реакция на изменение данных в таблице.
-        self.types.clicked.connect(self.open_file_types_form)  # Кнопка "Типы файлов"
-        self.languages.clicked.connect(self.open_languages_form)  # Кнопка "Язык (Language)"
-        self.lineEdit.textChanged.connect(self.update_data)  # Реакция на изменение типа файла.
-
-        # Установка шрифтов.
-        self.tableWidget.setFont(QFont("MS Sans Serif", 12))
-        self.listWidget.setFont(QFont("MS Sans Serif", 12))
-
-        # "it's a beautiful day outside. birds are singing, flowers are blooming...
-        #  on days like these, kids like you...
-        #  Should be burning in hell."
-        #                                           © Санс из Undertale™
-        #
-        #                      ░░░░░▄▄▀▀▀▀▀▀▀▀▀▄▄░░░░░
-        #                      ░░░░█░░░░░░░░░░░░░█░░░░
-        #                      ░░░█░░░░░░░░░░▄▄▄░░█░░░
-        #                      ░░░█░░▄▄▄░░▄░░███░░█░░░
-        #                      ░░░▄█░▄░░░▀▀▀░░░▄░█▄░░░
-        #                      ░░░█░░▀█▀█▀█▀█▀█▀░░█░░░
-        #                      ░░░▄██▄▄▀▀▀▀▀▀▀▄▄██▄░░░
-        #                      ░▄█░█▀▀█▀▀▀█▀▀▀█▀▀█░█▄░
-        #                      ▄▀░▄▄▀▄▄▀▀▀▄▀▀▀▄▄▀▄▄░▀▄
-        #                      █░░░░▀▄░█▄░░░▄█░▄▀░░░░█
-        #                      ░▀▄▄░█░░█▄▄▄▄▄█░░█░▄▄▀░
-        #                      ░░░▀██▄▄███████▄▄██▀░░░
-        #                      ░░░████████▀████████░░░
-        #                      ░░▄▄█▀▀▀▀█░░░█▀▀▀▀█▄▄░░
-        #                      ░░▀▄▄▄▄▄▀▀░░░▀▀▄▄▄▄▄▀░░
-
-    def language_set(self):
-        # Присваивание языка интерфейсу.
-
-        self.opener.setText(language_dict["opener"])
-        self.saver.setText(language_dict["saver"])
-        self.cleaner.setText(language_dict["cleaner"])
-        self.addBytes.setText(language_dict["addBytes"])
-        self.removeBytes.setText(language_dict["removeBytes"])
-        self.types.setText(language_dict["types"])
-        self.languages.setText(language_dict["languages"])
-        self.lineEdit.setPlaceholderText(language_dict["lineEdit"])
-        self.labelRow.setText(language_dict["labelRow"])
-
-        self.labelOp.setText("")
-        self.labelType.setText("")
-
-    def open_file(self):
-        # Функция открывает файл и записывает двоичные данные файла в таблицу.
-
-        file_name = QFileDialog.getOpenFileName(self, language_dict["chooseFile"], "")[0]  # Открытие файла.
-        file_type = file_name.split("/")[-1]
-        if "." in file_type:
-            self.lineEdit.setText(file_type.split(".")[-1].lower())
-
-        try:
-            # Открытие файла.
-            with open(file_name, mode="rb") as the_file:
-                data = list(bytes(the_file.read()))  # Байты записываются в список data.
-        except FileNotFoundError:
-            # Если пользователь нажмёт кнопку "Отмена", вызовется исключение.
-            self.labelOp.setText(language_dict["cancel"])
-        else:
-            # Загрузка выполнена успешно.
-            self.can_update = False  # Предотвращение выполнения функции update_data().
-
-            # Проверка типа файла на присутсвие в БД
-            data_base = sqlite3.connect("file_types.sqlite")
-            cursor = data_base.cursor()
-            header_end = cursor.execute(f'''
-                            SELECT header_end from file_types
-                            WHERE type = "{self.lineEdit.text()}"
-                            ''').fetchall()
-
-            if header_end:
-                header_end_byte = header_end[0][0]
-            else:
-                header_end_byte = -1
-
-            data_base.close()
-
-            self.listWidget.clear()  # Стираются все символы в виджет-списке.
-            self.tableWidget.clear()  # Стираются все данные в таблице.
-
-            # Устанавливается значение байтов в строке из спин-бокса.
-            bytes_in_row = int(self.spinBox.text())
-
-            # Таблица подстраивается под размеры данных:
-            self.tableWidget.setColumnCount(bytes_in_row)  # Кол-во столбцов.
-            self.tableWidget.setRowCount(len(data) // bytes_in_row + 1)  # Кол-во строк.
-
-            # Наименование столбцов шестнадцатиричными числами.
-            self.tableWidget.setHorizontalHeaderLabels([hex(x)[2:].upper() for x in range(bytes_in_row)])
-            for header in range(bytes_in_row):
-                self.tableWidget.horizontalHeaderItem(header).setFont(QFont("MS Sans Serif", 12))
-
-            # Наименование строк:
-            if bytes_in_row > 1:
-                # Промежутками шестнадцатиричных чисел, если значение из спин-бокса больше, чем 1.
-                self.tableWidget.setVerticalHeaderLabels(
-                    [f"{hex(x * bytes_in_row)[2:].rjust(2, '0')}-" +
-                     f"{hex(x * bytes_in_row + bytes_in_row - 1)[2:].rjust(2, '0')}"
-                     for x in range(len(data) // bytes_in_row + 1)]
-                )
-            else:
-                # Шестнадцатиричными числами.
-                self.tableWidget.setVerticalHeaderLabels([hex(x)[2:].upper()
-                                                          for x in range(self.tableWidget.rowCount() + 1)])
-
-            # Запись данных в таблицу и виджет-список.
-            symbols = []
-
-            # В этот список записываются байты, пока их кол-во не станет равно значению из спин-бокса - 1
-            # или итератор не прочтёт весь список данных из файла, тогда список сбрасывается и цикл записи
-            # начинается заново.
-
-            can_write_start = True  # Защита от записи переменной row.
-            row = -1  # Переменная отвечает за запись соответствующего заголовка строки таблицы в виджет-список.
-
-            for byte in range(len(data)):
-                # Запись байта в шестнадцатиричном представлении в таблицу.
-                cell = QTableWidgetItem(str(hex(data[byte])[2:].rjust(2, "0")))
-                cell.setTextAlignment(Qt.AlignCenter)
-                cell = color_item(cell, header_end_byte, byte)
-                self.tableWidget.setItem(byte // bytes_in_row, byte % bytes_in_row, cell)
-
-                symbols.append(int(data[byte]))  # Запись байта для виджет-списка.
-                if byte % bytes_in_row == bytes_in_row - 1 or byte == len(data) - 1:
-                    # Длина списка составила достаточно байтов для начала новой строки или данные файла прочтены.
-
-                    # Исправление багов с нумерацией.
-                    if row < 0:
-                        row = 0
-                    if not byte % bytes_in_row and byte == len(data) - 1:
-                        row += 1
-                    if len(data) == 1:
-                        row = 0
-
-                    # Преобразование байтов в видимые основные символы ASCII.
-                    symbols = list(map(lambda x: chr(x) if chr(x) in ' !"#$%&()*+,-./0123456789:;<=>?@' +
-                                                                     "ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`" +
-                                                                     "abcdefghijklmnopqrstuvwxyz{|}~']))"
-                                                                     else ".", symbols))
-
-                    # Наименование строк:
-                    if bytes_in_row > 1:
-                        # Промежутками шестнадцатиричных чисел, если значение из спин-бокса больше, чем 1.
-                        symbols.insert(0,
-                                       f"{hex(row * bytes_in_row)[2:].rjust(2, '0')}-" +
-                                       f"{hex(row * bytes_in_row + bytes_in_row - 1)[2:].rjust(2, '0')}")
-                    else:
-                        # Шестнадцатиричными числами.
-                        symbols.insert(0, f"{hex(byte)[2:]}")
-
-                    self.listWidget.addItem("\t".join([x for x in symbols]))  # Запись символов в виджет-список.
-
-                    symbols = []  # Очистка cтроки.
-                    can_write_start = True
-                elif can_write_start:
-                    row += 1
-                    can_write_start = False
-
-            # Уведомление пользователя.
-            self.labelOp.setText(language_dict["opened"].replace("{}", file_name))
-
-            if header_end:
-                # Текст появляется, если тип файла присутствует в таблице.
-                self.labelType.setText(language_dict["labelType"])
-
-        self.can_update = True
-
-    def save_file(self):
-        # Функция сохраняет данные в файл в двоичном виде.
-        file_name = QFileDialog.getSaveFileName(self, language_dict["saveFile"], "")[0]  # Файл, куда данные сохранятся.
-
-        try:
-            # Процесс записи всех байтов в файл.
-            data = []
-            with open(file_name, mode="wb") as the_file:
-                for bytes_in_row in range(self.tableWidget.rowCount()):
-                    for byte in range(self.tableWidget.columnCount()):
-                        if self.tableWidget.item(bytes_in_row, byte) is not None:
-                            data.append(hex_to_dec(self.tableWidget.item(bytes_in_row, byte).text().lower()))
-                the_file.write(bytes(data))
-        except FileNotFoundError:
-            # Если пользователь нажмёт кнопку "Отмена", вызовется исключение.
-            self.labelOp.setText(language_dict["cancel"])
-        else:
-            # Уведомление пользователя.
-            self.labelOp.setText(language_dict["saved"].replace("{}", file_name))
-
-    def add_byte(self):
-        # Добавляется строка с конца.
-        self.tableWidget.setRowCount(self.tableWidget.rowCount() + 1)
-        bytes_in_row = int(self.spinBox.text())
-        # Наименование строк:
-        if bytes_in_row > 1:
-            # Промежутками шестнадцатиричных чисел, если значение из спин-бокса больше, чем 1.
-            self.tableWidget.setVerticalHeaderLabels(
-                [f"{hex(x * bytes_in_row)[2:]}-{hex(x * bytes_in_row + bytes_in_row - 1)[2:]}"
-                 for x in range(self.tableWidget.rowCount())]
-            )
-        else:
-            # Шестнадцатиричными числами.
-            self.tableWidget.setVerticalHeaderLabels(
-                [hex(x)[2:] for x in range(self.tableWidget.rowCount() + 1)])
-        self.update_data()
-
-    def remove_byte(self):
-        # Удаляется строка с конца.
-        self.tableWidget.setRowCount(self.tableWidget.rowCount() - 1)
-        self.update_data()
-
-    def update_data(self):
-        # Активируется при ручном изменении таблицы или других виджетов.
-        self.labelOp.setText("")
-        self.labelType.setText("")
-
-        if self.can_update:
-            self.can_update = False  # Защита от рекурсии.
-
-            # Проверка типа файла на присутсвие в БД.
-            data_base = sqlite3.connect("file_types.sqlite")
-            cursor = data_base.cursor()
-            header_end = cursor.execute(f'''
-                            SELECT header_end from file_types
-                            WHERE type = "{self.lineEdit.text()}"
-                            ''').fetchall()
-
-            if header_end:
-                # Тип файла существует в базе.
-                header_end_byte = header_end[0][0]
-            else:
-                header_end_byte = -1
-
-            data_base.close()
-
-            # Перезапись в таблицу.
-            data = []
-
-            for bytes_in_row in range(self.tableWidget.rowCount()):
-                for byte in range(self.tableWidget.columnCount()):
-                    if self.tableWidget.item(bytes_in_row, byte) is not None:
-                        the_byte = self.tableWidget.item(bytes_in_row, byte).text()
-                        if 1 <= len(the_byte) <= 2:
-                            # Проверка числа на правильность.
-                            is_correct = True
-
-                            for i in the_byte.lower():
-                                if i not in "0123456789abcdef":
-                                    is_correct = False
-                                    break
-
-                            if is_correct:
-                                # Число — шестнадцатиричное.
-                                data.append(hex_to_dec(the_byte))
-                            else:
-                                # Введено не шестнадцатиричное число.
-                                data.append(255)
-                        elif the_byte != "":
-                            # Длина числа не 1 и не 2.
-                            data.append(255)
-
-            # Устанавливается значение байтов в строке из спин-бокса.
-            bytes_in_row = int(self.spinBox.text())
-
-            self.listWidget.clear()  # Стираются все символы в виджет-списке.
-
-            try:
-                button = self.sender().text()
-            except AttributeError:
-                button = ""  # Превращаем None в пустую строку.
-
-            # Защита некоторых кнопок от не нужного обновления всей таблицы.
-            if button != language_dict["addBytes"] and button != language_dict["removeBytes"]:
-                self.tableWidget.clear()
-                self.tableWidget.setColumnCount(bytes_in_row)
-                self.tableWidget.setRowCount(len(data) // bytes_in_row + 1)
-                self.tableWidget.setHorizontalHeaderLabels([hex(x)[2:].upper() for x in range(bytes_in_row)])
-
-                # Наименование строки:
-                if bytes_in_row > 1:
-                    # Промежутками шестнадцатиричных чисел, если значение из спин-бокса больше, чем 1.
-                    self.tableWidget.setVerticalHeaderLabels(
-                        [f"{hex(x * bytes_in_row)[2:].rjust(2, '0')}-" +
-                         f"{hex(x * bytes_in_row + bytes_in_row - 1)[2:].rjust(2, '0')}"
-                         for x in range(len(data) // bytes_in_row + 1)]
-                    )
-                else:
-                    # Шестнадцатиричными числами.
-                    self.tableWidget.setVerticalHeaderLabels([hex(x)[2:] for x in range(len(data) + 1)])
-
-            # Установка шрифта.
-            for header in range(bytes_in_row):
-                self.tableWidget.horizontalHeaderItem(header).setFont(QFont("MS Sans Serif", 12))
-
-            # Запись данных в таблицу и виджет-список.
-            symbols = []
-
-            # В этот список записываются байты, пока их кол-во не станет равно значению из спин-бокса - 1
-            # или итератор не прочтёт весь список данных из файла, тогда список сбрасывается и цикл записи
-            # начинается заново.
-
-            can_write_start = True  # Защита от записи переменной row.
-            row = -1  # Переменная отвечает за запись соответствующего заголовка строки таблицы в виджет-список.
-
-            for byte in range(len(data)):
-                if button != language_dict["addBytes"] and button != language_dict["removeBytes"]:
-                    # Запись байта в шестнадцатиричном представлении в таблицу.
-                    cell = QTableWidgetItem(str(hex(data[byte])[2:].rjust(2, "0")))
-                    cell.setTextAlignment(Qt.AlignCenter)
-                    cell = color_item(cell, header_end_byte, byte)
-                    self.tableWidget.setItem(byte // bytes_in_row, byte % bytes_in_row, cell)
-
-                symbols.append(int(data[byte]))  # Запись байта для виджет-списка.
-
-                if byte % bytes_in_row == bytes_in_row - 1 or byte == len(data) - 1:
-                    # Длина списка составила достаточно байтов для начала новой строки или данные файла прочтены.
-
-                    # Исправление багов с нумерацией.
-                    if row < 0:
-                        row = 0
-                    if not byte % bytes_in_row and byte == len(data) - 1:
-                        row += 1
-                    if len(data) == 1:
-                        row = 0
-
-                    # Преобразование байтов в видимые основные символы ASCII.
-                    symbols = list(map(lambda x: chr(x) if chr(x) in ' !"#$%&()*+,-./0123456789:;<=>?@' +
-                                                                     "ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`" +
-                                                                     "abcdefghijklmnopqrstuvwxyz{|}~']))"
-                                                                     else ".", symbols))
-
-                    # Наименование строк:
-                    if bytes_in_row > 1:
-                        # Промежутками шестнадцатиричных чисел, если значение из спин-бокса больше, чем 1.
-                        symbols.insert(0,
-                                       f"{hex(row * bytes_in_row)[2:].rjust(2, '0')}-" +
-                                       f"{hex(row * bytes_in_row + bytes_in_row - 1)[2:].rjust(2, '0')}")
-                    else:
-                        # Шестнадцатиричными числами.
-                        symbols.insert(0, f"{hex(byte)[2:]}")
-
-                    self.listWidget.addItem("\t".join([x for x in symbols]))  # Запись символов в виджет-список.
-
-                    symbols = []  # Очистка cтроки.
-
-                    can_write_start = True
-                elif can_write_start:
-                    row += 1
-                    can_write_start = False
-
-            self.can_update = True
-
-    def clear_data(self):
-        # Возвращает таблицу, виджет-список и спинбокс в изначальное состояние.
-
-        self.lineEdit.setText("")  # Тип файла.
-        self.spinBox.setValue(8)  # Спинбокс.
-
-        self.can_update = False  # Защита от обновления (не нужно).
-
-        # Таблица.
-        self.tableWidget.clear()
-
-        # Восстановление количества строк и столбцов.
-        self.tableWidget.setColumnCount(8)
-        self.tableWidget.setRowCount(1)
-
-        # Восстановление заголовков строк и столбцов.
-        self.tableWidget.setHorizontalHeaderLabels([str(x) for x in range(8)])
-        for header in range(8):
-            self.tableWidget.horizontalHeaderItem(header).setFont(QFont("MS Sans Serif", 12))
-        self.tableWidget.setVerticalHeaderLabels([f"00-07"])
-
-        # Восстановление значения 00.
-        cell = QTableWidgetItem("00")
-        cell.setTextAlignment(Qt.AlignCenter)
-
-        # Востановление цвета.
-        color = QColor()
-        color.setRgb(255, 255, 255)
-        cell.setBackground(color)
-
-        # Вставка значения.
-        self.tableWidget.setItem(0, 0, cell)
-
-        # Виджет-список.
-        self.listWidget.clear()
-        self.listWidget.addItem("00-07\t.")
-
-        self.can_update = True
-
-    def open_file_types_form(self):
-        # Открывается форма добавления типа файла в таблицу.
-        self.types_form.show()  # Открытие формы.
-
-    def open_languages_form(self):
-        # Открывается форма выбора языка.
-        self.languages_form.show()  # Открытие формы.
-
-
-class FileTypesForm(QWidget):
-    def __init__(self, main=False):
-        super().__init__()
-        uic.loadUi('types.ui', self)  # Загрузка интерфейса.
-        self.initUI()
-        self.main = main
-        self.languages_form = False
-
-    def connect_languages_form(self, lang):
-        self.languages_form = lang
-
-    def initUI(self):
-        # Установка параметров форме.
-
-        self.setGeometry(325, 125, 75, 175)
-
-        self.language_set()
-
-        self.add.clicked.connect(self.add_type)  # Кнопка "Добавить".
-        self.remove.clicked.connect(self.remove_type)  # Кнопка "Удалить".
-        self.lineEdit2.textChanged.connect(self.update_data)
-        self.spinBox.valueChanged.connect(self.update_data)
-        self.yes.clicked.connect(self.dialogue)  # Кнопка "Поменять значение" или "Подтвердить".
-        self.no.clicked.connect(self.dialogue)  # Кнопка "Отменить действие".
-        self.yes.hide()
-        self.no.hide()
-
-    def language_set(self):
-        # Присваивание языка интерфейсу.
-
-        self.setWindowTitle(language_dict["databaseTitle"])
-
-        self.labelEnd.setText(language_dict["labelEnd"])
-        self.add.setText(language_dict["add"])
-        self.remove.setText(language_dict["remove"])
-        self.lineEdit2.setPlaceholderText(language_dict["lineEdit"])
-        self.no.setText(language_dict["no"])
-
-        self.labelWarning.setText("")
-
-    def add_type(self):
-        # Добавление типа файла в БД.
-        data_base = sqlite3.connect("file_types.sqlite")  # Подключение к БД.
-        cursor = data_base.cursor()
-
-        try:
-            id_of_type = cursor.execute('''
-            SELECT id FROM file_types
-            ''').fetchall()  # Просмотр всех существующих ID.
-
-            id_of_type = max([x[0] for x in id_of_type]) + 1  # Установка нового ID типу файла.
-
-            cursor.execute(f'''
-            INSERT INTO file_types VALUES({id_of_type},"{self.lineEdit2.text()}",{self.spinBox.text()})
-            ''')  # Добавление типа файла.
-        except sqlite3.IntegrityError:
-            # Формат файла уже есть в БД.
-
-            # Заморозка некоторых кнопок.
-            self.add.setEnabled(False)
-            self.remove.setEnabled(False)
-            self.spinBox.setEnabled(False)
-            self.lineEdit2.setEnabled(False)
-            if isinstance(self.languages_form, LanguagesForm):
-                self.languages_form.setEnabled(False)
-
-            # Показ диалоговых кнопок.
-            self.yes.setText(language_dict["yes"])
-
-            self.yes.show()
-            self.no.show()
-
-            data_base.close()
-
-            # Оповещение о существовании типа файла в БД.
-            self.labelWarning.setText(language_dict["labelAddError"])
-        else:
-            # Успешно добавлено.
-            data_base.commit()  # Подтверждение добавки типа в БД. Без этой команды он не сохранится.
-            data_base.close()
-
-            self.labelWarning.setText(language_dict["labelAdded"])
-
-    def remove_type(self):
-        # Заморозка некоторых кнопок.
-        self.add.setEnabled(False)
-        self.remove.setEnabled(False)
-        self.spinBox.setEnabled(False)
-        self.lineEdit2.setEnabled(False)
-        if isinstance(self.languages_form, LanguagesForm):
-            self.languages_form.setEnabled(False)
-
-        # Показ диалоговых кнопок.
-        self.labelWarning.setText(language_dict["labelRemove"])
-        self.yes.setText(language_dict["yes2"])
-
-        self.yes.show()
-        self.no.show()
-
-    def update_data(self):
-        # При смене параметров оповещение пропадает, а текстовая линия делает текст маленького регистра.
-        self.lineEdit2.setText(self.lineEdit2.text().lower())
-        self.labelWarning.setText("")
-
-    def dialogue(self):
-        if self.sender().text() == language_dict["yes"]:
-            data_base = sqlite3.connect("file_types.sqlite")  # Подключение к БД.
-            cursor = data_base.cursor()
-
-            cursor.execute(f'''
-            UPDATE file_types
-            SET header_end = {self.spinBox.text()}
-            WHERE type = "{self.lineEdit2.text()}"
-            ''')  # Обновление формата.
-
-            data_base.commit()  # Подтверждение изменения типа в БД. Без этой команды он не изменится.
-            data_base.close()
-
-            self.labelWarning.setText(language_dict["labelChanged"].replace("{}", self.lineEdit2.text()))
-
-        elif self.sender().text() == language_dict["yes2"]:
-            data_base = sqlite3.connect("file_types.sqlite")  # Подключение к БД.
-            cursor = data_base.cursor()
-            try:
-                id_of_type = cursor.execute(f'''
-                                        SELECT id FROM file_types
-                                        WHERE type = "{self.lineEdit2.text()}"
-                                        ''').fetchall()[0][0]  # Узнавание ID типа файла в БД.
-
-                cursor.execute(f'''
-                            DELETE from file_types
-                            where type = "{self.lineEdit2.text()}"
-                            ''')  # Удаление.
-
-                cursor.execute(f'''
-                            UPDATE file_types
-                            SET id = id - 1
-                            WHERE id > {id_of_type}
-                            ''')  # Переписываем ID послестоящих типов файлов.
-            except IndexError:
-                data_base.close()
-
-                # Оповещение о отсутствии типа файла в БД.
-                self.labelWarning.setText(language_dict["labelRemoveError"])
-            else:
-                # Успешно добавлено.
-                data_base.commit()  # Подтверждение удаления типа в БД. Без этой команды он не сохранится.
-                data_base.close()
-
-                self.labelWarning.setText(language_dict["labelRemoved"])
-        else:
-            # Возникает при нажатии кнопки "Отменить действие".
-            self.labelWarning.setText(language_dict["cancel"])
-
-        # Разморозка замороженных объектов.
-        self.add.setEnabled(True)
-        self.remove.setEnabled(True)
-        self.spinBox.setEnabled(True)
-        self.lineEdit2.setEnabled(True)
-        if isinstance(self.languages_form, LanguagesForm):
-            self.languages_form.setEnabled(True)
-
-        # Скрытие диалоговых кнопок.
-        self.yes.hide()
-        self.no.hide()
-
-
-class LanguagesForm(QWidget):
-
-    def __init__(self, main=False, types_form=False):
-        super().__init__()
-        uic.loadUi('languages.ui', self)  # Загрузка интерфейса.
-        self.initUI()
-        self.main = main
-        self.types_form = types_form
-
-    def initUI(self):
-        # Установка параметров форме.
-
-        global language
-
-        self.setGeometry(350, 150, 400, 100)
-        self.setWindowTitle(language_dict["languageTitle"])
-
-        # Устанавливание состояния кнопок
-        if language == "ru":
-            self.russian.checkStateSet()
-        elif language == "en":
-            self.english.checkStateSet()
-
-        self.russian.clicked.connect(self.switch_language)
-        self.english.clicked.connect(self.switch_language)
-
-    def switch_language(self):
-        # Смена языка
-
-        global language, language_dict
-
-        if self.sender().text() == "Русский":
-            language = "ru"
-        elif self.sender().text() == "English":
-            language = "en"
-        language_dict = set_language(language)
-        self.setWindowTitle(language_dict["languageTitle"])
-        if isinstance(self.main, HEXEditor):
-            self.main.language_set()
-        if isinstance(self.types_form, FileTypesForm):
-            self.types_form.language_set()
-
-
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    ex = HEXEditor(app)
-    ex.show()
-    sys.exit(app.exec())
+import sys
+
+from PyQt5 import uic
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QApplication, QWidget, QFileDialog, QShortcut
+
+from functools import lru_cache
+import importlib.util
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+
+from hexedit import PatchError, Cancelled, HexParseError, parse_hex, FileTypes, SearchPattern, compile_pattern, \
+    compile_replacement, find_all, DirtyRanges, Document, load_document, compare, diff_edits, load_patch, save_patch, \
+    Checksums, TemplateError, load_template
+from hexview import HexView, TemplateModel
+
+
+class LanguageError(Exception):
+    pass
+
+
+UI_CACHE = "__pycache__"  # Папка, в которую кладутся скомпилированные формы.
+
+
+@lru_cache(maxsize=None)
+def compiled_ui(file_name: str):
+    """
+    :param file_name:
+    :return type:
+    """
+
+    # Класс формы из .ui. Форма переводится в код на Python (uic.compileUi) один раз и кладётся
+    # в UI_CACHE, а при следующих запусках загружается уже готовый модуль без разбора XML.
+    # Модуль компилируется заново, только если .ui изменился. Он пишется во временный файл и заменяет
+    # старый одним os.replace(), поэтому одновременно запущенный редактор не прочитает недописанный модуль.
+    # Если папка недоступна, а форма не компилируется или модуль не загружается, возвращается None.
+
+    module_name = os.path.splitext(os.path.basename(file_name))[0] + "_ui"
+    module_path = os.path.join(UI_CACHE, module_name + ".py")
+
+    try:
+        if not os.path.exists(module_path) or os.path.getmtime(module_path) < os.path.getmtime(file_name):
+            os.makedirs(UI_CACHE, exist_ok=True)
+            descriptor, temp_name = tempfile.mkstemp(suffix=".py", dir=UI_CACHE)
+            try:
+                with os.fdopen(descriptor, "w", encoding="utf-8") as module_file:
+                    uic.compileUi(file_name, module_file)
+                os.replace(temp_name, module_path)
+            except BaseException:
+                os.remove(temp_name)
+                raise
+
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return next(value for name, value in vars(module).items() if name.startswith("Ui_"))
+    except Exception:
+        # Форма загрузится через uic.loadUi() (см. load_ui()).
+        return None
+
+
+def load_ui(file_name: str, widget: QWidget):
+    # Загрузка формы в виджет. Как и у uic.loadUi(), элементы формы становятся атрибутами виджета.
+    form_class = compiled_ui(file_name)
+    if form_class is None:
+        uic.loadUi(file_name, widget)
+        return
+
+    form = form_class()
+    form.setupUi(widget)
+    widget.__dict__.update(vars(form))
+
+
+@lru_cache(maxsize=None)
+def set_language(lang):
+    """
+    :param lang:
+    :return dict:
+    """
+
+    # Функция устанавливает язык. Файл каждого языка читается только один раз.
+
+    language_pack = {}
+
+    # Проверка текстового файла на правильность.
+    correct_names = {"cancel", "cleaner", "opener", "chooseFile", "opened", "saver", "saveFile",
+                     "saved", "addBytes", "removeBytes", "labelRow", "lineEdit", "labelType",
+                     "types", "databaseTitle", "labelEnd", "no", "yes", "yes2", "add", "remove",
+                     "labelAdded", "labelChanged", "labelAddError", "labelRemove", "labelRemoved",
+                     "labelRemoveError", "languages", "languageTitle", "patcher", "patched",
+                     "patchError", "invalidHex", "signatureEdit", "labelOffset", "searchEdit",
+                     "finder", "stopper", "searching", "searched", "searchError", "replaceEdit",
+                     "replacer", "replaced", "searchChanged", "loading", "saving", "taskError",
+                     "comparer", "compareTitle", "firstFile", "secondFile", "previous", "next",
+                     "exporter", "comparing", "compared", "difference", "exported", "patchExporter",
+                     "patchApplier", "patchApplied", "overviewRange", "overviewEntropy",
+                     "overviewBytes", "overviewWait", "hasher", "hashing", "checksumRange",
+                     "templateField", "templateValue", "templateOffset", "templateError",
+                     "untitled", "busySaving", "tempKept", "currentSignatures"}
+
+    # Заполнение словаря.
+    with open(f"languages/{lang}.txt", "r", encoding="utf-8") as language_file:
+        for line in language_file.readlines():
+            line = line.split("=")
+            if len(line) != 2 or line[0] not in correct_names:
+                raise LanguageError(f"File {lang}.txt has wrong format. Correct format "
+                                    "-> param=(translated word with {} "
+                                    "if it's necessary). Example is in en.txt")
+            language_pack[line[0]] = line[1].replace("\n", "")
+            correct_names.remove(line[0])
+
+    return language_pack
+
+
+language = "ru"  # Изначальный язык
+language_dict = {}  # Слова. Читаются при создании главного окна, а не при импорте.
+
+
+class Task(QThread):
+    # Фоновая задача. Функция job(cancel, progress) выполняется в отдельном потоке, а интерфейс
+    # узнаёт о ходе работы и результате через сигналы. Так открываются и сохраняются файлы и идёт поиск.
+    # cancel — threading.Event для остановки, progress(кол-во сделанного) переводится в процент от total.
+    progress = pyqtSignal(int)  # Процент выполнения.
+    done = pyqtSignal(object)  # Результат функции (не отправляется, если задача остановлена).
+    failed = pyqtSignal(object)  # Исключение, вызванное функцией.
+
+    def __init__(self, job=None, total=0):
+        super().__init__()
+        self.job = job  # Выполняемая функция.
+        self.total = total  # Кол-во работы (например, байтов) для расчёта процента.
+        self.cancel = threading.Event()  # Остановка задачи.
+
+    def report(self, position: int):
+        self.progress.emit(position * 100 // max(self.total, 1))
+
+    def run(self):
+        try:
+            result = self.job(self.cancel, self.report)
+        except Cancelled:
+            return
+        except Exception as error:
+            self.failed.emit(error)
+            return
+
+        if not self.cancel.is_set():
+            self.done.emit(result)
+
+
+def cancel_task(owner, name: str, forget=False):
+    # Остановка фоновой задачи (Task) из атрибута name объекта owner. Функция ждёт завершения потока,
+    # потому что он читает документ. Если forget, атрибут сразу сбрасывается в None, иначе это делает
+    # обработчик сигнала finished (например, чтобы сообщить об отмене).
+    task = getattr(owner, name)
+    if task is not None:
+        task.cancel.set()
+        task.wait()
+        if forget:
+            setattr(owner, name, None)
+
+
+class SearchThread(Task):
+    # Поток поиска. Совпадения отправляются в интерфейс пачками по мере нахождения.
+    found = pyqtSignal(list)  # Пачка совпадений: [(номер байта, длина), ...].
+
+    def __init__(self, document: Document, pattern: SearchPattern):
+        super().__init__()
+        self.document = document.snapshot()  # Правки в редакторе не мешают поиску.
+        self.pattern = pattern
+        self.job, self.total = self.find, len(self.document)
+
+    def find(self, cancel, progress):
+        hits = []
+
+        def report(position):
+            # После каждого куска отправляются найденные совпадения и процент.
+            if hits:
+                self.found.emit(hits[:])
+                hits.clear()
+            progress(position)
+
+        for hit in find_all(self.document, self.pattern, cancel=cancel, progress=report):
+            hits.append(hit)
+            if len(hits) >= SEARCH_BATCH:
+                self.found.emit(hits[:])
+                hits.clear()
+
+        if hits:
+            self.found.emit(hits)
+
+
+SEARCH_BATCH = 1000  # Сколько совпадений отправляется в интерфейс за раз.
+SEARCH_SHOWN = 10000  # Сколько совпадений показывается в списке.
+SEARCH_MODES = ("hex", "ascii", "utf-16", "regex")  # Режимы поиска в порядке пунктов searchMode.
+EDIT_DELAY = 1000  # Через сколько миллисекунд после последней правки пересчитываются карта энтропии и суммы.
+
+
+class HEXEditor(QWidget):
+    global language, language_dict
+
+    def __init__(self, application: QApplication):
+        global language_dict
+
+        super().__init__()
+        language_dict = set_language(language)  # Загрузка слов.
+        load_ui('hex.ui', self)  # Загрузка интерфейса.
+        self.application = application  # Получение аппликации.
+        self.file_types = FileTypes("file_types.sqlite")  # Типы файлов из БД.
+        self.compare_form = None  # Форма сравнения файлов. Создаётся при первом открытии.
+        self.initUI()
+
+        # Формы создаются при первом открытии.
+        self.types_form = None  # Форма для связи с БД.
+        self.languages_form = None  # Форма смены языка.
+
+        self.can_update = True  # Защита от не нужных обновлений таблицы.
+        self.search_thread = None  # Поток поиска.
+        self.task = None  # Фоновая задача открытия или сохранения файла.
+        self.task_view = None  # Таблица байтов, правка в которой запрещена, пока идёт фоновая задача.
+        self.task_message = ""  # Ключ текста хода фоновой задачи в language_dict.
+        self.task_percent = 0
+        self.search_hits = []  # Найденные совпадения: [(номер байта, длина), ...].
+        self.overview_task = None  # Фоновый подсчёт карты энтропии.
+        self.checksum_task = None  # Фоновый подсчёт контрольных сумм.
+        self.replacement = None  # Байты, на которые заменяются совпадения (None — только поиск).
+
+    def initUI(self):
+        # Установка параметров форме.
+
+        self.setGeometry(300, 100, 1000, 500)
+        self.setWindowTitle('HEXEditor')
+
+        # Дерево полей по шаблону типа файла (templates/<тип>.json). Без шаблона дерево скрыто.
+        self.template_model = TemplateModel(self)
+        self.template_model.attach(self.hexView.document)
+        self.templateTree.setModel(self.template_model)
+        self.templateTree.setColumnWidth(0, 150)
+        self.templateTree.hide()
+
+        # Вкладки с документами. У каждой вкладки своя таблица байтов (self.hexView — таблица текущей вкладки)
+        # и свой тип файла, а строки всех таблиц хранятся в общем кэше страниц (hexview.page_cache).
+        self.tab_types = {self.hexView: ""}  # Таблица байтов вкладки -> тип файла.
+        self.documentTabs.currentChanged.connect(self.switch_tab)
+        self.documentTabs.tabCloseRequested.connect(self.close_tab)
+
+        self.language_set()
+
+        self.opener.clicked.connect(self.open_file)  # Кнопка "Загрузить из файла".
+        self.saver.clicked.connect(self.save_file)  # Кнопка "Сохранить файл".
+        self.patcher.clicked.connect(self.patch_file)  # Кнопка "Сохранить на месте".
+        self.patchExporter.clicked.connect(self.export_patch)  # Кнопка "Экспорт патча".
+        self.patchApplier.clicked.connect(self.apply_patch)  # Кнопка "Применить патч".
+        self.cleaner.clicked.connect(self.clear_data)  # Кнопка "Новый файл".
+        self.addBytes.clicked.connect(self.add_byte)  # Кнопка "Добавить строку байтов".
+        self.removeBytes.clicked.connect(self.remove_byte)  # Кнопка "Удалить строку байтов".
+        self.spinBox.valueChanged.connect(self.update_data)  # Поле для смены кол-ва байт в строке.
+        self.types.clicked.connect(self.open_file_types_form)  # Кнопка "Типы файлов"
+        self.languages.clicked.connect(self.open_languages_form)  # Кнопка "Язык (Language)"
+        self.comparer.clicked.connect(self.open_compare_form)  # Кнопка "Сравнить файлы".
+        self.lineEdit.textChanged.connect(self.update_type)  # Реакция на изменение типа файла.
+        self.finder.clicked.connect(self.find)  # Кнопка "Найти".
+        self.searchEdit.returnPressed.connect(self.find)
+        self.stopper.clicked.connect(self.stop)  # Кнопка "Остановить".
+        self.replacer.clicked.connect(self.replace_all)  # Кнопка "Заменить всё".
+        self.hasher.clicked.connect(self.count_checksums)  # Кнопка "Контрольные суммы".
+        self.searchResults.itemClicked.connect(self.go_to_hit)  # Переход к совпадению.
+
+        # Полоса-обзор с картой энтропии и контрольные суммы. Они считаются в фоне и после правок
+        # пересчитываются не сразу, а когда правки прекратились на EDIT_DELAY миллисекунд.
+        self.entropy_map = self.overview.entropy_map
+        self.entropy_map.attach(self.hexView.document)
+        self.checksums = Checksums()
+        self.checksums.attach(self.hexView.document)
+        self.checksum_range = None  # Промежуток (начало, конец) или (0, None) — весь документ; None — суммы не нужны.
+        self.edit_timer = QTimer(self)
+        self.edit_timer.setSingleShot(True)
+        self.edit_timer.setInterval(EDIT_DELAY)
+        self.edit_timer.timeout.connect(self.update_overview)
+        self.edit_timer.timeout.connect(self.update_checksums)
+
+        # Дерево шаблона и таблица байтов показывают одно место: нажатие на поле выделяет его байты,
+        # а перемещение курсора выбирает поле под ним.
+        self.templateTree.clicked.connect(self.go_to_field)
+        self.overview.clicked.connect(lambda offset: self.hexView.select(offset, 0))
+
+        self.connect_view(self.hexView)
+        QShortcut(QKeySequence.Undo, self, lambda: self.hexView.undo())  # Ctrl+Z.
+        QShortcut(QKeySequence.Redo, self, lambda: self.hexView.redo())  # Ctrl+Y или Ctrl+Shift+Z.
+
+        # "it's a beautiful day outside. birds are singing, flowers are blooming...
+        #  on days like these, kids like you...
+        #  Should be burning in hell."
+        #                                           © Санс из Undertale™
+        #
+        #                      ░░░░░▄▄▀▀▀▀▀▀▀▀▀▄▄░░░░░
+        #                      ░░░░█░░░░░░░░░░░░░█░░░░
+        #                      ░░░█░░░░░░░░░░▄▄▄░░█░░░
+        #                      ░░░█░░▄▄▄░░▄░░███░░█░░░
+        #                      ░░░▄█░▄░░░▀▀▀░░░▄░█▄░░░
+        #                      ░░░█░░▀█▀█▀█▀█▀█▀░░█░░░
+        #                      ░░░▄██▄▄▀▀▀▀▀▀▀▄▄██▄░░░
+        #                      ░▄█░█▀▀█▀▀▀█▀▀▀█▀▀█░█▄░
+        #                      ▄▀░▄▄▀▄▄▀▀▀▄▀▀▀▄▄▀▄▄░▀▄
+        #                      █░░░░▀▄░█▄░░░▄█░▄▀░░░░█
+        #                      ░▀▄▄░█░░█▄▄▄▄▄█░░█░▄▄▀░
+        #                      ░░░▀██▄▄███████▄▄██▀░░░
+        #                      ░░░████████▀████████░░░
+        #                      ░░▄▄█▀▀▀▀█░░░█▀▀▀▀█▄▄░░
+        #                      ░░▀▄▄▄▄▄▀▀░░░▀▀▄▄▄▄▄▀░░
+
+    def language_set(self):
+        # Присваивание языка интерфейсу.
+
+        self.opener.setText(language_dict["opener"])
+        self.saver.setText(language_dict["saver"])
+        self.patcher.setText(language_dict["patcher"])
+        self.patchExporter.setText(language_dict["patchExporter"])
+        self.patchApplier.setText(language_dict["patchApplier"])
+        self.cleaner.setText(language_dict["cleaner"])
+        self.addBytes.setText(language_dict["addBytes"])
+        self.removeBytes.setText(language_dict["removeBytes"])
+        self.types.setText(language_dict["types"])
+        self.languages.setText(language_dict["languages"])
+        self.lineEdit.setPlaceholderText(language_dict["lineEdit"])
+        self.labelRow.setText(language_dict["labelRow"])
+        self.searchEdit.setPlaceholderText(language_dict["searchEdit"])
+        self.finder.setText(language_dict["finder"])
+        self.stopper.setText(language_dict["stopper"])
+        self.replaceEdit.setPlaceholderText(language_dict["replaceEdit"])
+        self.replacer.setText(language_dict["replacer"])
+        self.comparer.setText(language_dict["comparer"])
+        self.hasher.setText(language_dict["hasher"])
+        self.template_model.set_headers([language_dict["templateField"], language_dict["templateValue"],
+                                         language_dict["templateOffset"]])
+        self.overview.texts = {key: language_dict[key]
+                               for key in ("overviewRange", "overviewEntropy", "overviewBytes", "overviewWait")}
+
+        self.labelOp.setText("")
+        self.labelType.setText("")
+
+        for index in range(self.documentTabs.count()):
+            if self.documentTabs.widget(index).document.file_name is None:
+                self.documentTabs.setTabText(index, language_dict["untitled"])
+
+        if self.compare_form is not None:
+            self.compare_form.language_set()
+
+    def open_file(self):
+        # Функция выбирает файл и открывает его в фоне.
+
+        file_name = QFileDialog.getOpenFileName(self, language_dict["chooseFile"], "")[0]  # Открытие файла.
+
+        if not file_name:
+            # Пользователь нажал кнопку "Отмена".
+            self.labelOp.setText(language_dict["cancel"])
+            return
+
+        self.load_file(file_name)
+
+    def load_file(self, file_name: str):
+        # Открытие файла и определение типа в отдельном потоке. Пока файл открывается, окно не замирает.
+        self.start_task(Task(lambda cancel, progress: load_document(file_name, self.file_types)), "loading",
+                        lambda result: self.file_loaded(file_name, *result),
+                        lambda result: result[0].close())
+
+    def connect_view(self, view: HexView):
+        # Подключение сигналов таблицы байтов вкладки. Таблица сама рисует клетки и символы и правит документ,
+        # а правки и перемещения курсора обрабатываются, только пока её вкладка выбрана.
+        view.invalid_input.connect(self.show_invalid_input)
+        view.edited.connect(lambda: view is self.hexView and self.view_edited())
+        view.moved.connect(lambda offset: view is self.hexView and self.show_field(offset))
+
+        # Вставка шестнадцатиричной записи из буфера обмена начиная с байта под курсором.
+        QShortcut(QKeySequence.Paste, view, self.paste_bytes)
+
+    def view_edited(self):
+        self.edit_timer.start()
+        self.template_model.refresh()
+
+    def add_tab(self, title: str):
+        """
+        :param title:
+        :return HexView:
+        """
+
+        # Новая вкладка с пустым документом. Вкладка сразу выбирается.
+
+        view = HexView()
+        view.set_bytes_in_row(self.spinBox.value())
+        self.connect_view(view)
+        self.tab_types[view] = ""
+        self.documentTabs.setCurrentIndex(self.documentTabs.addTab(view, title))
+        return view
+
+    def switch_tab(self, index: int):
+        # Смена вкладки. Поиск останавливается, а тип файла, кол-во байтов в строке, карта энтропии,
+        # контрольные суммы и дерево шаблона переключаются на документ вкладки.
+        view = self.documentTabs.widget(index)
+        if view is None or view is self.hexView:
+            return
+
+        self.stop_search()
+        self.search_hits = []
+        self.searchResults.clear()
+        self.hexView = view
+
+        self.can_update = False
+        self.lineEdit.setText(self.tab_types[view])
+        self.spinBox.setValue(view.bytes_in_row)
+        self.labelOp.setText("")
+        self.labelType.setText(language_dict["labelType"] if view.header_end >= 0 else "")
+        self.attach_document()
+        self.can_update = True
+
+    def close_tab(self, index: int):
+        # Закрытие вкладки вместе с документом. Последняя вкладка не закрывается, а очищается.
+        if self.documentTabs.count() == 1:
+            self.clear_data()
+            return
+
+        view = self.documentTabs.widget(index)
+        if view is self.task_view:
+            if self.saving():
+                return
+            self.stop_task()
+        if view is self.hexView:
+            # Фоновые задачи читают копию документа, который сейчас закроется.
+            self.stop_search()
+            self.stop_overview()
+            self.stop_checksums()
+
+        self.documentTabs.removeTab(index)
+        del self.tab_types[view]
+        view.close_document()
+        view.deleteLater()
+
+    def attach_document(self):
+        # Карта энтропии, контрольные суммы и дерево шаблона начинают следить за документом текущей вкладки.
+        self.stop_overview()
+        self.stop_checksums()
+        self.checksum_range = None
+        self.checksumLabel.setText("")
+
+        document = self.hexView.document
+        self.entropy_map.attach(document)
+        self.checksums.attach(document)
+        self.template_model.attach(document)
+        self.update_template()
+        self.update_overview()
+
+    def file_loaded(self, file_name: str, document: Document, detected):
+        # Функция открывает документ в новой вкладке. Пустая вкладка без правок используется заново.
+        file_type = file_name.split("/")[-1]
+        blank = self.hexView.document
+        if blank.file_name is not None or blank.version or self.hexView is self.task_view:
+            self.add_tab(file_type)
+        self.documentTabs.setTabText(self.documentTabs.currentIndex(), file_type)
+        self.documentTabs.setTabToolTip(self.documentTabs.currentIndex(), file_name)
+        self.can_update = False  # Предотвращение выполнения функций update_data() и update_type().
+
+        # Тип файла определяется по сигнатуре, а если она неизвестна — по расширению.
+        if detected is not None:
+            self.lineEdit.setText(detected)
+        elif "." in file_type:
+            self.lineEdit.setText(file_type.split(".")[-1].lower())
+
+        header_end_byte = self.header_end()
+        self.tab_types[self.hexView] = self.lineEdit.text()
+
+        # Таблица сама читает из документа только видимые строки.
+        self.stop_search()
+        self.stop_overview()
+        self.stop_checksums()
+        self.hexView.set_document(document, header_end_byte)
+
+        # Уведомление пользователя.
+        self.labelOp.setText(language_dict["opened"].replace("{}", file_name))
+        self.attach_document()
+
+        if header_end_byte >= 0:
+            # Текст появляется, если тип файла присутствует в таблице.
+            self.labelType.setText(language_dict["labelType"])
+
+        self.can_update = True
+
+    def save_file(self):
+        # Функция сохраняет данные в файл в двоичном виде.
+        file_name = QFileDialog.getSaveFileName(self, language_dict["saveFile"], "")[0]  # Файл, куда данные сохранятся.
+
+        if not file_name:
+            # Пользователь нажал кнопку "Отмена".
+            self.labelOp.setText(language_dict["cancel"])
+            return
+
+        # Байты пишутся во временный файл в отдельном потоке из копии документа.
+        # Пока идёт запись, правка запрещена, а файл заменяется уже в file_saved().
+        view = self.hexView
+        snapshot = view.document.snapshot()
+        if self.start_task(Task(lambda cancel, progress: snapshot.write_temp(file_name, cancel, progress),
+                                len(snapshot)),
+                           "saving", lambda temp_name: self.file_saved(temp_name, file_name, view)):
+            self.lock_view()
+
+    def file_saved(self, temp_name: str, file_name: str, view: HexView):
+        # Функция заменяет файл записанным временным файлом.
+        # Поиск читает старое отображение, которое закроется, поэтому он останавливается.
+        self.stop_search()
+        self.stop_overview()
+        self.stop_checksums()
+
+        try:
+            view.document.replace_file(temp_name, file_name)
+        except OSError as error:
+            # Правки остаются в документе, а записанная копия — во временном файле.
+            self.labelOp.setText(language_dict["taskError"].replace("{}", str(error)) + " "
+                                 + language_dict["tempKept"].replace("{}", temp_name))
+        else:
+            # Уведомление пользователя.
+            self.labelOp.setText(language_dict["saved"].replace("{}", file_name))
+            index = self.documentTabs.indexOf(view)
+            self.documentTabs.setTabText(index, file_name.split("/")[-1])
+            self.documentTabs.setTabToolTip(index, file_name)
+        self.update_overview()
+        self.update_checksums()
+
+    def start_task(self, task: Task, message: str, done, discard=None):
+        """
+        :param task:
+        :param message:
+        :param done:
+        :param discard:
+        :return bool:
+        """
+
+        # Запуск фоновой задачи. Прошлая задача останавливается, но сохранение не прерывается:
+        # пока оно идёт, задача не запускается (возвращается False). Ход работы показывается
+        # в labelOp текстом message, результат передаётся в done(), а результат остановленной
+        # или заменённой задачи — в discard() (например, чтобы закрыть открытый файл).
+
+        if self.saving():
+            return False
+
+        self.stop_task()
+        self.unlock_view()  # Правку запрещала заменённая задача.
+        self.task = task
+        self.task_message = message
+        self.task_percent = 0
+
+        def finish(result):
+            if task is self.task and not task.cancel.is_set():
+                done(result)
+            elif discard is not None:
+                discard(result)
+
+        task.progress.connect(self.show_task_progress)
+        task.done.connect(finish)
+        task.failed.connect(lambda error: task is self.task and self.task_failed(error))
+        task.finished.connect(lambda: self.task_finished(task))
+        self.stopper.setEnabled(True)
+        task.start()
+        return True
+
+    def show_task_progress(self, percent=None):
+        # Ход фоновой задачи в labelOp (без percent — последний известный).
+        if percent is not None:
+            self.task_percent = percent
+        self.labelOp.setText(language_dict[self.task_message].replace("{}", str(self.task_percent)))
+
+    def saving(self):
+        """
+        :return bool:
+        """
+
+        # Идёт ли сохранение. Сохранение останавливается только кнопкой остановки, поэтому действия,
+        # которые остановили бы его, не выполняются, а до конца сохранения показывается предупреждение.
+
+        if self.task is None or self.task_message not in ("saving", "busySaving"):
+            return False
+
+        self.task_message = "busySaving"
+        self.show_task_progress()
+        return True
+
+    def stop_task(self):
+        # Остановка открытия, сохранения или чтения патча (об отмене сообщает task_finished()).
+        cancel_task(self, "task")
+
+    def task_failed(self, error: Exception):
+        self.labelOp.setText(language_dict["taskError"].replace("{}", str(error)))
+
+    def task_finished(self, task: Task):
+        if task is not self.task:
+            return
+
+        if task.cancel.is_set():
+            self.labelOp.setText(language_dict["cancel"])
+        self.task = None
+        self.unlock_view()
+        self.stopper.setEnabled(self.search_thread is not None)
+
+    def lock_view(self):
+        # Запрет правки в текущей вкладке, пока идёт фоновая задача (снимается в task_finished()).
+        self.task_view = self.hexView
+        self.task_view.locked = True
+
+    def unlock_view(self):
+        if self.task_view is not None:
+            self.task_view.locked = False
+            self.task_view = None
+
+    def stop(self):
+        # Остановка поиска и фоновой задачи.
+        self.stop_search()
+        self.stop_task()
+
+    def update_overview(self):
+        # Подсчёт следующей части карты энтропии в фоне из копии документа. Сначала забываются
+        # блоки, изменённые правками. Пока идёт подсчёт, новый не начинается: он запустится после него.
+        if self.overview_task is not None:
+            return
+
+        document = self.hexView.document
+        self.entropy_map.invalidate()
+        self.overview.set_length(len(document))
+        blocks = self.entropy_map.missing(len(document))
+        if not blocks:
+            return
+
+        snapshot = document.snapshot()
+        task = self.overview_task = Task(lambda cancel, progress: self.entropy_map.compute(snapshot, blocks, cancel))
+        task.done.connect(lambda results: task is self.overview_task and self.overview_computed(results))
+        task.finished.connect(lambda: self.overview_finished(task))
+        task.start()
+
+    def overview_computed(self, results: dict):
+        self.entropy_map.update(results, len(self.hexView.document))
+        self.overview.update()
+
+    def overview_finished(self, task: Task):
+        # Если остались не посчитанные или изменённые блоки, считается следующая часть.
+        if task is not self.overview_task:
+            return
+
+        self.overview_task = None
+        if not task.cancel.is_set():
+            self.update_overview()
+
+    def stop_overview(self):
+        # Остановка подсчёта карты энтропии и отложенного пересчёта после правок.
+        self.edit_timer.stop()
+        cancel_task(self, "overview_task", forget=True)
+
+    def count_checksums(self):
+        # Подсчёт контрольных сумм выделенных байтов или, если ничего не выделено, всего документа.
+        # После правок суммы пересчитываются сами (update_checksums).
+        start, end = self.hexView.selection()
+        self.stop_checksums()
+        self.checksum_range = (start, end) if start < end else (0, None)
+        self.update_checksums()
+
+    def update_checksums(self):
+        # Подсчёт контрольных сумм в фоне из копии документа. Подсчёт продолжается с последнего
+        # запомненного состояния до первой правки. Пока идёт подсчёт, новый не начинается: он запустится после него.
+        if self.checksum_range is None or self.checksum_task is not None:
+            return
+
+        snapshot = self.hexView.document.snapshot()
+        start, end = self.checksum_range
+        end = len(snapshot) if end is None else min(end, len(snapshot))
+        start = min(start, end)
+        version = snapshot.version  # Правки во время подсчёта меняют версию документа.
+        self.checksums.invalidate()
+
+        task = self.checksum_task = Task(lambda cancel, progress: self.checksums.compute(snapshot, start, end,
+                                                                                        cancel, progress),
+                                         end - start)
+        task.progress.connect(lambda percent: task is self.checksum_task and self.checksumLabel.setText(
+            language_dict["hashing"].replace("{}", str(percent))))
+        task.done.connect(lambda result: task is self.checksum_task and self.checksums_counted(start, end, version,
+                                                                                            *result))
+        task.failed.connect(lambda error: task is self.checksum_task and self.checksumLabel.setText(
+            language_dict["taskError"].replace("{}", str(error))))
+        task.finished.connect(lambda: self.checksums_finished(task, version))
+        task.start()
+
+    def checksums_counted(self, start: int, end: int, version: int, digests: dict, checkpoints: list):
+        # Состояния до правок, сделанных во время подсчёта, запоминаются всегда, а суммы показываются,
+        # только если документ с начала подсчёта не менялся (иначе они уже устарели).
+        self.checksums.update(start, checkpoints)
+        if version != self.hexView.document.version:
+            return
+        self.checksumLabel.setText(language_dict["checksumRange"].replace("{}", f"{start:X}–{max(end - 1, start):X}")
+                                   + "  " + "  ".join(f"{algorithm.upper()}: {digest}"
+                                                      for algorithm, digest in digests.items()))
+
+    def checksums_finished(self, task: Task, version: int):
+        # Если во время подсчёта документ изменился, суммы считаются заново.
+        if task is not self.checksum_task:
+            return
+
+        self.checksum_task = None
+        if not task.cancel.is_set() and version != self.hexView.document.version:
+            self.update_checksums()
+
+    def stop_checksums(self):
+        cancel_task(self, "checksum_task", forget=True)
+
+    def patch_file(self):
+        # Функция записывает в открытый файл только изменённые байты.
+        # Пока фоновая задача держит вкладку (например, сохраняет её или пишет патч), файл не меняется.
+        if self.saving() or self.hexView.locked:
+            return
+
+        document = self.hexView.document
+
+        if document.file_name is None:
+            # Файл ещё не открывался или не сохранялся — сохраняется как обычно.
+            self.save_file()
+            return
+
+        try:
+            document.save_in_place()
+        except PatchError:
+            # Байты сдвигались, поэтому нужно сохранить весь файл.
+            self.labelOp.setText(language_dict["patchError"])
+        else:
+            # Уведомление пользователя.
+            self.labelOp.setText(language_dict["patched"].replace("{}", document.file_name))
+
+    def export_patch(self):
+        # Функция сохраняет правки с открытия или сохранения файла патчем (в файл .ips — в формате IPS).
+        file_name = QFileDialog.getSaveFileName(self, language_dict["saveFile"], "")[0]  # Файл патча.
+
+        if not file_name:
+            # Пользователь нажал кнопку "Отмена".
+            self.labelOp.setText(language_dict["cancel"])
+            return
+
+        # Патч пишется в отдельном потоке из копии документа. Пока он пишется, правка запрещена.
+        snapshot = self.hexView.document.snapshot()
+        exported = language_dict["exported"].replace("{}", file_name)
+        if self.start_task(Task(lambda cancel, progress: save_patch(file_name, snapshot.session_edits(), snapshot,
+                                                                    snapshot.source_length())),
+                           "saving", lambda result: self.labelOp.setText(exported)):
+            self.lock_view()
+
+    def apply_patch(self):
+        # Функция применяет к документу патч (IPS или текстовый). Патч читается в отдельном потоке,
+        # а правки применяются одной пачкой, поэтому отменяются одним действием.
+        file_name = QFileDialog.getOpenFileName(self, language_dict["chooseFile"], "")[0]  # Файл патча.
+
+        if not file_name:
+            # Пользователь нажал кнопку "Отмена".
+            self.labelOp.setText(language_dict["cancel"])
+            return
+
+        view = self.hexView
+        length = len(view.document)
+        if self.start_task(Task(lambda cancel, progress: load_patch(file_name, length)), "loading",
+                           lambda edits: self.patch_loaded(file_name, edits, view)):
+            self.lock_view()  # Пока патч читается, длина документа не должна меняться.
+
+    def patch_loaded(self, file_name: str, edits: list, view: HexView):
+        view.locked = False
+        view.apply_edits(edits)
+        self.labelOp.setText(language_dict["patchApplied"].replace("{}", file_name))
+
+    def paste_bytes(self):
+        # Вставка байтов из буфера обмена поверх байтов, начиная с выбранной клетки.
+        offset = self.hexView.position
+
+        try:
+            data = parse_hex(self.application.clipboard().text())
+        except HexParseError as error:
+            self.show_invalid_input(error.positions)
+        else:
+            self.hexView.write(offset, data)
+
+    def show_invalid_input(self, positions: list):
+        # Уведомление о неправильных символах в шестнадцатиричной записи.
+        self.labelOp.setText(language_dict["invalidHex"].replace("{}", ", ".join(str(x) for x in positions[:10])))
+
+    def add_byte(self):
+        # Добавляется строка нулевых байтов с конца.
+        self.hexView.add_row()
+
+    def remove_byte(self):
+        # Удаляется последняя строка байтов.
+        self.hexView.remove_row()
+
+    def header_end(self):
+        """
+        :return int:
+        """
+
+        # Проверка типа файла на присутсвие в реестре. БД при этом не читается.
+        return self.file_types.header_end(self.lineEdit.text())
+
+    def update_data(self):
+        # Активируется при изменении кол-ва байт в строке.
+        self.labelOp.setText("")
+        self.labelType.setText("")
+
+        if self.can_update:
+            # Устанавливается значение байтов в строке из спин-бокса.
+            self.hexView.set_bytes_in_row(self.spinBox.value())
+
+    def update_type(self):
+        # Активируется при изменении типа файла. Перекрашиваются только клетки заголовка.
+        self.labelOp.setText("")
+        self.labelType.setText("")
+
+        if self.can_update:
+            self.tab_types[self.hexView] = self.lineEdit.text()
+            self.hexView.set_header_end(self.header_end())
+            self.update_template()
+
+    def update_template(self):
+        # Шаблон структуры для типа файла из lineEdit. Если шаблона нет или он с ошибкой, дерево скрывается.
+        try:
+            template = load_template(self.lineEdit.text())
+        except (OSError, TemplateError) as error:
+            template = None
+            self.labelOp.setText(language_dict["templateError"].replace("{}", str(error)))
+
+        self.template_model.set_template(template)
+        self.templateTree.setVisible(template is not None)
+
+    def go_to_field(self, index):
+        # Выделение байтов поля, выбранного в дереве шаблона.
+        node = self.template_model.node(index)
+        try:
+            self.hexView.select(node.offset, node.size)
+        except TemplateError as error:
+            self.labelOp.setText(language_dict["templateError"].replace("{}", str(error)))
+
+    def show_field(self, offset: int):
+        # Выбор в дереве шаблона поля с байтом под курсором.
+        if self.templateTree.isVisible():
+            index = self.template_model.locate(offset)
+            if index.isValid():
+                self.templateTree.setCurrentIndex(index)
+                self.templateTree.scrollTo(index)
+
+    def clear_data(self):
+        # Возвращает таблицу текущей вкладки, виджет-список и спинбокс в изначальное состояние.
+        if self.saving():
+            return
+
+        self.can_update = False  # Защита от обновления (не нужно).
+
+        self.lineEdit.setText("")  # Тип файла.
+        self.spinBox.setValue(8)  # Спинбокс.
+
+        # Восстановление значения 00.
+        self.stop()
+        self.stop_overview()
+        self.stop_checksums()
+        self.hexView.set_bytes_in_row(8)
+        self.hexView.set_document(Document(b"\x00"))
+        self.tab_types[self.hexView] = ""
+        self.documentTabs.setTabText(self.documentTabs.currentIndex(), language_dict["untitled"])
+        self.documentTabs.setTabToolTip(self.documentTabs.currentIndex(), "")
+        self.attach_document()
+
+        self.can_update = True
+
+    def find(self):
+        # Поиск всех совпадений.
+        self.stop_search()
+
+        try:
+            pattern = compile_pattern(self.searchEdit.text(), SEARCH_MODES[self.searchMode.currentIndex()])
+        except (ValueError, re.error) as error:
+            self.labelOp.setText(language_dict["searchError"].replace("{}", str(error)))
+            return
+
+        self.start_search(pattern)
+
+    def replace_all(self):
+        # Поиск всех совпадений и их замена одной пачкой правок после завершения поиска.
+        self.stop_search()
+
+        mode = SEARCH_MODES[self.searchMode.currentIndex()]
+        try:
+            pattern = compile_pattern(self.searchEdit.text(), mode)
+            replacement = compile_replacement(self.replaceEdit.text(), mode)
+        except (ValueError, re.error) as error:
+            self.labelOp.setText(language_dict["searchError"].replace("{}", str(error)))
+            return
+
+        self.start_search(pattern, replacement)
+
+    def start_search(self, pattern: SearchPattern, replacement=None):
+        # Запуск поиска в отдельном потоке. Совпадения появляются в списке по мере нахождения.
+        # Если задана замена (replacement), совпадения заменяются в search_finished().
+        self.search_hits = []
+        self.replacement = replacement
+        self.searchResults.clear()
+
+        thread = self.search_thread = SearchThread(self.hexView.document, pattern)
+        thread.found.connect(lambda hits: thread is self.search_thread and self.add_hits(hits))
+        thread.progress.connect(
+            lambda percent: self.labelOp.setText(language_dict["searching"].replace("{}", str(percent))))
+        thread.finished.connect(lambda: self.search_finished(thread))
+        self.stopper.setEnabled(True)
+        self.search_thread.start()
+
+    def stop_search(self):
+        # Остановка поиска (search_thread сбрасывает search_finished()).
+        cancel_task(self, "search_thread")
+
+    def add_hits(self, hits: list):
+        # Добавление пачки совпадений в список.
+        shown = len(self.search_hits)
+        self.search_hits.extend(hits)
+
+        for offset, length in hits[:max(SEARCH_SHOWN - shown, 0)]:
+            self.searchResults.addItem(f"{hex(offset)[2:].rjust(8, '0')} ({length})")
+
+    def search_finished(self, thread: SearchThread):
+        if thread is not self.search_thread:
+            # Остановленный поиск, вместо которого уже запущен новый.
+            return
+
+        self.search_thread = None
+        self.stopper.setEnabled(self.task is not None)
+        if self.replacement is None or thread.cancel.is_set():
+            self.labelOp.setText(language_dict["searched"].replace("{}", str(len(self.search_hits))))
+            return
+
+        if self.hexView.locked or self.hexView.document.version != thread.document.version:
+            # Во время поиска байты менялись, и номера совпадений могли устареть.
+            self.labelOp.setText(language_dict["searchChanged"])
+            return
+
+        self.hexView.apply_edits([(offset, length, self.replacement) for offset, length in self.search_hits])
+        self.labelOp.setText(language_dict["replaced"].replace("{}", str(len(self.search_hits))))
+
+    def go_to_hit(self, item):
+        # Переход к совпадению и его выделение.
+        offset, length = self.search_hits[self.searchResults.row(item)]
+        self.hexView.select(offset, length)
+
+    def closeEvent(self, event):
+        # Перед закрытием окна останавливаются поиск, фоновая задача и подсчёт карты энтропии и сумм.
+        # Пока идёт сохранение, окно не закрывается.
+        if self.saving():
+            event.ignore()
+            return
+
+        self.stop()
+        self.stop_overview()
+        self.stop_checksums()
+        if self.compare_form is not None:
+            self.compare_form.close()
+        super().closeEvent(event)
+
+    def open_file_types_form(self):
+        # Открывается форма добавления типа файла в таблицу. Форма создаётся при первом открытии.
+        if self.types_form is None:
+            self.types_form = FileTypesForm(self, self.file_types)
+            if self.languages_form is not None:
+                self.types_form.connect_languages_form(self.languages_form)
+                self.languages_form.types_form = self.types_form
+        self.types_form.show()  # Открытие формы.
+
+    def open_languages_form(self):
+        # Открывается форма выбора языка. Форма создаётся при первом открытии.
+        if self.languages_form is None:
+            self.languages_form = LanguagesForm(self, self.types_form)
+            if self.types_form is not None:
+                self.types_form.connect_languages_form(self.languages_form)
+        self.languages_form.show()  # Открытие формы.
+
+    def open_compare_form(self):
+        # Открывается форма сравнения файлов. Форма создаётся при первом открытии.
+        if self.compare_form is None:
+            self.compare_form = CompareForm(self)
+        self.compare_form.show()  # Открытие формы.
+
+
+class FileTypesForm(QWidget):
+    def __init__(self, main=False, file_types=None):
+        super().__init__()
+        load_ui('types.ui', self)  # Загрузка интерфейса.
+        self.initUI()
+        self.main = main
+        self.file_types = file_types if file_types is not None else FileTypes()  # Реестр типов файлов.
+        self.languages_form = False
+
+    def connect_languages_form(self, lang):
+        self.languages_form = lang
+
+    def initUI(self):
+        # Установка параметров форме.
+
+        self.setGeometry(325, 125, 75, 175)
+
+        self.language_set()
+
+        self.add.clicked.connect(self.add_type)  # Кнопка "Добавить".
+        self.remove.clicked.connect(self.remove_type)  # Кнопка "Удалить".
+        self.lineEdit2.textChanged.connect(self.update_data)
+        self.spinBox.valueChanged.connect(self.update_data)
+        self.signatureEdit.textChanged.connect(self.update_data)
+        self.offsetBox.valueChanged.connect(self.update_data)
+        self.yes.clicked.connect(self.dialogue)  # Кнопка "Поменять значение" или "Подтвердить".
+        self.no.clicked.connect(self.dialogue)  # Кнопка "Отменить действие".
+        self.yes.hide()
+        self.no.hide()
+
+    def language_set(self):
+        # Присваивание языка интерфейсу.
+
+        self.setWindowTitle(language_dict["databaseTitle"])
+
+        self.labelEnd.setText(language_dict["labelEnd"])
+        self.add.setText(language_dict["add"])
+        self.remove.setText(language_dict["remove"])
+        self.lineEdit2.setPlaceholderText(language_dict["lineEdit"])
+        self.signatureEdit.setPlaceholderText(language_dict["signatureEdit"])
+        self.labelOffset.setText(language_dict["labelOffset"])
+        self.no.setText(language_dict["no"])
+
+        self.labelWarning.setText("")
+
+    def add_type(self):
+        # Добавление типа файла в БД.
+        try:
+            magic = self.signature()
+        except HexParseError:
+            return
+
+        try:
+            self.file_types.add(self.lineEdit2.text(), self.spinBox.value())  # Добавление типа файла.
+        except sqlite3.IntegrityError:
+            # Формат файла уже есть в БД.
+
+            # Заморозка некоторых кнопок.
+            self.add.setEnabled(False)
+            self.remove.setEnabled(False)
+            self.spinBox.setEnabled(False)
+            self.lineEdit2.setEnabled(False)
+            self.signatureEdit.setEnabled(False)
+            self.offsetBox.setEnabled(False)
+            if isinstance(self.languages_form, LanguagesForm):
+                self.languages_form.setEnabled(False)
+
+            # Показ диалоговых кнопок.
+            self.yes.setText(language_dict["yes"])
+
+            self.yes.show()
+            self.no.show()
+
+            # Оповещение о существовании типа файла в БД и его сигнатурах, которые заменит введённая.
+            warning = language_dict["labelAddError"]
+            signatures = self.file_types.signatures_of(self.lineEdit2.text())
+            if signatures:
+                warning += " " + language_dict["currentSignatures"].replace("{}", "; ".join(
+                    f"{offset}: {magic.hex(' ').upper()}" for offset, magic in signatures))
+            self.labelWarning.setText(warning)
+        else:
+            # Успешно добавлено.
+            if magic:
+                self.file_types.add_signature(self.lineEdit2.text(), self.offsetBox.value(), magic)
+            self.types_changed()
+            self.labelWarning.setText(language_dict["labelAdded"])
+
+    def signature(self):
+        """
+        :return bytes:
+        """
+
+        # Сигнатура из поля ввода. Если она записана неправильно, появляется оповещение.
+
+        try:
+            return parse_hex(self.signatureEdit.text())
+        except HexParseError as error:
+            self.labelWarning.setText(language_dict["invalidHex"].replace(
+                "{}", ", ".join(str(x) for x in error.positions[:10])))
+            raise
+
+    def remove_type(self):
+        # Заморозка некоторых кнопок.
+        self.add.setEnabled(False)
+        self.remove.setEnabled(False)
+        self.spinBox.setEnabled(False)
+        self.lineEdit2.setEnabled(False)
+        self.signatureEdit.setEnabled(False)
+        self.offsetBox.setEnabled(False)
+        if isinstance(self.languages_form, LanguagesForm):
+            self.languages_form.setEnabled(False)
+
+        # Показ диалоговых кнопок.
+        self.labelWarning.setText(language_dict["labelRemove"])
+        self.yes.setText(language_dict["yes2"])
+
+        self.yes.show()
+        self.no.show()
+
+    def types_changed(self):
+        # Перекраска заголовка в главном окне, если изменился открытый тип файла.
+        if isinstance(self.main, HEXEditor):
+            self.main.update_type()
+
+    def update_data(self):
+        # При смене параметров оповещение пропадает, а текстовая линия делает текст маленького регистра.
+        self.lineEdit2.setText(self.lineEdit2.text().lower())
+        self.labelWarning.setText("")
+
+    def dialogue(self):
+        if self.sender().text() == language_dict["yes"]:
+            self.file_types.update(self.lineEdit2.text(), self.spinBox.value())  # Обновление формата.
+            magic = parse_hex(self.signatureEdit.text())  # Сигнатура уже проверена в add_type().
+            if magic:
+                self.file_types.replace_signatures(self.lineEdit2.text(), self.offsetBox.value(), magic)
+            self.types_changed()
+
+            self.labelWarning.setText(language_dict["labelChanged"].replace("{}", self.lineEdit2.text()))
+
+        elif self.sender().text() == language_dict["yes2"]:
+            if self.file_types.remove(self.lineEdit2.text()):
+                # Успешно удалено.
+                self.types_changed()
+                self.labelWarning.setText(language_dict["labelRemoved"])
+            else:
+                # Оповещение о отсутствии типа файла в БД.
+                self.labelWarning.setText(language_dict["labelRemoveError"])
+        else:
+            # Возникает при нажатии кнопки "Отменить действие".
+            self.labelWarning.setText(language_dict["cancel"])
+
+        # Разморозка замороженных объектов.
+        self.add.setEnabled(True)
+        self.remove.setEnabled(True)
+        self.spinBox.setEnabled(True)
+        self.lineEdit2.setEnabled(True)
+        self.signatureEdit.setEnabled(True)
+        self.offsetBox.setEnabled(True)
+        if isinstance(self.languages_form, LanguagesForm):
+            self.languages_form.setEnabled(True)
+
+        # Скрытие диалоговых кнопок.
+        self.yes.hide()
+        self.no.hide()
+
+
+class CompareForm(QWidget):
+    # Форма сравнения двух файлов. Отличия ищутся в фоне функцией compare() и подсвечиваются
+    # в обеих таблицах. По отличиям можно переходить кнопками, а все отличия — сохранить
+    # патчем, превращающим первый файл во второй.
+
+    def __init__(self, main=False):
+        super().__init__()
+        load_ui('compare.ui', self)  # Загрузка интерфейса.
+        self.main = main
+        self.views = (self.firstView, self.secondView)  # Таблицы байтов файлов.
+        self.file_names = [None, None]  # Сравниваемые файлы.
+        self.differences = []  # Отличия: [(байт в первом файле, длина, байт во втором файле, длина), ...].
+        self.current = -1  # Номер выбранного отличия.
+        self.task = None  # Фоновое сравнение.
+        self.initUI()
+
+    def initUI(self):
+        # Установка параметров форме.
+
+        self.setGeometry(100, 75, 1400, 550)
+
+        self.language_set()
+
+        for view in self.views:
+            view.locked = True  # В форме сравнения файлы только просматриваются.
+            view.set_bytes_in_row(16)
+
+        self.firstFile.clicked.connect(lambda: self.open_file(0))  # Кнопка "Первый файл".
+        self.secondFile.clicked.connect(lambda: self.open_file(1))  # Кнопка "Второй файл".
+        self.stopper.clicked.connect(self.stop)  # Кнопка "Остановить".
+        self.previous.clicked.connect(lambda: self.go_to(self.current - 1))  # Кнопка "Предыдущее отличие".
+        self.next.clicked.connect(lambda: self.go_to(self.current + 1))  # Кнопка "Следующее отличие".
+        self.exporter.clicked.connect(self.export_patch)  # Кнопка "Сохранить патч".
+        self.update_buttons()
+
+    def language_set(self):
+        # Присваивание языка интерфейсу.
+
+        self.setWindowTitle(language_dict["compareTitle"])
+
+        self.firstFile.setText(language_dict["firstFile"])
+        self.secondFile.setText(language_dict["secondFile"])
+        self.stopper.setText(language_dict["stopper"])
+        self.previous.setText(language_dict["previous"])
+        self.next.setText(language_dict["next"])
+        self.exporter.setText(language_dict["exporter"])
+
+        self.labelDiff.setText("")
+
+    def open_file(self, side: int):
+        # Функция выбирает один из сравниваемых файлов. Когда выбраны оба, начинается сравнение.
+
+        file_name = QFileDialog.getOpenFileName(self, language_dict["chooseFile"], "")[0]
+
+        if not file_name:
+            # Пользователь нажал кнопку "Отмена".
+            self.labelDiff.setText(language_dict["cancel"])
+            return
+
+        self.load_file(side, file_name)
+
+    def load_file(self, side: int, file_name: str):
+        # Открытие файла. Документ только отображает файл в память, поэтому открывается сразу.
+        self.stop()
+
+        try:
+            document = Document.open(file_name)
+        except OSError as error:
+            self.labelDiff.setText(language_dict["taskError"].replace("{}", str(error)))
+            return
+
+        self.views[side].set_document(document)
+        self.file_names[side] = file_name
+        self.set_differences([])
+
+        if None not in self.file_names:
+            self.start_compare()
+
+    def start_compare(self):
+        # Сравнение идёт в отдельном потоке. Таблицы можно листать, пока оно не закончится.
+        first, second = (view.document for view in self.views)
+        self.start_task(Task(lambda cancel, progress: list(compare(first, second, cancel, progress)), len(first)),
+                        "comparing", self.compared)
+
+    def start_task(self, task: Task, message: str, done):
+        # Запуск фоновой задачи формы (сравнения или записи патча). Прошлая задача останавливается.
+        # Ход работы показывается в labelDiff текстом message, результат передаётся в done().
+        self.stop()
+        self.task = task
+
+        task.progress.connect(lambda percent: self.labelDiff.setText(
+            language_dict[message].replace("{}", str(percent))))
+        task.done.connect(lambda result: task is self.task and done(result))
+        task.failed.connect(lambda error: task is self.task and self.labelDiff.setText(
+            language_dict["taskError"].replace("{}", str(error))))
+        task.finished.connect(lambda: self.task_finished(task))
+        self.stopper.setEnabled(True)
+        self.update_buttons()
+        task.start()
+
+    def task_finished(self, task: Task):
+        if task is not self.task:
+            return
+
+        if task.cancel.is_set():
+            self.labelDiff.setText(language_dict["cancel"])
+        self.task = None
+        self.stopper.setEnabled(False)
+        self.update_buttons()
+
+    def stop(self):
+        # Остановка сравнения.
+        cancel_task(self, "task")
+
+    def compared(self, differences: list):
+        self.set_differences(differences)
+        self.labelDiff.setText(language_dict["compared"].replace("{}", str(len(differences))))
+        if differences:
+            self.go_to(0)
+
+    def set_differences(self, differences: list):
+        # Отличия подсвечиваются в обеих таблицах. Вставка или удаление подсвечивает
+        # в другом файле один байт — место, где данных не хватает.
+        self.differences = differences
+        self.current = -1
+
+        for side, view in enumerate(self.views):
+            marked = DirtyRanges()
+            for difference in differences:
+                offset, length = difference[side * 2], difference[side * 2 + 1]
+                marked.add(offset, offset + max(length, 1))
+            view.set_marked(marked)
+
+        self.update_buttons()
+
+    def go_to(self, number: int):
+        # Переход к отличию: оно выделяется и показывается в обеих таблицах.
+        if not 0 <= number < len(self.differences):
+            return
+
+        self.current = number
+        difference = self.differences[number]
+        for side, view in enumerate(self.views):
+            view.select(difference[side * 2], difference[side * 2 + 1])
+
+        self.labelDiff.setText(language_dict["difference"].replace("{}", "%d/%d" % (number + 1,
+                                                                                    len(self.differences))))
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous.setEnabled(self.current > 0)
+        self.next.setEnabled(self.current + 1 < len(self.differences))
+        self.exporter.setEnabled(bool(self.differences) and self.task is None)
+
+    def export_patch(self):
+        # Функция сохраняет отличия патчем (в файл .ips — в формате IPS): применённый к первому файлу,
+        # он даёт второй.
+        file_name = QFileDialog.getSaveFileName(self, language_dict["saveFile"], "")[0]
+
+        if not file_name:
+            # Пользователь нажал кнопку "Отмена".
+            self.labelDiff.setText(language_dict["cancel"])
+            return
+
+        # Патч пишется в отдельном потоке: на больших файлах отличия читаются долго.
+        first, second = (view.document for view in self.views)
+        differences = self.differences
+        exported = language_dict["exported"].replace("{}", file_name)
+        self.start_task(Task(lambda cancel, progress: save_patch(
+            file_name, diff_edits(first, second, differences, cancel, progress), second, len(first)), len(first)),
+            "saving", lambda result: self.labelDiff.setText(exported))
+
+    def closeEvent(self, event):
+        self.stop()
+        super().closeEvent(event)
+
+
+class LanguagesForm(QWidget):
+
+    def __init__(self, main=False, types_form=False):
+        super().__init__()
+        load_ui('languages.ui', self)  # Загрузка интерфейса.
+        self.initUI()
+        self.main = main
+        self.types_form = types_form
+
+    def initUI(self):
+        # Установка параметров форме.
+
+        global language
+
+        self.setGeometry(350, 150, 400, 100)
+        self.setWindowTitle(language_dict["languageTitle"])
+
+        # Устанавливание состояния кнопок
+        if language == "ru":
+            self.russian.checkStateSet()
+        elif language == "en":
+            self.english.checkStateSet()
+
+        self.russian.clicked.connect(self.switch_language)
+        self.english.clicked.connect(self.switch_language)
+
+    def switch_language(self):
+        # Смена языка
+
+        global language, language_dict
+
+        if self.sender().text() == "Русский":
+            language = "ru"
+        elif self.sender().text() == "English":
+            language = "en"
+        language_dict = set_language(language)
+        self.setWindowTitle(language_dict["languageTitle"])
+        if isinstance(self.main, HEXEditor):
+            self.main.language_set()
+        if isinstance(self.types_form, FileTypesForm):
+            self.types_form.language_set()
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    ex = HEXEditor(app)
+    ex.show()
+    if len(app.arguments()) > 1:
+        # Файл из командной строки: python hex.py файл.
+        ex.load_file(app.arguments()[1])
+    sys.exit(app.exec())
@@ -0,0 +1,2685 @@
+import argparse
+import ast
+import json
+import math
+import sys
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache
+from itertools import repeat
+import hashlib
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import tempfile
+import zlib
+
+
+class PatchError(Exception):
+    pass
+
+
+class Cancelled(Exception):
+    pass
+
+
+class HexParseError(ValueError):
+    def __init__(self, message: str, positions: list):
+        super().__init__(message)
+        self.positions = positions  # Номера неправильных символов в исходном тексте.
+
+
+# Разделители между байтами превращаются в пробелы.
+HEX_SEPARATORS = bytes.maketrans(b",;:_|-\t\n\r\v\f", b" " * 11)
+# Группы символов между разделителями — для поиска ошибок.
+HEX_GROUPS = re.compile(r"[^\s,;:_|-]+")
+HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+
+def parse_hex(text: str):
+    """
+    :param text:
+    :return bytes:
+    """
+
+    # Функция переводит шестнадцатиричную запись любой длины в байты, например, "0x1f, 0x8b" или "1F 8B 08".
+    # Пропускаются пробелы, префиксы 0x и разделители ,;:_|-. Цифры читаются парами внутри каждой группы
+    # между разделителями: одна цифра дополняется нулём ("0x1, 0x2" — 01 02), а группа из нечётного кол-ва
+    # цифр — ошибка (цифры соседних групп не склеиваются).
+    # Если в записи есть ошибки, вызывается HexParseError с номерами неправильных символов.
+
+    try:
+        # Все шаги выполняются над всей записью сразу: translate и replace работают без цикла в Python.
+        # Префикс 0x считается префиксом, только если стоит в начале или после разделителя.
+        # bytes.fromhex() пропускает пробелы только между парами цифр, поэтому группа из нечётного
+        # кол-ва цифр — ошибка. Тогда группы из одной цифры дополняются нулём (zfill не меняет
+        # более длинные группы), и запись читается ещё раз.
+        digits = b" " + text.encode("ascii").translate(HEX_SEPARATORS)
+        digits = digits.replace(b" 0x", b" ").replace(b" 0X", b" ").decode("ascii")
+        try:
+            return bytes.fromhex(digits)
+        except ValueError:
+            groups = digits.split()
+            return bytes.fromhex(" ".join(map(str.zfill, groups, repeat(2, len(groups)))))
+    except ValueError:
+        # UnicodeEncodeError тоже наследуется от ValueError.
+        pass
+
+    # Ошибки ищутся по группам: неправильные символы и начала групп с нечётным кол-вом цифр.
+    positions = []
+    for group in HEX_GROUPS.finditer(text):
+        start, digits = group.start(), group.group()
+        if digits[:2] in ("0x", "0X"):
+            start, digits = start + 2, digits[2:]
+        wrong = [start + index for index, char in enumerate(digits) if char not in HEX_DIGITS]
+        positions.extend(wrong or ([start] if len(digits) % 2 and len(digits) > 1 else []))
+
+    raise HexParseError(f"Invalid hexadecimal input at positions {positions[:10]}", positions)
+
+
+class Signatures:
+    # Сигнатуры (магические числа) типов файлов. Для каждого номера байта, с которого начинаются сигнатуры,
+    # строится префиксное дерево, поэтому все сигнатуры проверяются за один проход по началу файла.
+    # Сигнатуры одного типа с одинаковым номером байта — варианты (подходит любая),
+    # с разными номерами — части одной сигнатуры (должны подойти все).
+
+    def __init__(self, rows=()):
+        self.tries = {}  # Номер байта -> префиксное дерево: байт -> поддерево, None -> типы файлов.
+        self.required = {}  # Тип файла -> номера байтов, с которых начинаются его сигнатуры.
+        self.length = 0  # Сколько байтов от начала файла нужно для проверки.
+
+        for file_type, offset, magic in rows:
+            node = self.tries.setdefault(offset, {})
+            for byte in magic:
+                node = node.setdefault(byte, {})
+            node.setdefault(None, []).append((file_type, len(magic)))
+
+            self.required.setdefault(file_type, set()).add(offset)
+            self.length = max(self.length, offset + len(magic))
+
+    def detect(self, head: bytes):
+        """
+        :param head:
+        :return str:
+        """
+
+        # Определение типа файла по первым байтам. Если подходит несколько типов,
+        # выбирается тип с самыми длинными сигнатурами. Возвращается None, если тип не найден.
+
+        found = {}  # Тип файла -> (номера подошедших байтов, длина подошедших сигнатур).
+
+        for offset, node in self.tries.items():
+            for byte in head[offset:offset + self.length]:
+                node = node.get(byte)
+                if node is None:
+                    break
+                for file_type, length in node.get(None, ()):
+                    offsets, total = found.get(file_type, (set(), 0))
+                    offsets.add(offset)
+                    found[file_type] = (offsets, total + length)
+
+        matched = [(total, file_type) for file_type, (offsets, total) in found.items()
+                   if offsets == self.required[file_type]]
+        if not matched:
+            return None
+        return max(matched)[1]
+
+
+class FileTypes:
+    # Реестр типов файлов. Таблицы file_types и signatures читаются из БД один раз при запуске,
+    # дальше поиск идёт по словарю и префиксным деревьям. Изменения пишутся в БД через одно
+    # постоянное подключение и сразу же попадают в память.
+
+    def __init__(self, file_name="file_types.sqlite"):
+        self.data_base = sqlite3.connect(file_name)  # Подключение к БД.
+        self.data_base.execute('''
+            CREATE TABLE IF NOT EXISTS signatures (
+                id INTEGER PRIMARY KEY,
+                type TEXT NOT NULL,
+                offset INT NOT NULL,
+                magic BLOB NOT NULL
+            )
+            ''')  # Таблица сигнатур появилась позже таблицы типов.
+        self.header_ends = {}  # Тип файла -> конечный байт заголовка.
+        self.signatures = Signatures()  # Сигнатуры типов файлов.
+        self.reload()
+
+    def reload(self):
+        # Перечитывание таблиц из БД.
+        self.header_ends = dict(self.data_base.execute('''
+            SELECT type, header_end FROM file_types
+            ''').fetchall())
+        self.signatures = Signatures(self.data_base.execute('''
+            SELECT type, offset, magic FROM signatures
+            ''').fetchall())
+
+    def detect(self, document):
+        """
+        :param document:
+        :return str:
+        """
+
+        # Определение типа файла по сигнатуре. Читается только начало документа.
+
+        return self.signatures.detect(document.read(0, self.signatures.length))
+
+    def add_signature(self, file_type: str, offset: int, magic: bytes):
+        # Добавление сигнатуры типу файла. Если у типа уже есть такая сигнатура, ничего не меняется.
+        with self.data_base:
+            self.data_base.execute('''
+                INSERT INTO signatures (type, offset, magic)
+                SELECT ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM signatures WHERE type = ? AND offset = ? AND magic = ?)
+                ''', (file_type, offset, magic) * 2)
+        self.reload()
+
+    def signatures_of(self, file_type: str):
+        """
+        :param file_type:
+        :return list:
+        """
+
+        # Сигнатуры типа файла: список (номер байта, байты) по возрастанию номера байта.
+
+        return self.data_base.execute('''
+            SELECT offset, magic FROM signatures
+            WHERE type = ?
+            ORDER BY offset, id
+            ''', (file_type,)).fetchall()
+
+    def replace_signatures(self, file_type: str, offset: int, magic: bytes):
+        # Замена всех сигнатур типа файла одной (например, чтобы исправить ошибочно введённую).
+        with self.data_base:
+            self.data_base.execute('''
+                DELETE FROM signatures
+                WHERE type = ?
+                ''', (file_type,))
+            self.data_base.execute('''
+                INSERT INTO signatures (type, offset, magic)
+                VALUES(?, ?, ?)
+                ''', (file_type, offset, magic))
+        self.reload()
+
+    def close(self):
+        self.data_base.close()
+
+    def __contains__(self, file_type: str):
+        return file_type in self.header_ends
+
+    def header_end(self, file_type: str):
+        """
+        :param file_type:
+        :return int:
+        """
+
+        # Конечный байт заголовка типа файла или -1, если типа нет в базе.
+
+        return self.header_ends.get(file_type, -1)
+
+    def add(self, file_type: str, header_end: int):
+        # Добавление типа файла. Если тип уже есть, вызывается sqlite3.IntegrityError.
+        with self.data_base:
+            self.data_base.execute('''
+                INSERT INTO file_types
+                VALUES((SELECT COALESCE(MAX(id), 0) + 1 FROM file_types), ?, ?)
+                ''', (file_type, header_end))
+        self.header_ends[file_type] = header_end
+
+    def update(self, file_type: str, header_end: int):
+        # Смена конечного байта заголовка.
+        with self.data_base:
+            self.data_base.execute('''
+                UPDATE file_types
+                SET header_end = ?
+                WHERE type = ?
+                ''', (header_end, file_type))
+        if file_type in self.header_ends:
+            self.header_ends[file_type] = header_end
+
+    def remove(self, file_type: str):
+        """
+        :param file_type:
+        :return bool:
+        """
+
+        # Удаление типа файла. Возвращается False, если такого типа нет в базе.
+
+        id_of_type = self.data_base.execute('''
+            SELECT id FROM file_types
+            WHERE type = ?
+            ''', (file_type,)).fetchone()  # Узнавание ID типа файла в БД.
+
+        if id_of_type is None:
+            return False
+
+        with self.data_base:
+            self.data_base.execute('''
+                DELETE FROM file_types
+                WHERE type = ?
+                ''', (file_type,))
+            self.data_base.execute('''
+                DELETE FROM signatures
+                WHERE type = ?
+                ''', (file_type,))
+            self.data_base.execute('''
+                UPDATE file_types
+                SET id = id - 1
+                WHERE id > ?
+                ''', id_of_type)  # Переписываем ID послестоящих типов файлов.
+        self.reload()
+
+        return True
+
+
+SEARCH_CHUNK = 1 << 22  # Размер куска при поиске.
+SEARCH_OVERLAP = 1 << 12  # Перекрытие кусков для регулярных выражений, у которых длина совпадения неизвестна.
+
+
+class SearchPattern:
+    # Шаблон поиска. Точная последовательность байтов ищется через bytes.find(),
+    # всё остальное (шаблоны с ?? и регулярные выражения) — через re.
+
+    def __init__(self, literal=None, regex=None, length=SEARCH_OVERLAP):
+        self.literal = literal  # Точная последовательность байтов.
+        self.regex = regex  # Скомпилированное регулярное выражение над байтами.
+        self.length = length  # Самая большая длина совпадения (для перекрытия кусков).
+
+    def finditer(self, data: bytes, limit: int):
+        # Поочерёдная выдача непересекающихся совпадений (начало, конец), начинающихся раньше limit.
+        if self.literal is not None:
+            start = data.find(self.literal, 0, limit + len(self.literal) - 1)
+            while start >= 0:
+                yield start, start + len(self.literal)
+                start = data.find(self.literal, start + len(self.literal), limit + len(self.literal) - 1)
+            return
+
+        for match in self.regex.finditer(data):
+            if match.start() >= limit:
+                break
+            if match.end() > match.start():
+                # Пустые совпадения регулярного выражения пропускаются.
+                yield match.start(), match.end()
+
+
+def compile_pattern(text: str, mode: str):
+    """
+    :param text:
+    :param mode:
+    :return SearchPattern:
+    """
+
+    # Шаблон поиска из текста. Режимы:
+    # hex — шестнадцатиричные байты, ?? — любой байт (например, "4D 5A ?? 00");
+    # ascii и utf-16 — строка в кодировке ASCII или UTF-16 (LE);
+    # regex — регулярное выражение над байтами (символы \x00-\xff записываются как есть).
+    # Ошибки: HexParseError, UnicodeEncodeError или re.error (все — ValueError или re.error).
+
+    if mode == "hex":
+        parts = [parse_hex(part) for part in text.split("??")]
+        if len(parts) == 1:
+            literal = parts[0]
+        else:
+            literal = None
+            regex = re.compile(b"(?s)" + b".".join(re.escape(part) for part in parts))
+        length = sum(len(part) for part in parts) + len(parts) - 1
+    elif mode == "ascii":
+        literal = text.encode("ascii")
+        length = len(literal)
+    elif mode == "utf-16":
+        literal = text.encode("utf-16-le")
+        length = len(literal)
+    elif mode == "regex":
+        return SearchPattern(regex=re.compile(text.encode("latin-1"), re.DOTALL))
+    else:
+        raise ValueError(f"Unknown search mode {mode}")
+
+    if literal is not None:
+        if not literal:
+            raise ValueError("Empty search pattern")
+        return SearchPattern(literal=literal, length=length)
+    return SearchPattern(regex=regex, length=length)
+
+
+def search(document, pattern: SearchPattern, start=0, end=None, cancel=None, progress=None):
+    # Поиск совпадений (номер байта, длина) в документе. Документ читается кусками по SEARCH_CHUNK байтов
+    # с перекрытием в длину шаблона, поэтому совпадения на стыке кусков не теряются.
+    # cancel — threading.Event для остановки, progress(номер байта) вызывается после каждого куска.
+    end = len(document) if end is None else min(end, len(document))
+    position = start
+
+    while position < end:
+        if cancel is not None and cancel.is_set():
+            return
+
+        # Совпадение должно начаться раньше end, но может заканчиваться и после него.
+        limit = min(SEARCH_CHUNK, end - position)
+        data = document.read(position, limit + pattern.length)
+        next_position = position + limit
+
+        for match_start, match_end in pattern.finditer(data, limit):
+            yield position + match_start, match_end - match_start
+            # Следующий кусок начинается после совпадения, залезшего в перекрытие.
+            next_position = max(next_position, position + match_end)
+
+        position = next_position
+        if progress is not None:
+            progress(position)
+
+
+def compile_replacement(text: str, mode: str):
+    """
+    :param text:
+    :param mode:
+    :return bytes:
+    """
+
+    # Байты замены из текста в том же режиме, что и шаблон поиска (в режиме hex без ??).
+    # Пустой текст — совпадения удаляются.
+
+    if mode == "hex":
+        return parse_hex(text)
+    if mode == "ascii":
+        return text.encode("ascii")
+    if mode == "utf-16":
+        return text.encode("utf-16-le")
+    if mode == "regex":
+        return text.encode("latin-1")
+    raise ValueError(f"Unknown search mode {mode}")
+
+
+PARALLEL_RANGE = 1 << 26  # Размер промежутка файла, который просматривает один процесс.
+
+
+def find_range(file_name: str, start: int, end: int, pattern: SearchPattern):
+    """
+    :param file_name:
+    :param start:
+    :param end:
+    :param pattern:
+    :return list:
+    """
+
+    # Поиск совпадений, начинающихся в промежутке [start, end) файла. Выполняется в отдельном процессе:
+    # процесс сам отображает в память только свой промежуток с перекрытием в длину шаблона,
+    # поэтому байты файла между процессами не передаются.
+
+    with open(file_name, mode="rb") as the_file:
+        base = start - start % mmap.ALLOCATIONGRANULARITY  # Начало отображения должно быть выровнено.
+        size = min(end + pattern.length, os.fstat(the_file.fileno()).st_size) - base
+        with mmap.mmap(the_file.fileno(), size, access=mmap.ACCESS_READ, offset=base) as mapped:
+            document = Document()
+            document._load(mapped)
+            return [(base + offset, length) for offset, length in search(document, pattern, start - base, end - base)]
+
+
+def resync(document, pattern: SearchPattern, position: int, hits: list, end: int):
+    """
+    :param document:
+    :param pattern:
+    :param position:
+    :param hits:
+    :param end:
+    :return list:
+    """
+
+    # Процесс ищет с начала своего промежутка, а последовательный поиск продолжил бы с конца совпадения,
+    # залезшего в этот промежуток из прошлого. Тогда совпадения ищутся заново с position,
+    # пока не встретится совпадение из hits: после него результаты обоих поисков одинаковы.
+
+    if not hits or hits[0][0] >= position:
+        return hits
+
+    numbers = {hit: number for number, hit in enumerate(hits)}
+    result = []
+    for hit in search(document, pattern, position, end):
+        if hit in numbers:
+            return result + hits[numbers[hit]:]
+        result.append(hit)
+    return result
+
+
+def find_all(document, pattern: SearchPattern, cancel=None, progress=None, workers=None):
+    # Поиск всех совпадений (номер байта, длина) на нескольких ядрах. Файл делится на промежутки
+    # по PARALLEL_RANGE байтов, и каждый просматривается отдельным процессом (find_range).
+    # Совпадения выдаются по порядку и совпадают с результатом search().
+    # Изменённый или не связанный с файлом документ, а также небольшой файл, просматриваются search().
+    if workers is None:
+        workers = os.cpu_count() or 1
+    length = len(document)
+    if workers < 2 or length < 2 * PARALLEL_RANGE or not document.unchanged():
+        yield from search(document, pattern, cancel=cancel, progress=progress)
+        return
+
+    bounds = list(range(0, length, PARALLEL_RANGE)) + [length]
+    # Процессы запускаются заново (spawn): копировать потоки Qt через fork нельзя.
+    executor = ProcessPoolExecutor(min(workers, len(bounds) - 1), mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = [executor.submit(find_range, document.file_name, start, end, pattern)
+                   for start, end in zip(bounds, bounds[1:])]
+
+        position = 0  # Конец последнего выданного совпадения.
+        for future, end in zip(futures, bounds[1:]):
+            while not future.done():
+                if cancel is not None and cancel.is_set():
+                    return
+                wait([future], timeout=0.1)
+
+            hits = resync(document, pattern, position, future.result(), end)
+            if hits:
+                position = hits[-1][0] + hits[-1][1]
+            yield from hits
+
+            if progress is not None:
+                progress(end)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def replace_all(document, pattern: SearchPattern, data: bytes, cancel=None, progress=None, workers=None):
+    """
+    :param document:
+    :param pattern:
+    :param data:
+    :param cancel:
+    :param progress:
+    :param workers:
+    :return int:
+    """
+
+    # Замена всех совпадений на data одной пачкой правок. Возвращается кол-во замен.
+    # Если поиск остановлен, документ не меняется.
+
+    edits = [(offset, length, data) for offset, length in find_all(document, pattern, cancel, progress, workers)]
+    if cancel is not None and cancel.is_set():
+        return 0
+
+    document.apply_edits(edits)
+    return len(edits)
+
+
+def row_label(row: int, bytes_in_row: int):
+    """
+    :param row:
+    :param bytes_in_row:
+    :return str:
+    """
+
+    # Наименование строки.
+
+    if bytes_in_row > 1:
+        # Промежутками шестнадцатиричных чисел, если значение из спин-бокса больше, чем 1.
+        return f"{hex(row * bytes_in_row)[2:].rjust(2, '0')}-" + \
+               f"{hex(row * bytes_in_row + bytes_in_row - 1)[2:].rjust(2, '0')}"
+    # Шестнадцатиричными числами.
+    return hex(row)[2:].upper()
+
+
+# Таблица преобразования байтов в видимые основные символы ASCII. Остальные байты становятся точкой.
+ASCII_TABLE = bytes(x if 0x20 <= x < 0x7f else ord(".") for x in range(256))
+
+
+def render_rows(data: bytes, bytes_in_row: int):
+    """
+    :param data:
+    :param bytes_in_row:
+    :return list:
+    """
+
+    # Преобразование сразу нескольких строк байтов в шестнадцатиричные клетки и символы ASCII.
+    # Весь промежуток переводится за один вызов bytes.hex() и bytes.translate(), а потом режется на строки.
+    # Это единственное место, где байты превращаются в текст: его используют таблица, виджет-список и выгрузка.
+
+    cells = data.hex(" ").split(" ") if data else []
+    text = data.translate(ASCII_TABLE).decode("ascii")
+
+    return [(cells[start:start + bytes_in_row], text[start:start + bytes_in_row])
+            for start in range(0, len(data), bytes_in_row)]
+
+
+def dump(document, bytes_in_row=16, offset=0, size=None):
+    # Выгрузка документа текстом: заголовок строки, шестнадцатиричные клетки и символы ASCII.
+    # Строки переводятся пачками по RENDER_ROWS штук.
+    end = len(document) if size is None else min(offset + size, len(document))
+    row = offset // bytes_in_row
+
+    for start in range(row * bytes_in_row, end, bytes_in_row * RENDER_ROWS):
+        data = document.read(start, min(bytes_in_row * RENDER_ROWS, end - start))
+        for cells, text in render_rows(data, bytes_in_row):
+            yield f"{row_label(row, bytes_in_row)}\t{' '.join(cells)}\t{text}"
+            row += 1
+
+
+RENDER_ROWS = 64  # Кол-во строк, переводимых в текст за один раз.
+PAGE_CACHE_BUDGET = 1 << 26  # Сколько байтов памяти может занимать кэш страниц всех открытых документов.
+
+
+class PageCache:
+    # Кэш страниц с общим для всех владельцев (например, таблиц байтов во вкладках) ограничением памяти.
+    # Страница — значение с ключом (владелец, номер) и примерным размером в байтах. Если размер всех страниц
+    # больше budget, вытесняются страницы, к которым дольше всего не обращались (LRU), у любого владельца.
+    # Поэтому память не растёт с кол-вом открытых документов. Для настройки есть счётчики (stats()).
+
+    def __init__(self, budget=PAGE_CACHE_BUDGET):
+        self.budget = budget
+        self.resident = 0  # Сколько байтов занимают страницы.
+        self.hits = 0  # Страница нашлась в кэше.
+        self.misses = 0  # Страницу пришлось создать.
+        self.evictions = 0  # Страница вытеснена из-за нехватки места.
+        self._pages = OrderedDict()  # (владелец, номер) -> (страница, размер). В начале — давно не нужные.
+        self._owners = {}  # Владелец -> номера его страниц.
+
+    def get(self, owner, number: int, load):
+        """
+        :param owner:
+        :param number:
+        :param load:
+        :return object:
+        """
+
+        # Страница владельца owner. Если её нет, она создаётся вызовом load() -> (страница, размер).
+
+        key = owner, number
+        if key in self._pages:
+            self.hits += 1
+            self._pages.move_to_end(key)
+            return self._pages[key][0]
+
+        self.misses += 1
+        page, size = load()
+        self._pages[key] = page, size
+        self._owners.setdefault(owner, set()).add(number)
+        self.resident += size
+        while self.resident > self.budget and len(self._pages) > 1:
+            self.evictions += 1
+            self._remove(*next(iter(self._pages)))
+        return page
+
+    def _remove(self, owner, number: int):
+        self.resident -= self._pages.pop((owner, number))[1]
+        numbers = self._owners[owner]
+        numbers.discard(number)
+        if not numbers:
+            del self._owners[owner]
+
+    def discard(self, owner, predicate=None):
+        # Удаление страниц владельца: всех или тех, номер которых подходит под predicate (например, изменённых).
+        for number in list(self._owners.get(owner, ())):
+            if predicate is None or predicate(number):
+                self._remove(owner, number)
+
+    def stats(self):
+        """
+        :return dict:
+        """
+
+        # Счётчики для настройки размера кэша.
+
+        requests = self.hits + self.misses
+        return {"pages": len(self._pages), "owners": len(self._owners), "resident": self.resident,
+                "budget": self.budget, "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0}
+
+
+class DirtyRanges:
+    # Промежутки изменённых байтов [начало, конец), отсортированные и без пересечений.
+    # Соседние и пересекающиеся промежутки склеиваются.
+
+    def __init__(self):
+        self._starts = []
+        self._ends = []
+
+    def add(self, start: int, end: int):
+        # Добавление промежутка.
+        if start >= end:
+            return
+
+        first = bisect_left(self._ends, start)
+        last = bisect_right(self._starts, end)
+        if first < last:
+            start = min(start, self._starts[first])
+            end = max(end, self._ends[last - 1])
+
+        self._starts[first:last] = [start]
+        self._ends[first:last] = [end]
+
+    def clear(self):
+        self._starts = []
+        self._ends = []
+
+    def __iter__(self):
+        return iter(list(zip(self._starts, self._ends)))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __contains__(self, offset: int):
+        # Попадает ли байт в один из промежутков.
+        index = bisect_right(self._starts, offset) - 1
+        return index >= 0 and offset < self._ends[index]
+
+    def overlapping(self, start: int, end: int):
+        # Промежутки, пересекающиеся с [start, end), обрезанные по его краям.
+        for index in range(max(bisect_right(self._ends, start), 0), bisect_left(self._starts, end)):
+            yield max(self._starts[index], start), min(self._ends[index], end)
+
+
+class DocumentListener:
+    # Примесь для объектов, которые следят за правками одного документа через трекер self.changes
+    # (DirtyRanges): карты энтропии, контрольных сумм, дерева шаблона. Объект сам создаёт self.changes
+    # и self.document = None. attach() подключает трекер к другому документу и отключает от прежнего,
+    # поэтому при смене документа трекеры не копятся.
+
+    def attach(self, document):
+        if self.document is not None and self.changes in self.document.trackers:
+            self.document.trackers.remove(self.changes)
+        self.document = document
+        self.changes.clear()
+        document.trackers.append(self.changes)
+
+
+HISTORY_LIMIT = 1 << 26  # Сколько байтов памяти может занимать история правок.
+SPAN_COST = 64  # Примерный размер одного куска в истории (кортеж и три числа).
+ENTRY_COST = 256  # Примерный размер одной правки в истории без кусков.
+
+
+def span_length(spans: list):
+    """
+    :param spans:
+    :return int:
+    """
+
+    # Кол-во байтов в кусках (буфер, начало, длина).
+
+    return sum(span[2] for span in spans)
+
+
+class History:
+    # История правок для отмены и повтора. Правка хранится как (номер байта, куски до, куски после):
+    # куски ссылаются на исходный файл и буфер добавленных байтов, которые не меняются,
+    # поэтому байты не копируются. Подряд набранные байты склеиваются в одну правку,
+    # а самые старые правки забываются, когда история занимает больше limit байтов.
+
+    def __init__(self, limit=HISTORY_LIMIT):
+        self.limit = limit  # Предел памяти истории.
+        self.size = 0  # Примерная память, занятая историей.
+        self._undo = deque()  # Правки, которые можно отменить.
+        self._redo = []  # Отменённые правки, которые можно повторить.
+
+    @staticmethod
+    def cost(entry: tuple):
+        # Примерная память, занятая правкой.
+        return ENTRY_COST + (len(entry[1]) + len(entry[2])) * SPAN_COST
+
+    @staticmethod
+    def typed(entry: tuple, offset: int, old: list, new: list):
+        """
+        :param entry:
+        :param offset:
+        :param old:
+        :param new:
+        :return bool:
+        """
+
+        # Правка — замена одного байта сразу за прошлой заменой (набор байтов подряд).
+
+        last_offset, last_old, last_new = entry
+        return span_length(old) == span_length(new) == 1 and span_length(last_old) == span_length(last_new) \
+            and offset == last_offset + span_length(last_new)
+
+    @staticmethod
+    def retyped(entry: tuple, offset: int, old: list, new: list):
+        """
+        :param entry:
+        :param offset:
+        :param old:
+        :param new:
+        :return bool:
+        """
+
+        # Правка — новая замена последнего заменённого байта (например, вторая цифра байта).
+
+        last_offset, last_old, last_new = entry
+        return span_length(old) == span_length(new) == 1 and span_length(last_old) == span_length(last_new) > 0 \
+            and offset == last_offset + span_length(last_new) - 1
+
+    def record(self, offset: int, old: list, new: list):
+        # Запись правки. Отменённые правки после новой правки повторить уже нельзя.
+        if not old and not new:
+            return
+        self._redo.clear()
+
+        if self._undo and self.typed(self._undo[-1], offset, old, new):
+            # Байт набран сразу после прошлого — правки склеиваются.
+            last_offset, last_old, last_new = self._undo.pop()
+            self.size -= self.cost((last_offset, last_old, last_new))
+            offset, old, new = last_offset, last_old + old, last_new + new
+        elif self._undo and self.retyped(self._undo[-1], offset, old, new):
+            # Последний байт набран заново — в правке меняется только он, а старый байт остаётся прежним.
+            last_offset, last_old, last_new = self._undo.pop()
+            self.size -= self.cost((last_offset, last_old, last_new))
+            kind, start, count = last_new[-1]
+            offset, old, new = last_offset, last_old, last_new[:-1] + [(kind, start, count - 1)] * (count > 1) + new
+
+        self._undo.append((offset, old, new))
+        self.size += self.cost(self._undo[-1])
+
+        while self.size > self.limit and len(self._undo) > 1:
+            # Забываются самые старые правки.
+            self.size -= self.cost(self._undo.popleft())
+
+    def peek(self, redo=False):
+        # Правка, которая будет отменена (или повторена), без извлечения. None — правок нет.
+        stack = self._redo if redo else self._undo
+        return stack[-1] if stack else None
+
+    def undo(self):
+        # Извлечение правки для отмены (или None). Она переходит в историю повторов.
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self.size -= self.cost(entry)
+        self._redo.append(entry)
+        return entry
+
+    def redo(self):
+        # Извлечение правки для повтора (или None). Она возвращается в историю отмен.
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        self.size += self.cost(entry)
+        return entry
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.size = 0
+
+
+ENTROPY_BLOCK = 1 << 16  # Размер блока карты энтропии.
+ENTROPY_BATCH = 4096  # Сколько блоков считается за один заход (карта заполняется по частям).
+numpy = None  # Модуль NumPy (False — не установлен). Загружается при первом подсчёте, см. load_numpy().
+
+
+def load_numpy():
+    """
+    :return module:
+    """
+
+    # NumPy необязателен и загружается только при первом подсчёте гистограммы, чтобы не замедлять запуск.
+    # Без него гистограммы считаются медленнее.
+
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:
+            module = False
+        numpy = module
+    return numpy
+
+
+def byte_histogram(data: bytes):
+    """
+    :param data:
+    :return list:
+    """
+
+    # Гистограмма байтов: сколько раз встречается каждое из 256 значений.
+    # С NumPy считается одним вызовом bincount, без него — 256 проходами bytes.count.
+
+    if load_numpy():
+        return numpy.bincount(numpy.frombuffer(data, dtype=numpy.uint8), minlength=256)
+    return [data.count(value) for value in range(256)]
+
+
+def shannon_entropy(histogram, size: int):
+    """
+    :param histogram:
+    :param size:
+    :return float:
+    """
+
+    # Энтропия Шеннона в битах на байт: 0 — все байты одинаковые, около 8 — сжатые или зашифрованные данные.
+
+    if not size:
+        return 0.0
+    if load_numpy():
+        counts = numpy.asarray(histogram)
+        probabilities = counts[counts > 0] / size
+        return abs(float((probabilities * numpy.log2(probabilities)).sum()))
+    return abs(sum(count / size * math.log2(count / size) for count in histogram if count))
+
+
+class EntropyMap(DocumentListener):
+    # Карта документа по блокам block_size байтов: гистограмма байтов и энтропия каждого блока.
+    # Блоки считаются в фоне по частям (compute() не меняет карту, результат передаётся в update()).
+    # Трекер changes подключается к документу, поэтому после правки пересчитываются только
+    # задетые блоки (если байты сдвинулись — все блоки от правки до конца).
+
+    def __init__(self, block_size=ENTROPY_BLOCK):
+        self.block_size = block_size
+        self.histograms = {}  # Номер блока -> гистограмма.
+        self.entropies = {}  # Номер блока -> энтропия.
+        self.changes = DirtyRanges()  # Изменённые промежутки документа.
+        self.document = None
+
+    def attach(self, document):
+        # Новая карта для другого документа.
+        super().attach(document)
+        self.histograms.clear()
+        self.entropies.clear()
+
+    def blocks(self, length: int):
+        # Кол-во блоков в документе длины length.
+        return -(-length // self.block_size)
+
+    def invalidate(self):
+        # Забываются блоки, задетые правками. Перебираются только номера блоков каждого промежутка.
+        for start, end in self.changes:
+            for block in range(start // self.block_size, (end - 1) // self.block_size + 1):
+                self.histograms.pop(block, None)
+                self.entropies.pop(block, None)
+        self.changes.clear()
+
+    def missing(self, length: int, limit=ENTROPY_BATCH):
+        """
+        :param length:
+        :param limit:
+        :return list:
+        """
+
+        # Ещё не посчитанные блоки (не больше limit за раз).
+
+        blocks = []
+        for block in range(self.blocks(length)):
+            if block not in self.histograms:
+                blocks.append(block)
+                if len(blocks) >= limit:
+                    break
+        return blocks
+
+    def compute(self, document, blocks: list, cancel=None, progress=None):
+        """
+        :param document:
+        :param blocks:
+        :param cancel:
+        :param progress:
+        :return dict:
+        """
+
+        # Гистограммы блоков. Можно вызывать из другого потока с копией документа (Document.snapshot).
+        # cancel — threading.Event для остановки (вызывается Cancelled), progress(кол-во посчитанных блоков).
+
+        results = {}
+        for number, block in enumerate(blocks):
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            results[block] = byte_histogram(document.read(block * self.block_size, self.block_size))
+            if progress is not None:
+                progress(number + 1)
+        return results
+
+    def update(self, results: dict, length: int):
+        # Запоминание посчитанных гистограмм. Блоки, изменённые во время подсчёта, сразу забываются.
+        for block, histogram in results.items():
+            if block < self.blocks(length):
+                self.histograms[block] = histogram
+                self.entropies[block] = shannon_entropy(histogram, min(self.block_size,
+                                                                       length - block * self.block_size))
+        self.invalidate()
+
+    def histogram(self, first: int, last: int):
+        """
+        :param first:
+        :param last:
+        :return list:
+        """
+
+        # Суммарная гистограмма посчитанных блоков с first по last включительно.
+
+        total = [0] * 256
+        for block in range(first, last + 1):
+            if block in self.histograms:
+                total = [count + added for count, added in zip(total, self.histograms[block])]
+        return total
+
+
+HASH_ALGORITHMS = ("crc32", "adler32", "md5", "sha1", "sha256")  # Контрольные суммы, которые считаются вместе.
+HASH_CHUNK = 1 << 22  # Размер куска при подсчёте контрольных сумм.
+HASH_CHECKPOINT = 1 << 24  # Через сколько байтов запоминается состояние подсчёта (кратно HASH_CHUNK).
+
+
+class RunningChecksum:
+    # Контрольная сумма zlib (crc32 или adler32) с теми же методами, что у объектов hashlib.
+
+    def __init__(self, function, value: int):
+        self.function = function  # zlib.crc32 или zlib.adler32.
+        self.value = value  # Сумма уже обработанных байтов.
+
+    def update(self, data: bytes):
+        self.value = self.function(data, self.value)
+
+    def copy(self):
+        return RunningChecksum(self.function, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+
+def new_hash(algorithm: str):
+    """
+    :param algorithm:
+    :return object:
+    """
+
+    # Пустое состояние подсчёта контрольной суммы (объект с методами update, copy и hexdigest).
+
+    if algorithm == "crc32":
+        return RunningChecksum(zlib.crc32, 0)
+    if algorithm == "adler32":
+        return RunningChecksum(zlib.adler32, 1)
+    return hashlib.new(algorithm)
+
+
+class Checksums(DocumentListener):
+    # Контрольные суммы промежутка документа, начинающегося с байта start. Байты читаются один раз
+    # кусками по HASH_CHUNK, и каждый кусок обрабатывается всеми алгоритмами одновременно в пуле потоков
+    # (zlib и hashlib отпускают GIL на больших кусках), пока читается следующий кусок.
+    # Каждые HASH_CHECKPOINT байтов состояния запоминаются. Трекер changes подключается к документу,
+    # и после правки забываются только состояния после первого изменённого байта: подсчёт продолжается
+    # с последнего уцелевшего. compute() не меняет объект, результат передаётся в update().
+
+    def __init__(self, algorithms=HASH_ALGORITHMS, checkpoint=HASH_CHECKPOINT):
+        self.algorithms = algorithms
+        self.checkpoint = checkpoint
+        self.start = 0  # Начало промежутка, для которого запомнены состояния.
+        self.checkpoints = []  # [(номер байта, состояния по байтам от start до него), ...] по возрастанию.
+        self.changes = DirtyRanges()  # Изменённые промежутки документа.
+        self.document = None
+
+    def attach(self, document):
+        # Подсчёт для другого документа.
+        super().attach(document)
+        self.checkpoints = []
+
+    def invalidate(self):
+        # Забываются состояния, в которые вошли изменённые байты. Правка до start сдвигает байты промежутка,
+        # поэтому тоже забывает все состояния. Важен только самый ранний изменённый промежуток.
+        first = next(iter(self.changes), None)
+        if first is not None:
+            self.checkpoints = [checkpoint for checkpoint in self.checkpoints if checkpoint[0] <= first[0]]
+        self.changes.clear()
+
+    def compute(self, document, start=0, end=None, cancel=None, progress=None):
+        """
+        :param document:
+        :param start:
+        :param end:
+        :param cancel:
+        :param progress:
+        :return tuple:
+        """
+
+        # Контрольные суммы байтов [start, end): ({алгоритм: шестнадцатиричная запись}, состояния для update()).
+        # Можно вызывать из другого потока с копией документа (Document.snapshot).
+        # cancel — threading.Event для остановки (вызывается Cancelled), progress(кол-во обработанных байтов).
+
+        end = len(document) if end is None else min(end, len(document))
+        checkpoints = [] if start != self.start else [checkpoint for checkpoint in self.checkpoints
+                                                      if checkpoint[0] <= end]
+        if checkpoints:
+            position, states = checkpoints[-1][0], [state.copy() for state in checkpoints[-1][1]]
+        else:
+            position, states = start, [new_hash(algorithm) for algorithm in self.algorithms]
+
+        with ThreadPoolExecutor(len(states)) as pool:
+            while position < end:
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled()
+
+                # Следующий кусок читается, пока алгоритмы обрабатывают прошлый.
+                stop = min(position - (position - start) % self.checkpoint + self.checkpoint, end)
+                pending = []
+                for chunk in document.chunks(HASH_CHUNK, position, stop - position):
+                    for future in pending:
+                        future.result()
+                    pending = [pool.submit(state.update, chunk) for state in states]
+                for future in pending:
+                    future.result()
+
+                position = stop
+                if (position - start) % self.checkpoint == 0:
+                    checkpoints.append((position, [state.copy() for state in states]))
+                if progress is not None:
+                    progress(position - start)
+
+        return {algorithm: state.hexdigest() for algorithm, state in zip(self.algorithms, states)}, checkpoints
+
+    def update(self, start: int, checkpoints: list):
+        # Запоминание состояний, посчитанных compute(). Состояния после правок, сделанных во время подсчёта,
+        # сразу забываются.
+        self.start = start
+        self.checkpoints = checkpoints
+        self.invalidate()
+
+
+TEMPLATE_DIR = "templates"  # Папка шаблонов структур: <тип файла>.json.
+TEMPLATE_SCALARS = {"u8": "B", "i8": "b", "u16": "H", "i16": "h", "u32": "I", "i32": "i",
+                    "u64": "Q", "i64": "q", "f32": "f", "f64": "d"}  # Числовые типы полей и их формат struct.
+TEMPLATE_ENDIANS = {"little": "<", "big": ">"}
+TEMPLATE_PREVIEW = 16  # Сколько байтов показывается в значении поля bytes.
+# Что можно писать в выражениях шаблона: целые числа, имена полей и арифметика.
+TEMPLATE_SYNTAX = (ast.Expression, ast.Name, ast.Load, ast.Constant, ast.BinOp, ast.UnaryOp, ast.Add, ast.Sub,
+                   ast.Mult, ast.FloorDiv, ast.Mod, ast.LShift, ast.RShift, ast.BitAnd, ast.BitOr, ast.USub)
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class Expression:
+    # Кол-во элементов или смещение поля из шаблона: число или выражение над прошлыми полями ("count": "entries * 2").
+    # Выражение проверяется и компилируется один раз при загрузке шаблона.
+
+    def __init__(self, text):
+        self.text = text
+        if isinstance(text, int):
+            self.code = None
+            return
+
+        try:
+            tree = ast.parse(str(text), mode="eval")
+        except SyntaxError as error:
+            raise TemplateError(f"bad expression {text!r}") from error
+        for node in ast.walk(tree):
+            if not isinstance(node, TEMPLATE_SYNTAX) or isinstance(node, ast.Constant) and type(node.value) is not int:
+                raise TemplateError(f"unsupported expression {text!r}")
+        self.code = compile(tree, "<template>", "eval")
+
+    def __call__(self, scope):
+        if self.code is None:
+            return self.text
+        try:
+            return int(eval(self.code, {"__builtins__": {}}, scope))
+        except TemplateError:
+            raise
+        except NameError as error:
+            raise TemplateError(f"{self.text!r}: {error}") from error
+        except (ArithmeticError, TypeError, ValueError) as error:
+            raise TemplateError(f"cannot evaluate {self.text!r}: {error}") from error
+
+
+@lru_cache(maxsize=None)
+def compiled_struct(template_format: str):
+    # Готовый struct.Struct для формата. Одинаковые поля всех шаблонов разделяют один объект.
+    return struct.Struct(template_format)
+
+
+class FieldSpec:
+    # Поле шаблона: {"name": ..., "type": "u32" | "bytes" | "string" | имя структуры,
+    # "count": кол-во элементов (массив), "offset": номер байта от начала файла, "endian": "big"}.
+    # Поле без offset идёт сразу за прошлым, а поле с offset (указатель) следующие поля не сдвигает.
+
+    def __init__(self, definition: dict, endian: str, struct_names):
+        try:
+            self.name = str(definition["name"])
+            self.type = definition.get("type", "u8")
+            endian = definition.get("endian", endian)
+            self.count = Expression(definition["count"]) if "count" in definition else None
+            self.offset = Expression(definition["offset"]) if "offset" in definition else None
+        except (KeyError, TypeError, AttributeError) as error:
+            raise TemplateError(f"bad field {definition!r}") from error
+        if endian not in TEMPLATE_ENDIANS:
+            raise TemplateError(f"unknown endianness {endian!r}")
+
+        self.format = None  # struct.Struct числового поля.
+        self.struct = None  # StructSpec вложенной структуры (задаётся в Template).
+        if self.type in TEMPLATE_SCALARS:
+            self.format = compiled_struct(TEMPLATE_ENDIANS[endian] + TEMPLATE_SCALARS[self.type])
+        elif self.type not in ("bytes", "string") and self.type not in struct_names:
+            raise TemplateError(f"unknown type {self.type!r} of field {self.name!r}")
+
+    @property
+    def item_size(self):
+        # Размер одного элемента или None, если он зависит от данных.
+        if self.format is not None:
+            return self.format.size
+        if self.struct is not None:
+            return self.struct.size
+        return 1
+
+    @property
+    def size(self):
+        # Размер поля, если он не зависит от данных, иначе None.
+        if self.offset is not None:
+            return 0
+        if self.count is not None and self.count.code is not None or self.item_size is None:
+            return None
+        if self.type in ("bytes", "string") or self.count is not None:
+            return self.item_size * (1 if self.count is None else max(self.count.text, 0))
+        return self.item_size
+
+
+class StructSpec:
+    # Структура шаблона: список полей. Размер известен заранее, только если он не зависит от данных.
+
+    def __init__(self, name: str, fields: list, endian: str, struct_names):
+        if not isinstance(fields, list):
+            raise TemplateError(f"fields of {name or 'template'!r} must be a list")
+        self.name = name
+        self.fields = [FieldSpec(field, endian, struct_names) for field in fields]
+        self.size = None  # Размер структуры (None — зависит от данных).
+
+
+class Template:
+    # Шаблон структуры файла из JSON: {"endian": "little", "fields": [...], "structs": {"имя": [...]}}.
+    # Шаблон разбирается один раз (выражения компилируются, форматы полей — struct.Struct),
+    # а parse() только создаёт корневой узел: поля читаются из документа по запросу (TemplateNode).
+
+    def __init__(self, definition: dict):
+        try:
+            endian = definition.get("endian", "little")
+            structs = definition.get("structs", {})
+            self.structs = {name: StructSpec(name, fields, endian, structs) for name, fields in structs.items()}
+            self.root = StructSpec("", definition["fields"], endian, structs)
+        except (KeyError, AttributeError) as error:
+            raise TemplateError("template must be an object with a list of fields") from error
+
+        specs = [self.root, *self.structs.values()]
+        for spec in specs:
+            for field in spec.fields:
+                field.struct = self.structs.get(field.type) if field.format is None else None
+
+        # Размеры структур, не зависящих от данных. Структура, содержащая саму себя, остаётся без размера.
+        changed = True
+        while changed:
+            changed = False
+            for spec in specs:
+                sizes = [field.size for field in spec.fields]
+                if spec.size is None and None not in sizes:
+                    spec.size, changed = sum(sizes), True
+
+    def parse(self, document):
+        """
+        :param document:
+        :return TemplateNode:
+        """
+
+        # Корневой узел разбора документа. Байты при этом не читаются.
+
+        return TemplateNode(document, DirtyRanges(), "", "struct", self.root, 0, None)
+
+
+_templates = {}  # Путь к шаблону -> (время изменения файла, Template).
+
+
+def load_template(file_type: str, directory=TEMPLATE_DIR):
+    """
+    :param file_type:
+    :param directory:
+    :return Template:
+    """
+
+    # Шаблон типа файла из directory/<тип>.json или None, если шаблона нет.
+    # Файл разбирается один раз и заново — только если он изменился.
+
+    if not re.fullmatch(r"[\w.+-]+", file_type) or file_type.startswith("."):
+        return None
+    path = os.path.join(directory, file_type.lower() + ".json")
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    if path not in _templates or _templates[path][0] != modified:
+        with open(path, encoding="utf-8") as template_file:
+            try:
+                definition = json.load(template_file)
+            except json.JSONDecodeError as error:
+                raise TemplateError(f"{path}: {error}") from error
+        _templates[path] = modified, Template(definition)
+    return _templates[path][1]
+
+
+class TemplateScope:
+    # Поля структуры по именам для выражений. Значение поля читается только при обращении к нему,
+    # а если имени нет, оно ищется во внешней структуре.
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.nodes = {}
+
+    def __getitem__(self, name: str):
+        if name in self.nodes:
+            return self.nodes[name].number()
+        if self.parent is None:
+            raise KeyError(name)
+        return self.parent[name]
+
+
+class TemplateNode:
+    # Узел разбора: число ("value"), байты ("bytes"), строка ("string"), структура ("struct"),
+    # массив ("array") или поле, которое не удалось разобрать ("error").
+    # Заранее ничего не читается: value() читает байты поля, поля структуры раскладываются при первом
+    # обращении к ним, а элементы массива создаются по одному в child(). Массив из миллионов записей
+    # ничего не стоит, пока его не листают. Промежутки полей, от которых зависит раскладка
+    # (на них ссылаются выражения), собираются в dependencies.
+
+    def __init__(self, document, dependencies: DirtyRanges, name: str, kind: str, spec, offset: int, scope,
+                 count=1, parent=None, row=0):
+        self.document = document
+        self.dependencies = dependencies  # Общие для всего разбора.
+        self.name = name
+        self.kind = kind
+        self.spec = spec  # StructSpec для структуры, FieldSpec для остальных.
+        self.offset = offset
+        self.scope = scope  # Поля, видимые выражениям внутри узла.
+        self.count = count  # Кол-во элементов массива или байтов поля bytes и string.
+        self.parent = parent
+        self.row = row  # Номер узла среди детей родителя.
+        self.error = None  # Текст ошибки для узла "error".
+
+        self._children = None  # Поля структуры (список) или созданные элементы массива (словарь).
+        self._last = None  # Последнее поле структуры без offset: по нему считается её размер.
+        self._offsets = [offset]  # Начала элементов массива с размером, зависящим от данных.
+
+    def field(self, spec: FieldSpec, offset: int, scope, row: int):
+        # Узел поля структуры. Кол-во элементов ограничивается длиной документа.
+        count = 1 if spec.count is None else max(spec.count(scope), 0)
+        available = max(len(self.document) - offset, 0)
+        if spec.type in ("bytes", "string"):
+            kind, count = spec.type, min(count, available)
+        elif spec.count is None:
+            kind = "value" if spec.struct is None else "struct"
+        else:
+            kind = "array"
+            count = min(count, available // spec.item_size if spec.item_size else available)
+        return TemplateNode(self.document, self.dependencies, spec.name, kind, spec.struct if kind == "struct" else spec,
+                            offset, scope, count, self, row)
+
+    def children(self):
+        """
+        :return list:
+        """
+
+        # Поля структуры. Раскладываются один раз; если поле не разобрать, дальше раскладка не идёт.
+
+        if self._children is None:
+            self._children = []
+            scope = TemplateScope(self.scope)
+            position, last = self.offset, None
+            for row, spec in enumerate(self.spec.fields):
+                try:
+                    if spec.offset is None:
+                        if last is not None:
+                            position = last.offset + last.size
+                        offset = position
+                    else:
+                        offset = spec.offset(scope)
+                    node = self.field(spec, offset, scope, row)
+                except TemplateError as error:
+                    node = TemplateNode(self.document, self.dependencies, spec.name, "error", spec, position, scope,
+                                        0, self, row)
+                    node.error = str(error)
+                    self._children.append(node)
+                    last = None
+                    break
+                self._children.append(node)
+                scope.nodes[spec.name] = node
+                if spec.offset is None:
+                    last = node
+            self._last = last
+        return self._children
+
+    def rows(self):
+        # Кол-во детей: полей структуры или элементов массива.
+        if self.kind == "struct":
+            return len(self.children())
+        return self.count if self.kind == "array" else 0
+
+    def child(self, row: int):
+        """
+        :param row:
+        :return TemplateNode:
+        """
+
+        # Поле структуры или элемент массива с номером row. Элемент массива создаётся при первом обращении.
+
+        if self.kind == "struct":
+            return self.children()[row]
+
+        if self._children is None:
+            self._children = {}
+        if row not in self._children:
+            spec = self.spec
+            kind = "value" if spec.struct is None else "struct"
+            self._children[row] = TemplateNode(self.document, self.dependencies, f"[{row}]", kind,
+                                               spec if spec.struct is None else spec.struct,
+                                               self.element_offset(row), self.scope, 1, self, row)
+        return self._children[row]
+
+    def element_offset(self, row: int):
+        # Начало элемента массива. Если размер элемента зависит от данных, прошлые элементы раскладываются по очереди.
+        if self.spec.item_size is not None:
+            return self.offset + row * self.spec.item_size
+        while len(self._offsets) <= row:
+            element = self.child(len(self._offsets) - 1)
+            self._offsets.append(element.offset + element.size)
+        return self._offsets[row]
+
+    @property
+    def size(self):
+        # Размер узла в байтах.
+        if self.kind in ("bytes", "string"):
+            return self.count
+        if self.kind == "value":
+            return self.spec.format.size
+        if self.kind == "array":
+            return self.element_offset(self.count) - self.offset
+        if self.kind == "struct":
+            if self.spec.size is not None:
+                return self.spec.size
+            self.children()
+            return 0 if self._last is None else self._last.offset + self._last.size - self.offset
+        return 0
+
+    def value(self):
+        """
+        :return object:
+        """
+
+        # Значение поля: число, байты или строка (None, если поле выходит за конец документа).
+
+        if self.kind not in ("value", "bytes", "string"):
+            return None
+        data = self.document.read(self.offset, self.size)
+        if self.kind == "value":
+            return self.spec.format.unpack(data)[0] if len(data) == self.size else None
+        if self.kind == "string":
+            return data.split(b"\x00")[0].decode("latin-1")
+        return data
+
+    def number(self):
+        # Значение числового поля для выражения. Поле отмечается как влияющее на раскладку.
+        value = self.value()
+        if self.kind != "value" or value is None:
+            raise TemplateError(f"field {self.name!r} is not a number inside the file")
+        self.dependencies.add(self.offset, self.offset + self.size)
+        return value
+
+    def text(self):
+        """
+        :return str:
+        """
+
+        # Значение для показа в дереве.
+
+        if self.kind == "error":
+            return self.error
+        if self.kind == "array":
+            return f"[{self.count}]"
+        value = self.value()
+        if value is None or self.kind == "struct":
+            return ""
+        if self.kind == "bytes":
+            return value[:TEMPLATE_PREVIEW].hex(" ").upper() + (" …" if len(value) > TEMPLATE_PREVIEW else "")
+        if self.kind == "string":
+            return repr(value)
+        if isinstance(value, int):
+            return f"{value} (0x{value:X})" if value >= 0 else str(value)
+        return f"{value:g}"
+
+    def child_at(self, offset: int):
+        # Ребёнок, в который попадает байт offset, или None.
+        if self.kind == "struct":
+            for node in self.children():
+                if node.offset <= offset < node.offset + node.size:
+                    return node
+            return None
+
+        if self.kind != "array" or offset < self.offset or not self.count:
+            return None
+        item_size = self.spec.item_size
+        if item_size is not None:
+            row = (offset - self.offset) // item_size if item_size else self.count
+        else:
+            while len(self._offsets) <= self.count and self._offsets[-1] <= offset:
+                self.element_offset(len(self._offsets))
+            row = bisect_right(self._offsets, offset) - 1
+        return self.child(row) if row < self.count else None
+
+    def locate(self, offset: int):
+        """
+        :param offset:
+        :return list:
+        """
+
+        # Путь от узла к самому глубокому узлу, в который попадает байт offset.
+
+        path = [self]
+        while True:
+            node = path[-1].child_at(offset)
+            if node is None:
+                return path
+            path.append(node)
+
+
+def write_all(target: int, data):
+    # Запись всех байтов в открытый файл. os.write может записать только часть.
+    while len(data):
+        data = data[os.write(target, data):]
+
+
+def copy_range(source: int, target: int, offset: int, count: int):
+    """
+    :param source:
+    :param target:
+    :param offset:
+    :param count:
+    :return int:
+    """
+
+    # Копирование промежутка одного файла в конец другого без передачи байтов через Python
+    # (copy_file_range или sendfile). Возвращается кол-во скопированных байтов:
+    # если система не умеет копировать, остаток дописывается обычной записью.
+
+    copied = 0
+
+    for copier in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+        if copier is None:
+            continue
+        try:
+            while copied < count:
+                if copier is os.sendfile:
+                    done = os.sendfile(target, source, offset + copied, count - copied)
+                else:
+                    done = copier(source, target, count - copied, offset + copied)
+                if not done:
+                    break
+                copied += done
+        except OSError:
+            # Копирование между этими файлами не поддерживается.
+            continue
+        else:
+            break
+
+    return copied
+
+
+SAVE_CHUNK = 1 << 20  # Размер куска при записи.
+COPY_CHUNK = 1 << 26  # Размер промежутка, копируемого ядром за раз (между проверками остановки).
+
+
+ORIGINAL = 0  # Кусок ссылается на исходный файл.
+ADDED = 1  # Кусок ссылается на буфер добавленных байтов.
+
+
+class Document:
+    # Документ: таблица кусков (piece table) поверх файла, открытого через mmap только для чтения,
+    # и буфера добавленных байтов. Исходные байты никогда не копируются, а правка меняет
+    # только список кусков. Страницы файла читаются операционной системой только при обращении.
+    # Куски ищутся двоичным поиском по их началам. Замена байтов поверх пересчитывает начала только
+    # заменённых кусков, а сдвиг начал после вставки или удаления откладывается (см. _replace_pieces).
+
+    def __init__(self, data=b""):
+        self.file_name = None  # Путь к открытому файлу.
+        self._file = None  # Открытый файл.
+        self.dirty = DirtyRanges()  # Промежутки, изменённые с открытия или сохранения.
+        self.trackers = [self.dirty]  # Трекеры изменённых промежутков (DirtyRanges), например, у моделей.
+        self.version = 0  # Номер правки. Увеличивается при каждом изменении байтов.
+        self.history = History()  # История правок для отмены и повтора.
+        self._load(bytes(data))
+
+    def _load(self, source):
+        # Документ состоит из одного куска — всего исходного файла.
+        self._source = source  # Исходные байты (mmap или bytes).
+        self._added = bytearray()  # Добавленные байты. Только дописываются в конец.
+        self._pieces = [(ORIGINAL, 0, len(source))] if len(source) else []  # Куски: (буфер, начало, длина).
+        self._starts = [0] if len(source) else []  # Номер первого байта каждого куска в документе.
+        # Начала кусков с номера _shift_from ещё не сдвинуты на _shift (см. _replace_pieces).
+        self._shift_from = 0
+        self._shift = 0
+        self._length = len(source)
+        self.resized = False  # Байты вставлялись или удалялись, то есть сдвигались.
+        self.dirty.clear()
+        # Куски истории ссылаются на прошлые буферы, поэтому история начинается заново.
+        self.history.clear()
+
+    @classmethod
+    def open(cls, file_name: str):
+        """
+        :param file_name:
+        :return Document:
+        """
+
+        # Открытие файла через mmap.
+
+        document = cls()
+        document.file_name = file_name
+        document._file = open(file_name, mode="rb")
+
+        try:
+            document._load(mmap.mmap(document._file.fileno(), 0, access=mmap.ACCESS_READ))
+        except ValueError:
+            # Пустой файл нельзя отобразить в память.
+            document._load(b"")
+
+        return document
+
+    def close(self):
+        # Закрытие отображения и файла.
+        self._release()
+        self._load(b"")
+
+    def _release(self):
+        # Закрытие отображения и файла без сброса кусков и истории (см. replace_file()).
+        if isinstance(self._source, mmap.mmap):
+            self._source.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _reopen(self):
+        # Повторное отображение того же файла после _release(). Файл не менялся, поэтому куски
+        # и история остаются верными.
+        self._file = open(self.file_name, mode="rb")
+        if isinstance(self._source, mmap.mmap):
+            self._source = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def snapshot(self):
+        """
+        :return Document:
+        """
+
+        # Копия документа для чтения из другого потока. Копируется только список кусков:
+        # буфер добавленных байтов только дописывается, поэтому его можно не копировать.
+        # Копию нельзя закрывать, а исходный документ нельзя закрывать, пока копия используется.
+
+        copy = Document.__new__(Document)
+        copy.file_name, copy._file = self.file_name, self._file
+        copy.dirty = DirtyRanges()
+        copy.trackers = [copy.dirty]
+        copy.version = self.version
+        copy.history = History()
+        copy._source, copy._added = self._source, self._added
+        copy._pieces, copy._starts = list(self._pieces), list(self._starts)
+        copy._shift_from, copy._shift = self._shift_from, self._shift
+        copy._length, copy.resized = self._length, self.resized
+        return copy
+
+    def __len__(self):
+        return self._length
+
+    def unchanged(self):
+        """
+        :return bool:
+        """
+
+        # Документ связан с файлом и совпадает с ним: остался один кусок — весь файл.
+
+        return self.file_name is not None and self._pieces == [(ORIGINAL, 0, len(self._source))]
+
+    def source_length(self):
+        """
+        :return int:
+        """
+
+        # Длина исходного файла (или данных), с которых начался документ.
+
+        return len(self._source)
+
+    def session_edits(self):
+        # Правки для apply_edits(), превращающие исходный файл в документ: (номер байта в исходном файле,
+        # кол-во заменяемых байтов, новые байты). Куски исходного файла, идущие по порядку, остаются
+        # на месте, а всё между ними становится новыми байтами. Совпадающие с исходными байты
+        # по краям правки отбрасываются, поэтому перезапись байта тем же значением правкой не считается.
+        position = 0  # Конец последнего оставленного куска исходного файла.
+        data = []
+
+        for kind, start, length in list(self._pieces) + [(ORIGINAL, len(self._source), 0)]:
+            if kind == ORIGINAL and start >= position:
+                if data or start > position:
+                    added = b"".join(data)
+                    size = start - position
+                    prefix = common_prefix(self._source[position:position + min(size, len(added))], added)
+                    position, size, added = position + prefix, size - prefix, added[prefix:]
+                    common = min(size, len(added))
+                    suffix = common_prefix(self._source[position + size - common:position + size][::-1],
+                                           added[len(added) - common:][::-1])
+                    if size > suffix or len(added) > suffix:
+                        yield position, size - suffix, added[:len(added) - suffix]
+                position = start + length
+                data = []
+            else:
+                data.append(self._buffer(kind)[start:start + length])
+
+    def _buffer(self, kind: int):
+        # Буфер, на который ссылается кусок.
+        return self._source if kind == ORIGINAL else self._added
+
+    def _find(self, offset: int):
+        """
+        :param offset:
+        :return int:
+        """
+
+        # Двоичный поиск куска, в котором лежит байт.
+
+        split = self._shift_from
+        if self._shift and split < len(self._starts) and offset >= self._starts[split] + self._shift:
+            return bisect_right(self._starts, offset - self._shift, split) - 1
+        return bisect_right(self._starts, offset, 0, split if self._shift else len(self._starts)) - 1
+
+    def _start(self, index: int):
+        """
+        :param index:
+        :return int:
+        """
+
+        # Номер первого байта куска с учётом ещё не сделанного сдвига.
+
+        return self._starts[index] + (self._shift if index >= self._shift_from else 0)
+
+    def _reindex(self):
+        # Пересчёт начал всех кусков (после сборки списка кусков заново).
+        self._starts = []
+        self._shift_from, self._shift = 0, 0
+        start = 0
+        for piece in self._pieces:
+            self._starts.append(start)
+            start += piece[2]
+        self._length = start
+
+    def _move_shift(self, index: int):
+        # Граница несдвинутых начал переносится на кусок index: начала между старой и новой границей
+        # сдвигаются (или, наоборот, перестают быть сдвинутыми). Правки рядом друг с другом
+        # (например, набор текста) поэтому трогают только несколько начал, а не все следующие.
+        if not self._shift:
+            self._shift_from = index
+            return
+
+        split, shift = self._shift_from, self._shift
+        if split < index:
+            self._starts[split:index] = [start + shift for start in self._starts[split:index]]
+        elif index < split:
+            self._starts[index:split] = [start - shift for start in self._starts[index:split]]
+        self._shift_from = index
+
+    def _replace_pieces(self, first: int, last: int, spans: list):
+        # Замена кусков [first, last) кусками spans. Начала пересчитываются только у новых кусков, а сдвиг
+        # хвостов списков — срезы (memmove в C). Если длина промежутка изменилась, начала следующих кусков
+        # не пересчитываются сразу: сдвиг копится в _shift для всех кусков с номера _shift_from.
+        # Поэтому правка стоит O(расстояния до прошлой правки со сдвигом) в кусках, а не O(всех кусков).
+        start = self._start(first) if first < len(self._starts) else self._length
+        end = self._start(last) if last < len(self._starts) else self._length
+        starts = []
+        position = start
+        for piece in spans:
+            starts.append(position)
+            position += piece[2]
+
+        shift = position - end
+        if shift or first < self._shift_from < last:
+            # Граница несдвинутых начал встаёт сразу за новыми кусками.
+            self._move_shift(last)
+            self._shift_from += len(spans) - (last - first)
+            self._shift += shift
+            self._length += shift
+        elif self._shift_from >= last:
+            self._shift_from += len(spans) - (last - first)
+        else:
+            # Новые куски лежат в несдвинутой части и хранятся так же.
+            starts = [start - self._shift for start in starts]
+
+        self._pieces[first:last] = spans
+        self._starts[first:last] = starts
+
+    def _put(self, first: int, last: int, data: bytes):
+        # Новые байты дописываются в буфер добавленных байтов и встают на место кусков [first, last).
+        start = len(self._added)
+        self._added += data
+
+        previous = self._pieces[first - 1] if first > 0 else None
+        if previous is not None and previous[0] == ADDED and previous[1] + previous[2] == start:
+            # Байты продолжают предыдущий кусок (например, при наборе подряд) — кусок просто удлиняется.
+            self._replace_pieces(first - 1, last, [(ADDED, previous[1], previous[2] + len(data))])
+        else:
+            self._replace_pieces(first, last, [(ADDED, start, len(data))])
+
+    def _split(self, offset: int):
+        """
+        :param offset:
+        :return int:
+        """
+
+        # Разрезание куска так, чтобы с байта offset начинался новый кусок. Возвращается номер этого куска.
+
+        if offset >= self._length:
+            return len(self._pieces)
+
+        index = self._find(offset)
+        shift = offset - self._start(index)
+        if not shift:
+            return index
+
+        kind, start, length = self._pieces[index]
+        self._pieces[index:index + 1] = [(kind, start, shift), (kind, start + shift, length - shift)]
+        if index + 1 >= self._shift_from:
+            self._starts.insert(index + 1, offset - self._shift)
+        else:
+            self._starts.insert(index + 1, offset)
+            self._shift_from += 1
+        return index + 1
+
+    def __getitem__(self, byte: int):
+        if not 0 <= byte < self._length:
+            raise IndexError("Document index out of range")
+        index = self._find(byte)
+        kind, start, length = self._pieces[index]
+        return self._buffer(kind)[start + byte - self._start(index)]
+
+    def read(self, offset: int, size: int):
+        """
+        :param offset:
+        :param size:
+        :return bytes:
+        """
+
+        # Чтение промежутка байтов. Склеиваются только куски, попавшие в промежуток.
+
+        return b"".join(self.pieces(offset, size))
+
+    def spans(self, offset=0, size=None):
+        # Поочерёдная выдача кусков промежутка в виде (буфер, начало в буфере, длина) без чтения байтов.
+        end = self._length if size is None else min(offset + size, self._length)
+        index = max(self._find(offset), 0)
+
+        while offset < end and index < len(self._pieces):
+            kind, start, length = self._pieces[index]
+            shift = offset - self._start(index)
+            count = min(length - shift, end - offset)
+            yield kind, start + shift, count
+            offset += count
+            index += 1
+
+    def pieces(self, offset=0, size=None):
+        # Поочерёдная выдача байтов кусков промежутка без склеивания.
+        for kind, start, count in self.spans(offset, size):
+            yield self._buffer(kind)[start:start + count]
+
+    def _touch(self, start: int, end: int):
+        # Отметка изменённого промежутка во всех трекерах.
+        self.version += 1
+        for tracker in self.trackers:
+            tracker.add(start, end)
+
+    def insert(self, offset: int, data: bytes):
+        # Вставка байтов. Все байты после offset сдвигаются.
+        offset = min(offset, self._length)
+        self._insert(offset, data)
+        self.history.record(offset, [], list(self.spans(offset, len(data))))
+        self.resized = self.resized or bool(data)
+        self._touch(offset, self._length)
+
+    def _insert(self, offset: int, data: bytes):
+        if data:
+            index = self._split(offset)
+            self._put(index, index, data)
+
+    def delete(self, offset: int, size: int):
+        # Удаление промежутка байтов. Все байты после него сдвигаются.
+        length = self._length
+        self.history.record(offset, list(self.spans(offset, size)), [])
+        self._delete(offset, size)
+        self.resized = self.resized or self._length != length
+        self._touch(offset, length)
+
+    def _delete(self, offset: int, size: int):
+        # Удаляются только ссылки на куски.
+        size = min(size, self._length - offset)
+        if size <= 0:
+            return
+
+        first = self._split(offset)
+        last = self._split(offset + size)
+        self._replace_pieces(first, last, [])
+
+    def replace(self, offset: int, data: bytes):
+        # Замена байтов поверх существующих. Сдвига нет, поэтому отмечаются только заменённые байты.
+        length = self._length
+        offset = min(offset, length)
+        old = list(self.spans(offset, len(data)))
+        if data:
+            # Заменяемые куски сразу меняются на новый, поэтому начала следующих кусков не сдвигаются.
+            first = self._split(offset)
+            self._put(first, self._split(offset + len(data)), data)
+        self.history.record(offset, old, list(self.spans(offset, len(data))))
+        self.resized = self.resized or self._length != length
+        self._touch(offset, offset + len(data))
+
+    def apply_edits(self, edits: list):
+        # Пачка правок [(номер байта, кол-во заменяемых байтов, новые байты), ...], отсортированных
+        # по номеру байта и не пересекающихся. Список кусков собирается заново за один проход,
+        # а одинаковые новые байты дописываются в буфер только один раз.
+        if not edits:
+            return
+
+        # В историю попадает одна правка на весь промежуток от первой до последней замены.
+        first, end = edits[0][0], edits[-1][0] + edits[-1][1]
+        old = list(self.spans(first, end - first))
+
+        pieces = []
+        stored = {}  # Новые байты -> начало в буфере добавленных байтов.
+        position = 0
+        shifted = False
+
+        for offset, size, data in edits:
+            pieces.extend(self.spans(position, offset - position))
+            if data:
+                if data not in stored:
+                    stored[data] = len(self._added)
+                    self._added += data
+                pieces.append((ADDED, stored[data], len(data)))
+            position = offset + size
+            shifted = shifted or len(data) != size
+        pieces.extend(self.spans(position))
+
+        length = self._length
+        self._pieces = pieces
+        self._reindex()
+        self.history.record(first, old, list(self.spans(first, end - first + self._length - length)))
+
+        if shifted:
+            # Байты сдвинулись — изменено всё после первой правки.
+            self.resized = True
+            self._touch(edits[0][0], max(length, self._length))
+        else:
+            for offset, size, data in edits:
+                self._touch(offset, offset + size)
+
+    def _splice(self, offset: int, size: int, spans: list):
+        # Замена промежутка [offset, offset + size) готовыми кусками.
+        first = self._split(offset)
+        last = self._split(offset + size)
+        self._replace_pieces(first, last, spans)
+
+    def _restore(self, offset: int, current: list, spans: list):
+        # Возврат кусков spans на место кусков current (для отмены и повтора).
+        length = self._length
+        self._splice(offset, span_length(current), spans)
+        if self._length != length:
+            self.resized = True
+            self._touch(offset, max(length, self._length))
+        else:
+            self._touch(offset, offset + span_length(spans))
+
+    def undo_length(self, redo=False):
+        """
+        :param redo:
+        :return int:
+        """
+
+        # Длина документа после отмены (или повтора) правки. None — отменять нечего.
+
+        entry = self.history.peek(redo)
+        if entry is None:
+            return None
+        offset, old, new = entry
+        if redo:
+            old, new = new, old
+        return self._length - span_length(new) + span_length(old)
+
+    def undo(self):
+        # Отмена последней правки. Меняется только список кусков в промежутке правки.
+        entry = self.history.undo()
+        if entry is not None:
+            offset, old, new = entry
+            self._restore(offset, new, old)
+
+    def redo(self):
+        # Повтор отменённой правки.
+        entry = self.history.redo()
+        if entry is not None:
+            offset, old, new = entry
+            self._restore(offset, old, new)
+
+    def chunks(self, chunk_size=1 << 20, offset=0, size=None):
+        # Поочерёдная выдача данных кусками не длиннее chunk_size.
+        for kind, start, count in self.spans(offset, size):
+            buffer = self._buffer(kind)
+            for shift in range(0, count, chunk_size):
+                yield buffer[start + shift:start + min(shift + chunk_size, count)]
+
+    def _write(self, target: int, cancel=None, progress=None):
+        # Запись всего документа в открытый файл target.
+        # Неизменённые промежутки копируются из исходного файла ядром, остальное пишется кусками.
+        # cancel — threading.Event для остановки (вызывается Cancelled), progress(кол-во записанных байтов).
+        written = 0
+
+        for kind, start, count in self.spans():
+            end = start + count
+            while start < end:
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled
+
+                if kind == ORIGINAL and self._file is not None:
+                    size = min(COPY_CHUNK, end - start)
+                    copied = copy_range(self._file.fileno(), target, start, size)
+                    if copied < size:
+                        # Ядро не умеет копировать — остаток пишется из отображения.
+                        write_all(target, memoryview(self._source)[start + copied:start + size])
+                else:
+                    size = min(SAVE_CHUNK, end - start)
+                    write_all(target, memoryview(self._buffer(kind))[start:start + size])
+
+                start += size
+                written += size
+                if progress is not None:
+                    progress(written)
+
+    def write_temp(self, file_name: str, cancel=None, progress=None):
+        """
+        :param file_name:
+        :param cancel:
+        :param progress:
+        :return str:
+        """
+
+        # Запись документа во временный файл рядом с file_name и сброс на диск. Возвращается имя
+        # временного файла. Документ при этом не меняется, поэтому функцию можно вызывать у копии
+        # (snapshot) в другом потоке. При ошибке или остановке временный файл удаляется.
+
+        handle, temp_name = tempfile.mkstemp(prefix=".", suffix=".tmp",
+                                             dir=os.path.dirname(os.path.abspath(file_name)))
+        try:
+            if os.path.exists(file_name):
+                # Права доступа берутся у заменяемого файла.
+                shutil.copymode(file_name, temp_name)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(temp_name, 0o666 & ~umask)
+
+            try:
+                self._write(handle, cancel, progress)
+                os.fsync(handle)
+            finally:
+                os.close(handle)
+        except BaseException:
+            os.remove(temp_name)
+            raise
+
+        return temp_name
+
+    def replace_file(self, temp_name: str, file_name: str):
+        # Атомарная замена file_name записанным временным файлом. Документ снова открывается
+        # уже из сохранённого файла. Если замена не удалась (например, в Windows файл открыт
+        # в другой вкладке), исходный файл, правки документа и временный файл остаются.
+        released = os.name == "nt" and self.file_name is not None and os.path.exists(file_name) \
+            and os.path.samefile(file_name, self.file_name)
+        if released:
+            # В Windows нельзя заменить файл, пока он отображён в память.
+            self._release()
+        try:
+            os.replace(temp_name, file_name)
+        except BaseException:
+            if released:
+                self._reopen()
+            raise
+
+        self.close()
+        saved = Document.open(file_name)
+        self.file_name, self._file = saved.file_name, saved._file
+        self._load(saved._source)
+
+    def save(self, file_name: str, cancel=None, progress=None):
+        # Сохранение во временный файл рядом с file_name, сброс на диск и атомарная замена.
+        self.replace_file(self.write_temp(file_name, cancel, progress), file_name)
+
+    def save_in_place(self):
+        # Запись в открытый файл только изменённых промежутков.
+        # Возможна, только если байты не сдвигались, иначе пришлось бы переписать весь хвост файла.
+        if self.file_name is None or self.resized:
+            raise PatchError("Only overwritten bytes can be saved in place")
+
+        with open(self.file_name, mode="r+b") as the_file:
+            for start, end in self.dirty:
+                the_file.seek(start)
+                for chunk in self.chunks(SAVE_CHUNK, start, end - start):
+                    the_file.write(chunk)
+            the_file.flush()
+            os.fsync(the_file.fileno())
+
+        # Отображение уже видит записанные байты, поэтому документ снова состоит из одного куска.
+        self._load(self._source)
+
+
+def load_document(file_name: str, file_types: FileTypes):
+    """
+    :param file_name:
+    :param file_types:
+    :return tuple:
+    """
+
+    # Открытие файла и определение его типа (для фоновой задачи открытия).
+    # Файл отображается в память, поэтому его страницы читаются только при просмотре,
+    # и таблица готова к работе сразу после открытия. Возвращается (документ, тип или None).
+
+    document = Document.open(file_name)
+    return document, file_types.detect(document)
+
+
+DIFF_BLOCK = 32  # Длина блока, по которому документы совмещаются после вставки или удаления.
+DIFF_ANCHORS = 16  # Сколько первых блоков каждого документа ищется в другом при совмещении.
+DIFF_WINDOW = 1 << 16  # Сколько байтов просматривается при первой попытке совмещения.
+DIFF_DENSE_LIMIT = 1 << 18  # До этого размера окна проверяется каждый сдвиг, а не только первые блоки.
+DIFF_WINDOW_LIMIT = 1 << 22  # Дальше совмещение не ищется: промежуток считается заменённым.
+
+
+def common_prefix(left: bytes, right: bytes):
+    """
+    :param left:
+    :param right:
+    :return int:
+    """
+
+    # Длина общего начала двух строк байтов. Двоичный поиск по сравнениям срезов:
+    # сами сравнения выполняются в C, поэтому побайтного цикла в Python нет.
+
+    low, high = 0, min(len(left), len(right))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if left[low:middle] == right[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def skip_equal(first, second, first_offset: int, second_offset: int, chunk_size=SAVE_CHUNK, cancel=None):
+    """
+    :param first:
+    :param second:
+    :param first_offset:
+    :param second_offset:
+    :param chunk_size:
+    :param cancel:
+    :return int:
+    """
+
+    # Кол-во равных байтов подряд, начиная с first_offset в first и second_offset во second.
+    # Куски растут от 4 КБ до chunk_size, пока совпадают, поэтому частые мелкие отличия
+    # не заставляют читать много лишнего. cancel проверяется перед каждым куском, потому что
+    # равный промежуток может занимать гигабайты (при остановке вызывается Cancelled).
+
+    count = 0
+    size = 1 << 12
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise Cancelled
+        left = first.read(first_offset + count, size)
+        right = second.read(second_offset + count, size)
+        if left and left == right:
+            count += len(left)
+            size = min(size * 2, chunk_size)
+            continue
+        return count + common_prefix(left, right)
+
+
+def nearest_match(left: bytes, right: bytes, dense: bool):
+    """
+    :param left:
+    :param right:
+    :param dense:
+    :return tuple:
+    """
+
+    # Ближайшее место (сдвиг в left, сдвиг в right), где строки байтов совпадают хотя бы на DIFF_BLOCK байтов,
+    # или None. Сначала первые DIFF_ANCHORS блоков каждой строки ищутся в другой через bytes.find():
+    # так за один проход в C находятся вставки и удаления любой длины. Потом блоки сравниваются
+    # на одних и тех же местах — так находится конец замены без сдвига. Если dense, то ещё блоки right
+    # складываются в словарь, а по left окно сдвигается на байт (хеш каждого среза ищется в словаре):
+    # так находится и совмещение после замены.
+
+    best = None
+
+    def offer(shift, found):
+        nonlocal best
+        if shift >= 0 and found >= 0 and (best is None or shift + found < sum(best)):
+            best = (shift, found)
+
+    for start in range(0, min(DIFF_ANCHORS * DIFF_BLOCK, len(left), len(right)) - DIFF_BLOCK + 1, DIFF_BLOCK):
+        offer(left.find(right[start:start + DIFF_BLOCK]), start)
+        offer(start, right.find(left[start:start + DIFF_BLOCK]))
+
+    # Замена без сдвига: первый блок, совпадающий на одном и том же месте.
+    for start in range(0, min(len(left), len(right)) - DIFF_BLOCK + 1, DIFF_BLOCK):
+        if best is not None and 2 * start >= sum(best):
+            break
+        if left[start:start + DIFF_BLOCK] == right[start:start + DIFF_BLOCK]:
+            offer(start, start)
+            break
+
+    if not dense:
+        return best
+
+    blocks = {}  # Блок right -> его первое начало.
+    for start in range(0, len(right) - DIFF_BLOCK + 1, DIFF_BLOCK):
+        blocks.setdefault(right[start:start + DIFF_BLOCK], start)
+
+    for shift in range(len(left) - DIFF_BLOCK + 1):
+        if best is not None and shift >= sum(best):
+            # Дальше места только дальше найденного.
+            break
+        found = blocks.get(left[shift:shift + DIFF_BLOCK])
+        if found is not None:
+            offer(shift, found)
+
+    return best
+
+
+def realign(first, second, first_offset: int, second_offset: int):
+    """
+    :param first:
+    :param second:
+    :param first_offset:
+    :param second_offset:
+    :return tuple:
+    """
+
+    # Поиск ближайшего места, с которого документы снова совпадают (после вставки, удаления или замены).
+    # Найденное совпадение продлевается назад. Если в окне ничего нет, окно растёт до DIFF_WINDOW_LIMIT,
+    # а потом весь просмотренный промежуток считается заменённым. Если же окно дошло до конца обоих
+    # документов (совпадения короче DIFF_BLOCK в хвосте не находятся), от промежутка отрезается общий конец.
+
+    window = DIFF_WINDOW
+    while True:
+        left = first.read(first_offset, window)
+        right = second.read(second_offset, window)
+
+        best = nearest_match(left, right, window <= DIFF_DENSE_LIMIT)
+        if best is not None:
+            shift, found = best
+            while shift > 0 and found > 0 and left[shift - 1] == right[found - 1]:
+                shift, found = shift - 1, found - 1
+            return first_offset + shift, second_offset + found
+
+        if len(left) < window and len(right) < window:
+            suffix = common_prefix(left[::-1], right[::-1])
+            return first_offset + len(left) - suffix, second_offset + len(right) - suffix
+        if window >= DIFF_WINDOW_LIMIT:
+            return first_offset + len(left), second_offset + len(right)
+        window *= 4
+
+
+def compare(first, second, cancel=None, progress=None):
+    # Поочерёдная выдача отличий (номер байта в first, длина, номер байта во second, длина):
+    # промежуток first заменён промежутком second (длина 0 — вставка или удаление).
+    # Равные промежутки пропускаются сравнением кусков, а после отличия документы совмещаются
+    # функцией realign(), поэтому вставка не делает отличающимся весь хвост файла.
+    # cancel — threading.Event для остановки, progress(номер байта в first) вызывается после отличия.
+    first_offset = second_offset = 0
+
+    while first_offset < len(first) or second_offset < len(second):
+        if cancel is not None and cancel.is_set():
+            return
+
+        equal = skip_equal(first, second, first_offset, second_offset, cancel=cancel)
+        first_offset += equal
+        second_offset += equal
+
+        if first_offset >= len(first) or second_offset >= len(second):
+            if first_offset < len(first) or second_offset < len(second):
+                yield first_offset, len(first) - first_offset, second_offset, len(second) - second_offset
+            return
+
+        first_end, second_end = realign(first, second, first_offset, second_offset)
+        yield first_offset, first_end - first_offset, second_offset, second_end - second_offset
+        first_offset, second_offset = first_end, second_end
+
+        if progress is not None:
+            progress(first_offset)
+
+
+def diff_edits(first, second, differences, cancel=None, progress=None):
+    # Отличия compare() в виде правок для Document.apply_edits(): (номер байта, кол-во удаляемых байтов,
+    # новые байты). Правки превращают first во second.
+    # cancel — threading.Event для остановки (вызывается Cancelled), progress(номер байта в first).
+    for first_offset, first_length, second_offset, second_length in differences:
+        if cancel is not None and cancel.is_set():
+            raise Cancelled
+        yield first_offset, first_length, second.read(second_offset, second_length)
+        if progress is not None:
+            progress(first_offset + first_length)
+
+
+def write_patch(patch_file, edits):
+    # Запись правок в текстовый патч: по строке на правку —
+    # "номер байта (hex) кол-во удаляемых байтов новые байты (hex)", например, "0000001f 2 8b08".
+    for offset, size, data in edits:
+        patch_file.write(f"{hex(offset)[2:].rjust(8, '0')} {size} {data.hex()}\n")
+
+
+def read_patch(patch_file):
+    # Поочерёдное чтение правок из текстового патча (см. write_patch). Пустые строки
+    # и строки, начинающиеся с #, пропускаются. При ошибке вызывается ValueError.
+    for number, line in enumerate(patch_file, 1):
+        if not line.strip() or line.startswith("#"):
+            continue
+        parts = line.split()
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Patch line {number} must look like OFFSET SIZE [HEX]")
+        yield int(parts[0], 16), int(parts[1]), bytes.fromhex(parts[2]) if len(parts) == 3 else b""
+
+
+IPS_LIMIT = 1 << 24  # В записях IPS номер байта занимает 3 байта, поэтому меняются только первые 16 МБ.
+IPS_RECORD = 0xFFFE  # Наибольшая длина записи IPS (на байт меньше предела, см. ips_record()).
+IPS_EOF = int.from_bytes(b"EOF", "big")  # Номер байта, совпадающий с меткой конца патча.
+IPS_RUN = re.compile(rb"(.)\1{8,}", re.S)  # Повторы одного байта, которые выгоднее сжать (RLE).
+
+
+def overwrites(edits, target):
+    # Правки в виде записей поверх байтов: (номер байта в target, новые байты). Пока байты
+    # не сдвигались, правка и есть запись, а после первой вставки или удаления
+    # переписывается весь хвост target, потому что IPS не умеет сдвигать байты.
+    for offset, size, data in edits:
+        if len(data) != size:
+            for chunk in target.chunks(IPS_RECORD, offset):
+                yield offset, bytes(chunk)
+                offset += len(chunk)
+            return
+        yield offset, data
+
+
+def ips_record(target, offset: int, data: bytes, run=False):
+    """
+    :param target:
+    :param offset:
+    :param data:
+    :param run:
+    :return bytes:
+    """
+
+    # Запись IPS: 3 байта номера, 2 байта длины и байты. Если длина равна 0, дальше идут
+    # 2 байта кол-ва повторов и повторяемый байт (run — data состоит из одного байта).
+
+    if offset >= IPS_LIMIT:
+        raise PatchError("IPS patches can only change the first 16 MiB of a file")
+    if offset == IPS_EOF:
+        # Номер байта читался бы как конец патча, поэтому запись начинается на байт раньше.
+        return ips_record(target, offset - 1, target.read(offset - 1, 1) + data)
+    if run:
+        return offset.to_bytes(3, "big") + b"\x00\x00" + len(data).to_bytes(2, "big") + data[:1]
+    return offset.to_bytes(3, "big") + len(data).to_bytes(2, "big") + data
+
+
+def write_ips(patch_file, edits, target, source_length: int):
+    # Запись правок, превращающих файл длины source_length в target, патчем IPS.
+    # Повторы одного байта сжимаются, а если target короче, в конце указывается его длина.
+    patch_file.write(b"PATCH")
+
+    for offset, data in overwrites(edits, target):
+        position = 0
+        for run in list(IPS_RUN.finditer(data)) + [None]:
+            start, end = (run.start(), run.end()) if run is not None else (len(data), len(data))
+            for shift in range(position, start, IPS_RECORD):
+                patch_file.write(ips_record(target, offset + shift, data[shift:min(shift + IPS_RECORD, start)]))
+            for shift in range(start, end, IPS_RECORD):
+                patch_file.write(ips_record(target, offset + shift, data[shift:min(shift + IPS_RECORD, end)], True))
+            position = end
+
+    patch_file.write(b"EOF")
+    if len(target) < source_length:
+        if len(target) >= IPS_LIMIT:
+            raise PatchError("IPS patches can only truncate a file to less than 16 MiB")
+        patch_file.write(len(target).to_bytes(3, "big"))
+
+
+def read_ips(patch_file):
+    """
+    :param patch_file:
+    :return tuple:
+    """
+
+    # Чтение патча IPS: список записей (номер байта, новые байты) и длина, до которой
+    # обрезается файл (None, если не обрезается). При ошибке вызывается ValueError.
+
+    if patch_file.read(5) != b"PATCH":
+        raise ValueError("Not an IPS patch")
+
+    records = []
+    while True:
+        head = patch_file.read(3)
+        if head == b"EOF":
+            tail = patch_file.read(3)
+            return records, int.from_bytes(tail, "big") if len(tail) == 3 else None
+
+        size = patch_file.read(2)
+        if len(head) < 3 or len(size) < 2:
+            raise ValueError("IPS patch ends without EOF")
+        offset, size = int.from_bytes(head, "big"), int.from_bytes(size, "big")
+
+        if size:
+            data = patch_file.read(size)
+        else:
+            run = patch_file.read(3)
+            size = int.from_bytes(run[:2], "big")
+            data = run[2:] * size
+        if len(data) < size or not size:
+            raise ValueError(f"IPS record at {hex(offset)} is broken")
+        records.append((offset, data))
+
+
+def ips_edits(records, length: int, truncate=None):
+    """
+    :param records:
+    :param length:
+    :param truncate:
+    :return list:
+    """
+
+    # Записи IPS в виде правок для Document.apply_edits() над файлом длины length.
+    # Пересекающиеся записи склеиваются (более поздняя перекрывает более раннюю),
+    # а промежуток между концом файла и записью за ним заполняется нулями.
+
+    starts, segments = [], []  # Склеенные записи по порядку: номера первых байтов и байты.
+
+    for offset, data in records:
+        end = offset + len(data)
+        first = bisect_right(starts, offset) - 1
+        if first < 0 or starts[first] + len(segments[first]) < offset:
+            first += 1
+        last = bisect_right(starts, end)
+
+        start = min([offset] + starts[first:last])
+        stop = max([end] + [starts[index] + len(segments[index]) for index in range(first, last)])
+        merged = bytearray(stop - start)
+        for index in range(first, last):
+            merged[starts[index] - start:starts[index] - start + len(segments[index])] = segments[index]
+        merged[offset - start:end - start] = data
+        starts[first:last], segments[first:last] = [start], [merged]
+
+    if truncate is not None:
+        # Обрезка выполняется после записей.
+        count = bisect_left(starts, truncate)
+        del starts[count:], segments[count:]
+        if segments:
+            del segments[-1][truncate - starts[-1]:]
+
+    # Записи, заходящие за конец файла, склеиваются в одну вставку в конец.
+    tail = next((index for index in range(len(starts)) if starts[index] + len(segments[index]) > length), None)
+    if tail is not None:
+        start = min(starts[tail], length)
+        merged = bytearray(starts[-1] + len(segments[-1]) - start)
+        for index in range(tail, len(starts)):
+            merged[starts[index] - start:starts[index] - start + len(segments[index])] = segments[index]
+        starts[tail:], segments[tail:] = [start], [merged]
+
+    edits = [(start, min(len(data), length - start), bytes(data)) for start, data in zip(starts, segments)]
+    if truncate is not None and truncate < length:
+        edits.append((truncate, length - truncate, b""))
+    return edits
+
+
+def check_edits(edits: list, length: int):
+    # Проверка правок из патча: они должны идти по порядку, не пересекаться и не выходить за файл.
+    position = 0
+    for offset, size, data in edits:
+        if offset < position or offset + size > length:
+            raise ValueError(f"Patch edit at {hex(offset)} overlaps another edit or the end of the file")
+        position = offset + size
+
+
+def load_patch(file_name: str, length: int):
+    """
+    :param file_name:
+    :param length:
+    :return list:
+    """
+
+    # Чтение патча (IPS или текстового, см. write_patch) в виде правок для Document.apply_edits()
+    # над файлом длины length. Формат определяется по началу файла.
+
+    with open(file_name, mode="rb") as patch_file:
+        if patch_file.read(5) == b"PATCH":
+            patch_file.seek(0)
+            records, truncate = read_ips(patch_file)
+            edits = ips_edits(records, length, truncate)
+        else:
+            patch_file.seek(0)
+            edits = list(read_patch(line.decode("ascii") for line in patch_file))
+
+    check_edits(edits, length)
+    return edits
+
+
+def save_patch(file_name: str, edits, target, source_length: int):
+    # Запись правок, превращающих файл длины source_length в target, патчем.
+    # Файлы .ips пишутся в формате IPS, остальные — текстовым патчем (см. write_patch).
+    # Если правки нельзя записать или запись остановлена, недописанный патч удаляется.
+    try:
+        if file_name.lower().endswith(".ips"):
+            with open(file_name, mode="wb") as patch_file:
+                write_ips(patch_file, edits, target, source_length)
+        else:
+            with open(file_name, mode="w", encoding="ascii") as patch_file:
+                write_patch(patch_file, edits)
+    except (PatchError, Cancelled):
+        os.remove(file_name)
+        raise
+
+
+def parse_edit(text: str):
+    """
+    :param text:
+    :return tuple:
+    """
+
+    # Правка из командной строки: "номер байта:байты", например, "0x1f:8B 08".
+
+    offset, separator, data = text.partition(":")
+    if not separator:
+        raise ValueError(f"Edit {text} must look like OFFSET:HEX")
+    return int(offset, 0), parse_hex(data)
+
+
+def positive_int(text: str):
+    """
+    :param text:
+    :return int:
+    """
+
+    # Целое число больше нуля из командной строки (например, кол-во байтов в строке).
+
+    value = int(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"{text} must be greater than zero")
+    return value
+
+
+def write_back(document: Document, output=None):
+    # Сохранение документа в output или, если он не задан, в открытый файл.
+    # Если байты не сдвигались, в открытый файл пишутся только изменённые байты.
+    if output is None and not document.resized:
+        document.save_in_place()
+    else:
+        document.save(output or document.file_name)
+
+
+def command_patch(arguments):
+    # hexedit patch FILE OFFSET:HEX... — запись байтов поверх существующих.
+    # С --patch применяется патч IPS или текстовый (см. write_patch).
+    document = Document.open(arguments.file)
+    try:
+        # Байты только заменяются, поэтому правки за концом файла — ошибка (файл не меняется).
+        for offset, data in arguments.edits:
+            if offset + len(data) > len(document):
+                raise ValueError(f"Edit at {offset:#x} ({len(data)} bytes) goes past the end of "
+                                 f"{arguments.file} ({len(document)} bytes)")
+        for offset, data in arguments.edits:
+            document.replace(offset, data)
+        if arguments.patch is not None:
+            document.apply_edits(load_patch(arguments.patch, len(document)))
+        write_back(document, arguments.output)
+    finally:
+        document.close()
+    return 0
+
+
+def command_dump(arguments):
+    # hexedit dump FILE — выгрузка байтов текстом.
+    document = Document.open(arguments.file)
+    try:
+        for line in dump(document, arguments.width, arguments.offset, arguments.size):
+            print(line)
+    finally:
+        document.close()
+    return 0
+
+
+def command_search(arguments):
+    # hexedit search PATTERN FILE... — поиск совпадений (как grep: код 0 — что-то найдено, 1 — ничего).
+    pattern = compile_pattern(arguments.pattern, arguments.mode)
+    if arguments.output is not None and len(arguments.files) > 1:
+        raise ValueError("--output can be used only with one file")
+
+    found = False
+    for file_name in arguments.files:
+        document = Document.open(file_name)
+        try:
+            if arguments.replace is not None:
+                count = replace_all(document, pattern, compile_replacement(arguments.replace, arguments.mode),
+                                    workers=arguments.workers)
+                if count:
+                    write_back(document, arguments.output)
+                print(f"{file_name}:{count}")
+                found = found or bool(count)
+                continue
+
+            count = 0
+            for offset, length in find_all(document, pattern, workers=arguments.workers):
+                count += 1
+                if not arguments.count:
+                    print(f"{file_name}:{hex(offset)[2:].rjust(8, '0')}:{length}")
+            if arguments.count:
+                print(f"{file_name}:{count}")
+            found = found or bool(count)
+        finally:
+            document.close()
+
+    return 0 if found else 1
+
+
+def command_diff(arguments):
+    # hexedit diff FIRST SECOND — отличия файлов (как cmp: код 0 — файлы равны, 1 — различаются).
+    # С --output отличия записываются патчем, превращающим первый файл во второй
+    # (в формате IPS, если имя файла кончается на .ips).
+    first, second = Document.open(arguments.first), Document.open(arguments.second)
+    try:
+        differences = list(compare(first, second))
+        if arguments.output is not None:
+            save_patch(arguments.output, diff_edits(first, second, differences), second, len(first))
+        else:
+            for first_offset, first_length, second_offset, second_length in differences:
+                print(f"{hex(first_offset)[2:].rjust(8, '0')} {first_length} "
+                      f"{hex(second_offset)[2:].rjust(8, '0')} {second_length}")
+    finally:
+        first.close()
+        second.close()
+    return 1 if differences else 0
+
+
+def command_hash(arguments):
+    # hexedit hash FILE... — контрольные суммы файлов (или промежутка --offset/--size) за один проход.
+    algorithms = tuple(arguments.algorithm or HASH_ALGORITHMS)
+    for file_name in arguments.files:
+        document = Document.open(file_name)
+        try:
+            end = None if arguments.size is None else arguments.offset + arguments.size
+            digests = Checksums(algorithms).compute(document, arguments.offset, end)[0]
+            for algorithm in algorithms:
+                print(f"{algorithm} {digests[algorithm]} {file_name}")
+        finally:
+            document.close()
+    return 0
+
+
+def make_parser():
+    """
+    :return argparse.ArgumentParser:
+    """
+
+    # Разбор командной строки.
+
+    parser = argparse.ArgumentParser(prog="hexedit", description="Headless hex editor for batch patching.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    patch = commands.add_parser("patch", help="overwrite bytes in a file")
+    patch.add_argument("file")
+    patch.add_argument("edits", nargs="*", type=parse_edit, metavar="OFFSET:HEX",
+                       help="offset (decimal or 0x-prefixed) and bytes to write there")
+    patch.add_argument("--patch", help="apply an IPS patch or a patch written by 'hexedit diff -o'")
+    patch.add_argument("-o", "--output", help="write the result to another file instead")
+    patch.set_defaults(handler=command_patch)
+
+    dump_parser = commands.add_parser("dump", help="print bytes as hex and ASCII")
+    dump_parser.add_argument("file")
+    dump_parser.add_argument("--offset", type=lambda text: int(text, 0), default=0)
+    dump_parser.add_argument("--size", type=lambda text: int(text, 0), default=None)
+    dump_parser.add_argument("--width", type=positive_int, default=16, help="bytes per row")
+    dump_parser.set_defaults(handler=command_dump)
+
+    search_parser = commands.add_parser("search", help="find (and optionally replace) a byte pattern")
+    search_parser.add_argument("pattern")
+    search_parser.add_argument("files", nargs="+")
+    search_parser.add_argument("--mode", choices=("hex", "ascii", "utf-16", "regex"), default="hex")
+    search_parser.add_argument("--count", action="store_true", help="print only the number of matches")
+    search_parser.add_argument("--replace", help="replace every match with this text (same mode)")
+    search_parser.add_argument("-o", "--output", help="write the replaced file elsewhere")
+    search_parser.add_argument("--workers", type=positive_int, default=None, help="processes for large files")
+    search_parser.set_defaults(handler=command_search)
+
+    diff = commands.add_parser("diff", help="print differing ranges, realigning after inserts and deletes")
+    diff.add_argument("first")
+    diff.add_argument("second")
+    diff.add_argument("-o", "--output",
+                      help="write a patch that turns the first file into the second (IPS if it ends with .ips)")
+    diff.set_defaults(handler=command_diff)
+
+    hash_parser = commands.add_parser("hash", help="print CRC32, Adler-32, MD5, SHA-1 and SHA-256 in one pass")
+    hash_parser.add_argument("files", nargs="+")
+    hash_parser.add_argument("--algorithm", action="append", choices=HASH_ALGORITHMS,
+                             help="compute only this checksum (can be repeated)")
+    hash_parser.add_argument("--offset", type=lambda text: int(text, 0), default=0)
+    hash_parser.add_argument("--size", type=lambda text: int(text, 0), default=None)
+    hash_parser.set_defaults(handler=command_hash)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    :param argv:
+    :return int:
+    """
+
+    # Точка входа командной строки. Возвращается код завершения.
+
+    parser = make_parser()
+    arguments = parser.parse_args(argv)
+    try:
+        return arguments.handler(arguments)
+    except (OSError, ValueError, re.error, PatchError) as error:
+        print(f"hexedit: {error}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,719 @@
+from PyQt5.QtCore import Qt, QAbstractItemModel, QEvent, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QKeySequence, QPainter
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication, QToolTip, QWidget
+
+from hexedit import DirtyRanges, Document, DocumentListener, EntropyMap, PageCache, RENDER_ROWS, render_rows, \
+    row_label, TemplateError
+
+
+HEADER_COLOR = QColor(255, 235, 235)  # Цвет заголовка.
+BODY_COLOR = QColor(255, 255, 255)  # Цвет описания.
+DIFF_COLOR = QColor(255, 220, 120)  # Цвет отличающихся байтов при сравнении файлов.
+SELECTION_COLOR = QColor(170, 205, 255)  # Цвет выделенных байтов.
+LABEL_COLOR = QColor(240, 240, 240)  # Цвет фона номеров строк и столбцов.
+CURSOR_COLOR = QColor(0, 0, 0)  # Цвет рамки курсора.
+UNKNOWN_COLOR = QColor(200, 200, 200)  # Цвет ещё не посчитанных блоков на карте энтропии.
+
+PAGE_BYTE_COST = 64  # Примерная память на один байт страницы: строка клетки, ссылка на неё и символ.
+PAGE_ROW_COST = 200  # Примерная память на одну строку страницы без байтов (кортеж и списки).
+SCROLL_LIMIT = 1 << 30  # Наибольшее значение полосы прокрутки. Если строк больше, она двигается через несколько строк.
+HEX_DIGITS = "0123456789abcdefABCDEF"
+OVERVIEW_WIDTH = 24  # Ширина полосы-обзора документа.
+FREQUENT_BYTES = 4  # Сколько самых частых байтов показывается в подсказке полосы-обзора.
+TEMPLATE_BATCH = 1000  # Сколько элементов массива добавляется в дерево шаблона за раз.
+
+page_cache = PageCache()  # Общий кэш страниц всех таблиц байтов (всех вкладок и формы сравнения).
+
+
+class HexView(QAbstractScrollArea):
+    invalid_input = pyqtSignal(list)  # Введено не шестнадцатиричное число (номера неправильных символов).
+    edited = pyqtSignal()  # Документ изменён.
+    moved = pyqtSignal(int)  # Пользователь переместил курсор (номер байта).
+
+    # Таблица байтов: номера строк, шестнадцатиричные клетки и символы ASCII одним виджетом.
+    # QPainter рисует только видимые строки, а клеток-виджетов и заголовков строк нет совсем,
+    # поэтому время перерисовки и смены кол-ва байтов в строке не зависит от размера файла.
+    # Текст переводится страницами по RENDER_ROWS строк (render_rows) и хранится в общем для всех таблиц
+    # кэше страниц page_cache до изменения этих байтов или вытеснения.
+    # Выделены байты между anchor и position, курсор стоит на байте position.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.document = Document(b"\x00")  # Байты файла.
+        self.bytes_in_row = 8  # Кол-во байтов в строке.
+        self.header_end = -1  # Конечный байт заголовка (-1 — заголовка нет).
+        self.locked = False  # Правка запрещена (например, пока документ сохраняется в фоне).
+        self.marked = DirtyRanges()  # Выделенные цветом промежутки (например, отличия при сравнении).
+
+        self.position = 0  # Байт под курсором.
+        self.anchor = 0  # Второй конец выделения.
+        self.pressed = 0  # Байт, на котором нажата мышь.
+        self.low_nibble = False  # Следующая цифра — младшая половина байта.
+        self.ascii_side = False  # Курсор в столбце символов: вводятся символы, а не цифры.
+        self.scale = 1  # Сколько строк приходится на одно деление полосы прокрутки.
+
+        # Промежутки, изменённые с прошлой перерисовки.
+        self.changes = DirtyRanges()
+        self.document.trackers.append(self.changes)
+
+        font = QFont("Courier New", 12)
+        font.setStyleHint(QFont.TypeWriter)  # Если шрифта нет, берётся любой моноширинный.
+        self.setFont(font)
+        self.update_metrics()
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.viewport().setCursor(Qt.IBeamCursor)
+
+    def update_metrics(self):
+        # Размеры символов запоминаются при смене шрифта, а не вычисляются при каждой перерисовке.
+        metrics = QFontMetrics(self.font())
+        self.char_width = metrics.horizontalAdvance("0")  # Шрифт моноширинный: все символы одной ширины.
+        self.row_height = metrics.height() + 4
+        self.ascent = metrics.ascent() + 2
+        self.update_scrollbars()
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.FontChange:
+            self.update_metrics()
+        super().changeEvent(event)
+
+    def rendered(self, row: int):
+        """
+        :param row:
+        :return tuple:
+        """
+
+        # Шестнадцатиричные клетки и символы строки. Переводится сразу вся пачка строк вокруг неё.
+
+        rows = page_cache.get(self, row // RENDER_ROWS, lambda: self.render_page(row // RENDER_ROWS))
+        if row % RENDER_ROWS < len(rows):
+            return rows[row % RENDER_ROWS]
+        return [], ""
+
+    def render_page(self, page: int):
+        """
+        :param page:
+        :return tuple:
+        """
+
+        # Страница для кэша: строки page-й пачки и её примерный размер в памяти.
+
+        data = self.document.read(page * RENDER_ROWS * self.bytes_in_row, RENDER_ROWS * self.bytes_in_row)
+        rows = render_rows(data, self.bytes_in_row)
+        return rows, len(data) * PAGE_BYTE_COST + len(rows) * PAGE_ROW_COST
+
+    def row_count(self):
+        # Кол-во строк. Последняя строка может быть пустой — в неё дописываются байты.
+        return len(self.document) // self.bytes_in_row + 1
+
+    def visible_rows(self):
+        # Кол-во строк, целиком помещающихся под строкой номеров столбцов.
+        return max(self.viewport().height() // self.row_height - 1, 1)
+
+    def columns(self):
+        """
+        :return tuple:
+        """
+
+        # Начала столбцов: шестнадцатиричных клеток и символов, и ширина всей таблицы.
+
+        hex_x = (len(row_label(self.row_count() - 1, self.bytes_in_row)) + 2) * self.char_width
+        ascii_x = hex_x + (self.bytes_in_row * 3 + 2) * self.char_width
+        return hex_x, ascii_x, ascii_x + (self.bytes_in_row + 1) * self.char_width
+
+    def top_row(self):
+        # Первая видимая строка.
+        return min(self.verticalScrollBar().value() * self.scale, max(self.row_count() - self.visible_rows(), 0))
+
+    def set_top_row(self, row: int):
+        self.verticalScrollBar().setValue(row // self.scale)
+
+    def update_scrollbars(self):
+        # Пределы полос прокрутки. Вертикальная двигается по строкам, горизонтальная — по точкам.
+        rows, visible = self.row_count(), self.visible_rows()
+        self.scale = max(-(-rows // SCROLL_LIMIT), 1)
+        self.verticalScrollBar().setRange(0, -(-max(rows - visible, 0) // self.scale))
+        self.verticalScrollBar().setPageStep(max(visible // self.scale, 1))
+
+        width = self.viewport().width()
+        self.horizontalScrollBar().setRange(0, max(self.columns()[2] - width, 0))
+        self.horizontalScrollBar().setPageStep(width)
+        self.horizontalScrollBar().setSingleStep(self.char_width)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbars()
+
+    def fill_bytes(self, painter: QPainter, start: int, end: int, color: QColor):
+        # Закрашивание промежутка байтов [start, end) в обоих столбцах. Рисуются только видимые строки.
+        bytes_in_row, top = self.bytes_in_row, self.top_row()
+        hex_x, ascii_x, width = self.columns()
+        start = max(start, top * bytes_in_row)
+        end = min(end, (top + self.visible_rows() + 1) * bytes_in_row)
+        if start >= end:
+            return
+
+        for row in range(start // bytes_in_row, (end - 1) // bytes_in_row + 1):
+            first = max(start - row * bytes_in_row, 0)
+            last = min(end - row * bytes_in_row, bytes_in_row)
+            y = (row - top + 1) * self.row_height
+            painter.fillRect(hex_x + first * 3 * self.char_width, y, (last - first) * 3 * self.char_width,
+                             self.row_height, color)
+            painter.fillRect(ascii_x + first * self.char_width, y, (last - first) * self.char_width,
+                             self.row_height, color)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), BODY_COLOR)
+        painter.translate(-self.horizontalScrollBar().value(), 0)
+
+        bytes_in_row, char_width, row_height = self.bytes_in_row, self.char_width, self.row_height
+        hex_x, ascii_x, width = self.columns()
+        top, rows = self.top_row(), min(self.visible_rows() + 1, self.row_count() - self.top_row())
+        start, end = top * bytes_in_row, (top + rows) * bytes_in_row
+
+        # Фон: заголовок файла, отмеченные промежутки и выделение.
+        self.fill_bytes(painter, 0, self.header_end + 1, HEADER_COLOR)
+        for first, last in self.marked.overlapping(start, end):
+            self.fill_bytes(painter, first, last, DIFF_COLOR)
+        self.fill_bytes(painter, *self.selection(), SELECTION_COLOR)
+
+        # Номера столбцов и строк.
+        painter.fillRect(0, 0, width, row_height, LABEL_COLOR)
+        painter.fillRect(0, 0, hex_x - char_width, self.viewport().height(), LABEL_COLOR)
+        painter.drawText(hex_x + char_width // 2, self.ascent,
+                         " ".join(hex(column)[2:].upper().rjust(2, "0") for column in range(bytes_in_row)))
+
+        # Строки байтов: номер, клетки одной строкой текста и символы.
+        for shift in range(rows):
+            row = top + shift
+            y = (shift + 1) * row_height + self.ascent
+            cells, text = self.rendered(row)
+            painter.drawText(char_width, y, row_label(row, bytes_in_row))
+            painter.drawText(hex_x + char_width // 2, y, " ".join(cells))
+            painter.drawText(ascii_x, y, text)
+
+        # Курсор: рамка вокруг байта в обоих столбцах. Рамка в столбце, куда идёт ввод, толще.
+        row, column = divmod(self.position, bytes_in_row)
+        if top <= row < top + rows:
+            y = (row - top + 1) * row_height
+            pen = painter.pen()
+            pen.setColor(CURSOR_COLOR)
+            for x, cell_width, active in ((hex_x + column * 3 * char_width, 3 * char_width, not self.ascii_side),
+                                          (ascii_x + column * char_width, char_width, self.ascii_side)):
+                pen.setWidth(2 if active else 1)
+                painter.setPen(pen)
+                painter.drawRect(x, y, cell_width - 1, row_height - 1)
+            if not self.ascii_side:
+                # Черта под цифрой, которая будет введена.
+                x = hex_x + column * 3 * char_width + char_width // 2 + self.low_nibble * char_width
+                painter.drawLine(x, y + row_height - 3, x + char_width, y + row_height - 3)
+
+    def offset_at(self, x: int, y: int):
+        """
+        :param x:
+        :param y:
+        :return tuple:
+        """
+
+        # Байт под точкой виджета и столбец (символов или клеток), в который попала точка.
+
+        hex_x, ascii_x, width = self.columns()
+        x += self.horizontalScrollBar().value()
+        row = self.top_row() + max(y // self.row_height - 1, 0)
+        ascii_side = x >= ascii_x - self.char_width // 2
+        if ascii_side:
+            column = (x - ascii_x) // self.char_width
+        else:
+            column = (x - hex_x) // (3 * self.char_width)
+        column = min(max(column, 0), self.bytes_in_row - 1)
+        return min(row * self.bytes_in_row + column, len(self.document)), ascii_side
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.LeftButton:
+            return super().mousePressEvent(event)
+
+        offset, self.ascii_side = self.offset_at(event.x(), event.y())
+        if event.modifiers() & Qt.ShiftModifier:
+            self.position = offset
+        else:
+            self.pressed = self.anchor = self.position = offset
+        self.low_nibble = False
+        self.viewport().update()
+        self.moved.emit(self.position)
+
+    def mouseMoveEvent(self, event):
+        # Выделение мышью. Байты под обоими концами выделения входят в него.
+        if not event.buttons() & Qt.LeftButton:
+            return
+
+        offset = self.offset_at(event.x(), event.y())[0]
+        if offset >= self.pressed:
+            self.anchor, self.position = self.pressed, min(offset + 1, len(self.document))
+        else:
+            self.anchor, self.position = min(self.pressed + 1, len(self.document)), offset
+        self.low_nibble = False
+        self.ensure_visible(offset)
+        self.viewport().update()
+
+    def selection(self):
+        """
+        :return tuple:
+        """
+
+        # Выделенные байты [начало, конец).
+
+        return min(self.anchor, self.position), max(self.anchor, self.position)
+
+    def move_to(self, offset: int, extend=False):
+        # Перемещение курсора. С extend (зажат Shift) выделение растягивается.
+        self.position = min(max(offset, 0), len(self.document))
+        if not extend:
+            self.anchor = self.position
+        self.low_nibble = False
+        self.ensure_visible(self.position)
+        self.viewport().update()
+        self.moved.emit(self.position)
+
+    def ensure_visible(self, offset: int):
+        # Прокрутка к байту, если его не видно.
+        row, column = divmod(offset, self.bytes_in_row)
+        top, visible = self.top_row(), self.visible_rows()
+        if row < top:
+            self.set_top_row(row)
+        elif row >= top + visible:
+            self.set_top_row(row - visible + 1)
+
+        hex_x, ascii_x, width = self.columns()
+        if self.ascii_side:
+            left, right = ascii_x + column * self.char_width, ascii_x + (column + 1) * self.char_width
+        else:
+            left, right = hex_x + column * 3 * self.char_width, hex_x + (column + 1) * 3 * self.char_width
+        scroll = self.horizontalScrollBar()
+        if left < scroll.value():
+            scroll.setValue(left)
+        elif right > scroll.value() + self.viewport().width():
+            scroll.setValue(right - self.viewport().width())
+
+    def select(self, offset: int, length: int):
+        # Выделение промежутка байтов и прокрутка к нему. Невидимый промежуток показывается в верхней трети.
+        self.anchor = min(offset, len(self.document))
+        self.position = min(offset + length, len(self.document))
+        self.low_nibble = False
+        row, top, visible = offset // self.bytes_in_row, self.top_row(), self.visible_rows()
+        if not top <= row < top + visible:
+            self.set_top_row(max(row - visible // 3, 0))
+        self.ensure_visible(offset)
+        self.viewport().update()
+
+    def keyPressEvent(self, event):
+        bytes_in_row = self.bytes_in_row
+        extend = bool(event.modifiers() & Qt.ShiftModifier)
+        control = bool(event.modifiers() & Qt.ControlModifier)
+        moves = {Qt.Key_Left: -1, Qt.Key_Right: 1, Qt.Key_Up: -bytes_in_row, Qt.Key_Down: bytes_in_row,
+                 Qt.Key_PageUp: -bytes_in_row * self.visible_rows(),
+                 Qt.Key_PageDown: bytes_in_row * self.visible_rows()}
+
+        if event.key() in moves:
+            self.move_to(self.position + moves[event.key()], extend)
+        elif event.key() == Qt.Key_Home:
+            self.move_to(0 if control else self.position - self.position % bytes_in_row, extend)
+        elif event.key() == Qt.Key_End:
+            self.move_to(len(self.document) if control else
+                         self.position - self.position % bytes_in_row + bytes_in_row - 1, extend)
+        elif event.matches(QKeySequence.SelectAll):
+            self.anchor = 0
+            self.move_to(len(self.document), True)
+        elif event.matches(QKeySequence.Copy):
+            # Копируется шестнадцатиричная запись выделенных байтов.
+            start, end = self.selection()
+            QApplication.clipboard().setText(self.document.read(start, end - start).hex(" ").upper())
+        elif event.key() in (Qt.Key_Delete, Qt.Key_Backspace):
+            self.delete_bytes(event.key() == Qt.Key_Backspace)
+        elif event.text() and event.text().isprintable() and not control:
+            self.type_text(event.text())
+        else:
+            super().keyPressEvent(event)
+
+    def type_text(self, text: str):
+        # Ввод с клавиатуры поверх байтов. В столбце символов вводятся символы ASCII,
+        # в столбце клеток — шестнадцатиричные цифры по половине байта.
+        if self.locked:
+            return
+
+        if self.ascii_side:
+            data = text.encode("ascii", errors="ignore")
+            if data:
+                self.write(self.position, data)
+                self.move_to(self.position + len(data))
+            return
+
+        wrong = [number for number, symbol in enumerate(text) if symbol not in HEX_DIGITS]
+        if wrong:
+            self.invalid_input.emit(wrong)
+            return
+
+        for digit in text:
+            value = self.document[self.position] if self.position < len(self.document) else 0
+            if self.low_nibble:
+                value = value & 0xF0 | int(digit, 16)
+            else:
+                value = int(digit, 16) << 4 | value & 0x0F
+            self.write(self.position, bytes([value]))
+            if self.low_nibble:
+                self.move_to(self.position + 1)
+            else:
+                self.low_nibble = True
+                self.viewport().update()
+
+    def delete_bytes(self, backward=False):
+        # Удаление выделенных байтов, а если выделения нет — байта под курсором (или перед ним).
+        start, end = self.selection()
+        if start == end:
+            start = self.position - 1 if backward else self.position
+            end = start + 1
+        if self.locked or start < 0 or end > len(self.document):
+            return
+
+        self.edit(self.document.delete, start, end - start)
+        self.move_to(start)
+
+    def write(self, offset: int, data: bytes):
+        # Запись байтов поверх существующих, начиная с offset. Не поместившиеся байты дописываются в конец.
+        self.edit(self.document.replace, offset, data)
+
+    def apply_edits(self, edits: list):
+        # Пачка правок документа (Document.apply_edits) с одной перерисовкой.
+        self.edit(self.document.apply_edits, edits)
+
+    def undo(self):
+        # Отмена последней правки документа.
+        self.edit(self.document.undo)
+
+    def redo(self):
+        # Повтор отменённой правки документа.
+        self.edit(self.document.redo)
+
+    def add_row(self):
+        # Добавляется строка нулевых байтов с конца.
+        self.edit(self.document.insert, len(self.document), bytes(self.bytes_in_row))
+
+    def remove_row(self):
+        # Удаляется последняя строка байтов.
+        last_row = min(len(self.document) % self.bytes_in_row or self.bytes_in_row, len(self.document))
+        self.edit(self.document.delete, len(self.document) - last_row, last_row)
+
+    def edit(self, action, *args):
+        # Правка документа. Забываются только пачки строк, попавшие в изменённые промежутки.
+        if self.locked:
+            return
+
+        action(*args)
+        self.refresh()
+
+    def refresh(self):
+        # Обновление после правки: забываются страницы с изменёнными байтами, и видимые строки перерисовываются.
+        page_size = RENDER_ROWS * self.bytes_in_row
+        page_cache.discard(self, lambda page: next(self.changes.overlapping(page * page_size, (page + 1) * page_size),
+                                                   None) is not None)
+        self.changes.clear()
+
+        self.position = min(self.position, len(self.document))
+        self.anchor = min(self.anchor, len(self.document))
+        self.update_scrollbars()
+        self.viewport().update()
+        self.edited.emit()
+
+    def set_document(self, document: Document, header_end=-1):
+        # Замена документа. Прошлый документ закрывается.
+        self.document.close()
+        self.document = document
+        self.document.trackers.append(self.changes)
+        self.changes.clear()
+        page_cache.discard(self)
+        self.header_end = header_end
+        self.position = self.anchor = 0
+        self.low_nibble = False
+        self.update_scrollbars()
+        self.set_top_row(0)
+        self.viewport().update()
+
+    def set_bytes_in_row(self, bytes_in_row: int):
+        # Смена кол-ва байтов в строке. Это только параметр отображения: пересчитываются номера
+        # байтов строк и перерисовываются видимые строки. Байт в верхней строке остаётся наверху.
+        top = self.top_row() * self.bytes_in_row
+        self.bytes_in_row = bytes_in_row
+        page_cache.discard(self)
+        self.update_scrollbars()
+        self.set_top_row(top // bytes_in_row)
+        self.viewport().update()
+
+    def close_document(self):
+        # Закрытие документа вместе с таблицей (например, при закрытии вкладки). Страницы убираются из кэша.
+        page_cache.discard(self)
+        self.document.close()
+
+    def set_header_end(self, header_end: int):
+        # Смена конца заголовка.
+        self.header_end = header_end
+        self.viewport().update()
+
+    def set_marked(self, ranges: DirtyRanges):
+        # Смена выделенных цветом промежутков.
+        self.marked = ranges
+        self.viewport().update()
+
+
+def entropy_color(entropy: float):
+    """
+    :param entropy:
+    :return QColor:
+    """
+
+    # Цвет энтропии: от синего (0 — одинаковые байты) до красного (8 — сжатые или зашифрованные данные).
+
+    return QColor.fromHsv(int(240 * (1 - min(entropy, 8) / 8)), 200, 230)
+
+
+class OverviewBar(QWidget):
+    clicked = pyqtSignal(int)  # Нажатие на полосу (номер байта).
+
+    # Полоса-обзор всего документа: каждая строка пикселей — часть файла, цвет — наибольшая энтропия
+    # её блоков из карты entropy_map. Карта считается в фоне, поэтому ещё не посчитанные блоки серые.
+    # Нажатие переходит к байту, подсказка показывает промежуток, энтропию и самые частые байты.
+    # Тексты подсказки (ключи overviewRange, overviewEntropy, overviewBytes, overviewWait) задаёт главное окно.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entropy_map = EntropyMap()  # Карта энтропии документа.
+        self.length = 0  # Длина документа.
+        self.texts = {"overviewRange": "{}", "overviewEntropy": "{}", "overviewBytes": "{}", "overviewWait": ""}
+
+        self.setFixedWidth(OVERVIEW_WIDTH)
+        self.setCursor(Qt.PointingHandCursor)
+
+    def set_length(self, length: int):
+        # Смена длины документа (после правки или открытия файла).
+        self.length = length
+        self.update()
+
+    def blocks_at(self, y: int):
+        """
+        :param y:
+        :return tuple:
+        """
+
+        # Первый и последний блоки карты, попадающие в строку пикселей y.
+
+        height, blocks = max(self.height(), 1), self.entropy_map.blocks(self.length)
+        first = y * blocks // height
+        return first, max(first, (y + 1) * blocks // height - 1)
+
+    def offset_at(self, y: int):
+        # Номер байта в строке пикселей y.
+        return min(max(y, 0) * self.length // max(self.height(), 1), max(self.length - 1, 0))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), UNKNOWN_COLOR)
+        if not self.length:
+            return
+
+        entropies = self.entropy_map.entropies
+        for y in range(event.rect().top(), event.rect().bottom() + 1):
+            first, last = self.blocks_at(y)
+            values = [entropies[block] for block in range(first, last + 1) if block in entropies]
+            if values:
+                painter.setPen(entropy_color(max(values)))
+                painter.drawLine(0, y, self.width() - 1, y)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.clicked.emit(self.offset_at(event.y()))
+
+    def mouseMoveEvent(self, event):
+        # Протаскивание мышью по полосе прокручивает документ.
+        if event.buttons() & Qt.LeftButton:
+            self.clicked.emit(self.offset_at(event.y()))
+
+    def event(self, event):
+        if event.type() != QEvent.ToolTip:
+            return super().event(event)
+
+        if not self.length:
+            QToolTip.hideText()
+            return True
+
+        first, last = self.blocks_at(event.pos().y())
+        block_size = self.entropy_map.block_size
+        start, end = first * block_size, min((last + 1) * block_size, self.length)
+        lines = [self.texts["overviewRange"].replace("{}", f"{start:X}–{end - 1:X}")]
+
+        entropies = [self.entropy_map.entropies[block] for block in range(first, last + 1)
+                     if block in self.entropy_map.entropies]
+        if entropies:
+            histogram = self.entropy_map.histogram(first, last)
+            frequent = sorted(range(256), key=lambda value: -histogram[value])[:FREQUENT_BYTES]
+            total = max(sum(histogram), 1)
+            lines.append(self.texts["overviewEntropy"].replace("{}", f"{max(entropies):.2f}"))
+            lines.append(self.texts["overviewBytes"].replace("{}", ", ".join(
+                f"{value:02X} ({histogram[value] * 100 / total:.1f}%)" for value in frequent if histogram[value])))
+        else:
+            lines.append(self.texts["overviewWait"])
+
+        QToolTip.showText(event.globalPos(), "\n".join(lines), self)
+        return True
+
+
+class TemplateModel(DocumentListener, QAbstractItemModel):
+    # Дерево разбора документа по шаблону (TemplateNode) для QTreeView: поле, значение и номер байта.
+    # Элементы массивов добавляются пачками по TEMPLATE_BATCH (canFetchMore/fetchMore), а значения
+    # читаются только для строк, которые рисует дерево, поэтому массив из миллионов записей не разбирается целиком.
+    # Трекер changes подключается к документу: если правка задела поле, от которого зависит раскладка,
+    # или длина документа изменилась, документ разбирается заново, иначе только перерисовываются значения.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.template = None  # Шаблон (None — шаблона нет).
+        self.document = None
+        self.root = None  # Корневой узел разбора.
+        self.length = 0  # Длина документа при разборе.
+        self.fetched = {}  # Массив -> кол-во добавленных в дерево элементов.
+        self.changes = DirtyRanges()  # Изменённые промежутки документа.
+        self.headers = ["", "", ""]  # Заголовки столбцов (задаёт главное окно).
+
+    def attach(self, document: Document):
+        # Разбор другого документа тем же шаблоном.
+        super().attach(document)
+        self.set_template(self.template)
+
+    def set_template(self, template):
+        # Смена шаблона. Документ разбирается заново (байты при этом не читаются).
+        self.beginResetModel()
+        self.template = template
+        self.root = None if template is None or self.document is None else template.parse(self.document)
+        self.length = 0 if self.document is None else len(self.document)
+        self.fetched = {}
+        self.changes.clear()
+        self.endResetModel()
+
+    def refresh(self):
+        # Обновление после правки документа.
+        if self.root is None:
+            self.changes.clear()
+            return
+
+        if len(self.document) != self.length or any(next(self.root.dependencies.overlapping(start, end), None)
+                                                    for start, end in self.changes):
+            self.set_template(self.template)
+        elif len(self.changes):
+            self.changes.clear()
+            self.dataChanged.emit(self.index(0, 1), self.index(self.rowCount() - 1, 1))
+
+    def node(self, index: QModelIndex):
+        # Узел разбора по индексу (для неверного индекса — корень).
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index_of(self, node):
+        # Индекс узла или неверный индекс, если узел ещё не добавлен в дерево.
+        if node is self.root or node.parent is None:
+            return QModelIndex()
+        if node.parent.kind == "array" and node.row >= self.fetched.get(node.parent, 0):
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column, self.node(parent).child(row))
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node is None or parent.column() > 0:
+            return 0
+        if node.kind == "array":
+            return self.fetched.get(node, 0)
+        try:
+            return node.rows()
+        except TemplateError:
+            return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 3
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node is None or parent.column() > 0:
+            return False
+        return node.kind == "struct" and bool(node.spec.fields) or node.kind == "array" and node.count > 0
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return node is not None and node.kind == "array" and self.fetched.get(node, 0) < node.count
+
+    def fetchMore(self, parent, count=TEMPLATE_BATCH):
+        node = self.node(parent)
+        fetched = self.fetched.get(node, 0)
+        count = min(count, node.count - fetched)
+        if count > 0:
+            self.beginInsertRows(parent, fetched, fetched + count - 1)
+            self.fetched[node] = fetched + count
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+
+        node = index.internalPointer()
+        try:
+            if index.column() == 0:
+                return node.name
+            if index.column() == 1:
+                return node.text()
+            return f"{node.offset:X}"
+        except TemplateError as error:
+            return str(error)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def set_headers(self, headers: list):
+        self.headers = headers
+        self.headerDataChanged.emit(Qt.Horizontal, 0, len(headers) - 1)
+
+    def locate(self, offset: int):
+        """
+        :param offset:
+        :return QModelIndex:
+        """
+
+        # Индекс самого глубокого узла с байтом offset. Если элемент массива далеко за добавленными в дерево,
+        # выбирается сам массив, чтобы не добавлять в дерево все элементы до него.
+
+        if self.root is None:
+            return QModelIndex()
+
+        index = QModelIndex()
+        try:
+            path = self.root.locate(offset)
+        except TemplateError:
+            return index
+        for node in path[1:]:
+            parent = node.parent
+            if parent.kind == "array":
+                fetched = self.fetched.get(parent, 0)
+                if node.row >= fetched + TEMPLATE_BATCH:
+                    break
+                if node.row >= fetched:
+                    self.fetchMore(index, node.row + 1 - fetched)
+            index = self.index_of(node)
+        return index
@@ -0,0 +1,80 @@
+import io
+import random
+import threading
+
+import pytest
+
+from hexedit import Cancelled, Document, compare, diff_edits, read_patch, skip_equal, write_patch
+
+# Отличия compare() превращаются в патч, который, применённый к первому документу, должен давать второй.
+# Отличия не должны захватывать равные байты по краям.
+
+
+def mutate(generator: random.Random, data: bytes):
+    """
+    :param generator:
+    :param data:
+    :return bytes:
+    """
+
+    # Несколько случайных вставок, удалений и замен.
+
+    result = bytearray(data)
+    for _ in range(generator.randrange(0, 7)):
+        offset = generator.randrange(len(result) + 1)
+        kind = generator.random()
+        if kind < 0.33:
+            result[offset:offset] = generator.randbytes(generator.randrange(1, 100))
+        elif kind < 0.66:
+            del result[offset:offset + generator.randrange(1, 100)]
+        else:
+            result[offset:offset + 3] = generator.randbytes(3)
+    return bytes(result)
+
+
+def check_differences(first: Document, second: Document, differences: list):
+    # Отличия идут по порядку и не начинаются и не кончаются равными байтами.
+    previous = (0, 0)
+    for first_offset, first_length, second_offset, second_length in differences:
+        assert (first_offset, second_offset) >= previous
+        if first_length and second_length:
+            assert first[first_offset] != second[second_offset]
+            assert first[first_offset + first_length - 1] != second[second_offset + second_length - 1]
+        previous = (first_offset + first_length, second_offset + second_length)
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_patch_round_trip(seed):
+    generator = random.Random(seed)
+    length = generator.randrange(0, 3000)
+    if seed % 2:
+        # Повторяющиеся байты: много ложных совпадений при совмещении.
+        base = bytes(generator.choice(b"abcd") for _ in range(length))
+    else:
+        base = generator.randbytes(length)
+    first, second = Document(base), Document(mutate(generator, base))
+
+    differences = list(compare(first, second))
+    check_differences(first, second, differences)
+
+    patch = io.StringIO()
+    write_patch(patch, diff_edits(first, second, differences))
+    patch.seek(0)
+    first.apply_edits(list(read_patch(patch)))
+    assert first.read(0, len(first)) == second.read(0, len(second))
+
+
+def test_common_tail_is_trimmed():
+    # Замена в хвосте короче блока совмещения: общий конец не входит в отличие.
+    first = Document(b"x" * 5000 + b"abcdefgh" + b"tail")
+    second = Document(b"x" * 5000 + b"ABCDEFGHIJ" + b"tail")
+    assert list(compare(first, second)) == [(5000, 8, 5000, 10)]
+
+
+def test_skip_equal_stops():
+    data = Document(bytes(1 << 20))
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(Cancelled):
+        skip_equal(data, Document(bytes(1 << 20)), 0, 0, cancel=cancel)
+    assert skip_equal(data, Document(bytes(1 << 20)), 0, 0) == 1 << 20
@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+from hexedit import Document
+
+# Случайные правки документа сверяются с bytearray. Проверяются и внутренние начала кусков:
+# сдвиг после вставки или удаления откладывается (Document._replace_pieces), и ошибка в нём
+# видна не сразу, а только при поиске куска по номеру байта.
+
+
+def check_pieces(document: Document):
+    # Начало каждого куска равно сумме длин кусков перед ним, а _find() находит последний кусок,
+    # начинающийся не позже байта.
+    position = 0
+    starts = []
+    for index, piece in enumerate(document._pieces):
+        assert document._start(index) == position
+        starts.append(position)
+        position += piece[2]
+    assert position == len(document)
+
+    for offset in range(0, len(document), 97):
+        assert document._find(offset) == max(index for index, start in enumerate(starts) if start <= offset)
+
+
+def random_bytes(generator: random.Random, length: int):
+    """
+    :param generator:
+    :param length:
+    :return bytes:
+    """
+
+    return bytes(generator.getrandbits(8) for _ in range(length))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_edits(seed):
+    generator = random.Random(seed)
+    base = random_bytes(generator, generator.randrange(0, 3000))
+    document = Document(base)
+    model = bytearray(base)
+
+    for _ in range(600):
+        offset = generator.randrange(len(model) + 1)
+        data = bytes([generator.randrange(256)]) * generator.randrange(1, 6)
+        kind = generator.random()
+
+        if kind < 0.3:
+            document.replace(offset, data)
+            model[offset:offset + len(data)] = data
+        elif kind < 0.55:
+            document.insert(offset, data)
+            model[offset:offset] = data
+        elif kind < 0.75:
+            size = generator.randrange(1, 40)
+            document.delete(offset, size)
+            del model[offset:offset + size]
+        elif kind < 0.8:
+            size = generator.randrange(0, 8)
+            document.apply_edits([(offset, size, data)])
+            model[offset:offset + size] = data
+        elif kind < 0.85:
+            # Отмена и повтор: их результат сверяется при полной отмене в конце теста.
+            if generator.random() < 0.5:
+                document.undo()
+            else:
+                document.redo()
+            model = bytearray(document.read(0, len(document)))
+        elif kind < 0.9:
+            snapshot = document.snapshot()
+            assert snapshot.read(0, len(snapshot)) == bytes(model)
+        else:
+            size = generator.randrange(0, 50)
+            assert document.read(offset, size) == bytes(model[offset:offset + size])
+            if offset < len(model):
+                assert document[offset] == model[offset]
+
+        check_pieces(document)
+
+    assert len(document) == len(model)
+    assert document.read(0, len(document)) == bytes(model)
+
+    # Вся история отменяется до исходных байтов и повторяется до самой новой правки
+    # (в конце теста могли остаться отменённые правки).
+    while document.undo_length(True) is not None:
+        document.redo()
+    latest = document.read(0, len(document))
+
+    while document.undo_length() is not None:
+        document.undo()
+        check_pieces(document)
+    assert document.read(0, len(document)) == base
+
+    while document.undo_length(True) is not None:
+        document.redo()
+        check_pieces(document)
+    assert document.read(0, len(document)) == latest
+
+
+def test_snapshot_keeps_pieces():
+    # Копия не видит правок, сделанных после неё, даже если сдвиг начал ещё не применён.
+    document = Document(bytes(range(256)) * 4)
+    document.insert(10, b"abc")
+    snapshot = document.snapshot()
+    expected = snapshot.read(0, len(snapshot))
+
+    document.insert(5, b"xyz")
+    document.delete(500, 20)
+    document.replace(700, b"\xff" * 8)
+
+    assert snapshot.read(0, len(snapshot)) == expected
+    check_pieces(snapshot)
+    check_pieces(document)